@@ -0,0 +1,187 @@
+# streamer/audio/camilla.py
+#
+# Model configu CamillaDSP.
+# Baza (devices, mixery, własne filtry i kroki pipeline) z dsp/config.yml,
+# do tego filtry EQ z config-eq.json. Filtry loudness są zawsze w pipeline
+# (wyłączony = gain 0), więc wł./wył. loudness i jego zmiana z głośnością
+# (audio/loudness.py) to tylko zmiana parametrów.
+#
+# diff(stary, nowy) dzieli zmiany na:
+#   - patch   — parametry istniejących filtrów → PatchConfig, bez przerwy w dźwięku,
+#   - restart — devices / mixery / pipeline / zestaw lub typ filtrów → nowy plik + Reload.
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+
+from audio.loudness import LOUD_LOW_FREQ, LOUD_HIGH_FREQ, STEPS, shelf_gains
+
+BASE = Path(__file__).resolve().parents[1]
+BASE_CONFIG = BASE / "dsp" / "config.yml"
+
+EQ_Q = 1.0
+SHELF_Q = 0.707
+
+
+@dataclass(frozen=True)
+class Biquad:
+    kind: str                 # Peaking / Lowshelf / Highshelf ...
+    freq: float
+    q: float
+    gain: float = 0.0
+    description: str = ""
+
+    @classmethod
+    def from_dict(cls, d):
+        p = d["parameters"]
+        return cls(p["type"], float(p["freq"]), float(p.get("q", SHELF_Q)),
+                   float(p.get("gain", 0)), d.get("description") or "")
+
+    def parameters(self):
+        return {"type": self.kind, "freq": self.freq, "q": self.q, "gain": self.gain}
+
+    def to_dict(self):
+        d = {"type": "Biquad"}
+        if self.description:
+            d["description"] = self.description
+        d["parameters"] = self.parameters()
+        return d
+
+
+@dataclass
+class CamillaConfig:
+    devices: dict
+    filters: dict = field(default_factory=dict)      # nazwa → Biquad albo surowy dict
+    mixers: dict = field(default_factory=dict)
+    pipeline: list = field(default_factory=list)
+    description: str = ""
+
+    @classmethod
+    def load(cls, path=BASE_CONFIG):
+        doc = yaml.safe_load(Path(path).read_text()) or {}
+        filters = {}
+        for name, d in (doc.get("filters") or {}).items():
+            filters[name] = Biquad.from_dict(d) if d.get("type") == "Biquad" else d
+        return cls(devices=doc.get("devices") or {},
+                   filters=filters,
+                   mixers=doc.get("mixers") or {},
+                   pipeline=doc.get("pipeline") or [],
+                   description=doc.get("description", ""))
+
+    def to_dict(self):
+        d = {}
+        if self.description:
+            d["description"] = self.description
+        d["devices"] = self.devices
+        if self.mixers:
+            d["mixers"] = self.mixers
+        d["filters"] = {name: f.to_dict() if isinstance(f, Biquad) else f
+                        for name, f in self.filters.items()}
+        d["pipeline"] = self.pipeline
+        return d
+
+    def to_yaml(self):
+        return yaml.safe_dump(self.to_dict(), sort_keys=False, allow_unicode=True)
+
+
+# -------------------------------
+# EQ Z config-eq.json
+# -------------------------------
+
+def select_gains(cfg):
+    mode = cfg["mode"]
+    presets = cfg["presets"]
+    c2 = cfg["custom2_profiles"]
+    c5 = cfg["custom5_profiles"]
+
+    if mode == "preset":
+        return presets[cfg["selected_preset"]]
+
+    if mode.startswith("custom2"):
+        key = mode[-1]
+        return {
+            "60": c2[key]["bass"],
+            "230": c2[key]["bass"],
+            "910": 0,
+            "3600": c2[key]["treble"],
+            "14000": c2[key]["treble"]
+        }
+
+    if mode.startswith("custom5"):
+        key = mode[-1]
+        return c5[key]
+
+    return presets["FLAT"]
+
+
+def loudness_gains(cfg, volume=STEPS):
+    """(niskie, wysokie) w dB dla półek loudness przy danej głośności; (0, 0) gdy wyłączony."""
+    loud = cfg["loudness"]
+    if not loud["enabled"]:
+        return 0.0, 0.0
+    return shelf_gains(volume, loud["strength"])
+
+
+def eq_filters(cfg, volume=STEPS):
+    filters = {}
+    for f, g in select_gains(cfg).items():
+        filters[f"peq_{f}"] = Biquad("Peaking", float(f), EQ_Q, float(g), f"{f} Hz")
+    low, high = loudness_gains(cfg, volume)
+    filters["loud_low"] = Biquad("Lowshelf", float(LOUD_LOW_FREQ), SHELF_Q, float(low), "Loudness low")
+    filters["loud_high"] = Biquad("Highshelf", float(LOUD_HIGH_FREQ), SHELF_Q, float(high), "Loudness high")
+    return filters
+
+
+def build_config(cfg, base, volume=STEPS):
+    """Pełny config: baza + filtry EQ na wszystkich kanałach wyjścia."""
+    eq = eq_filters(cfg, volume)
+    channels = base.devices.get("playback", {}).get("channels", 2)
+    pipeline = [step for step in base.pipeline
+                if not set(step.get("names", [])) & eq.keys()]
+    pipeline.append({"type": "Filter", "channels": list(range(channels)), "names": list(eq)})
+    return CamillaConfig(devices=base.devices,
+                         filters={**base.filters, **eq},
+                         mixers=base.mixers,
+                         pipeline=pipeline,
+                         description=base.description)
+
+
+# -------------------------------
+# RÓŻNICE
+# -------------------------------
+
+@dataclass
+class ConfigDiff:
+    patch: dict = field(default_factory=dict)      # nazwa → nowe parametry
+    restart: list = field(default_factory=list)    # powody pełnego przeładowania
+
+    @property
+    def empty(self):
+        return not self.patch and not self.restart
+
+    @property
+    def hot(self):
+        return bool(self.patch) and not self.restart
+
+
+def diff(old, new):
+    d = ConfigDiff()
+    if old.devices != new.devices:
+        d.restart.append("devices")
+    if old.mixers != new.mixers:
+        d.restart.append("mixers")
+    if old.pipeline != new.pipeline:
+        d.restart.append("pipeline")
+    if old.filters.keys() != new.filters.keys():
+        d.restart.append("filters")
+
+    for name, f in new.filters.items():
+        prev = old.filters.get(name)
+        if prev is None or prev == f:
+            continue
+        if isinstance(f, Biquad) and isinstance(prev, Biquad) and f.kind == prev.kind:
+            d.patch[name] = f.parameters()
+        else:
+            d.restart.append(f"filter {name}")
+    return d
@@ -1,13 +1,53 @@
 # streamer/audio/dsp.py
+#
+# Most EQ → CamillaDSP.
+# Usługa streamer-eq — jedyny proces sterujący CamillaDSP. UI tylko zapisuje
+# config-eq.json; każda zmiana pliku (inotify) trafia do DspBridge.apply
+# → po DEBOUNCE s ciszy budujemy pełny config (audio/camilla.py) i porównujemy:
+#   - tylko parametry filtrów (gain/freq/q) → PatchConfig po websockecie CamillaDSP,
+#     bez przeładowania i bez przerwy w dźwięku,
+#   - devices / pipeline / zestaw filtrów → zapis YAML + Reload.
+# Głośność (MPD idle mixer → set_volume) zmienia tylko półki loudness — z tablicy
+# LUT (audio/loudness.py), po websockecie, bez zapisu czegokolwiek na dysk.
+# Po każdym nowym połączeniu z websocketem (restart / Reload CamillaDSP) filtry
+# są porównywane z faktycznie załadowanymi (GetConfigJson), nie z zapamiętanymi.
 
+import os
+import sys
 import json
 import time
+import struct
+import select
+import ctypes
+import logging
+import threading
 import subprocess
+import dataclasses
 from pathlib import Path
 
+from audio.camilla import Biquad, CamillaConfig, build_config, diff
+from audio.loudness import STEPS
+
+try:
+    import websocket          # pip: websocket-client
+except ImportError:
+    websocket = None
+
+try:
+    from mpd import MPDClient # pip: python-mpd2
+except ImportError:
+    MPDClient = None
+
 BASE = Path(__file__).resolve().parents[1]
 EQ_CONFIG = BASE / "config" / "config-eq.json"
 CAMILLA_CONFIG = Path("/etc/camilladsp/streamer.yml")
+CAMILLA_WS = "ws://127.0.0.1:1234"
+DEBOUNCE = 0.15               # s — kolejne kroki enkodera zlewają się w jedną zmianę
+LIVE_INTERVAL = 0.05          # s — loudness nadąża za głośnością najwyżej tak często
+RESYNC_INTERVAL = 5           # s — sprawdzanie, czy CamillaDSP nie wstał na nowo
+MPD_RETRY = 5                 # s
+
+log = logging.getLogger("streamer.dsp")
 
 
 def load_cfg():
@@ -15,76 +55,340 @@ def load_cfg():
 
 
 def write_camilla_yaml(text):
-    CAMILLA_CONFIG.write_text(text)
+    # tmp + rename — CamillaDSP nigdy nie przeczyta połowy pliku
+    tmp = CAMILLA_CONFIG.with_suffix(".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, CAMILLA_CONFIG)
 
 
 def reload_camilla():
     subprocess.run(["systemctl", "reload", "camilladsp"], check=False)
 
 
-def render_yaml(cfg):
-    mode = cfg["mode"]
-    presets = cfg["presets"]
-    c2 = cfg["custom2_profiles"]
-    c5 = cfg["custom5_profiles"]
-    loud = cfg["loudness"]
-
-    if mode == "preset":
-        gains = presets[cfg["selected_preset"]]
-
-    elif mode.startswith("custom2"):
-        key = mode[-1]
-        gains = {
-            "60": c2[key]["bass"],
-            "230": c2[key]["bass"],
-            "910": 0,
-            "3600": c2[key]["treble"],
-            "14000": c2[key]["treble"]
-        }
-
-    elif mode.startswith("custom5"):
-        key = mode[-1]
-        gains = c5[key]
-
-    else:
-        gains = presets["FLAT"]
-
-    # YAML – uproszczony, pipeline dopasujesz później
-    out = ["filters:"]
-    for f, g in gains.items():
-        out.append(f"  peq_{f}:")
-        out.append("    type: Peq")
-        out.append(f"    freq: {float(f)}")
-        out.append("    q: 1.0")
-        out.append(f"    gain: {g}")
-
-    if loud["enabled"]:
-        out.append("  loud_low:")
-        out.append("    type: Lowshelf")
-        out.append("    freq: 80")
-        out.append("    q: 0.7")
-        out.append(f"    gain: {loud['strength'] / 10}")
-
-        out.append("  loud_high:")
-        out.append("    type: Highshelf")
-        out.append("    freq: 8000")
-        out.append("    q: 0.7")
-        out.append(f"    gain: {loud['strength'] / 15}")
-
-    return "\n".join(out) + "\n"
+def render_yaml(cfg, base=None, volume=STEPS):
+    return build_config(cfg, base or CamillaConfig.load(), volume).to_yaml()
 
 
-def main():
-    last = None
-    while True:
-        cfg = load_cfg()
-        if cfg != last:
-            yaml = render_yaml(cfg)
-            write_camilla_yaml(yaml)
+def mpd_volume():
+    """Bieżąca głośność MPD (0–100) albo None."""
+    if MPDClient is None:
+        return None
+    client = MPDClient()
+    client.timeout = 2
+    try:
+        client.connect("localhost", 6600)
+        vol = int(client.status().get("volume", -1))
+        client.disconnect()
+    except Exception:
+        return None
+    return vol if vol >= 0 else None
+
+
+# -------------------------------
+# WEBSOCKET CAMILLADSP
+# -------------------------------
+
+class CamillaWs:
+    def __init__(self, url=CAMILLA_WS):
+        self.url = url
+        self.conn = None
+
+    def connect(self):
+        """True gdy powstało nowe połączenie — CamillaDSP mógł w międzyczasie wstać z innym configiem."""
+        if websocket is None or self.conn is not None:
+            return False
+        try:
+            self.conn = websocket.create_connection(self.url, timeout=2)
+        except Exception as e:
+            log.debug(f"CamillaDSP websocket: {e}")
+            return False
+        return True
+
+    def command(self, cmd, arg=None):
+        """Wyślij komendę; zwraca 'value' odpowiedzi albo None przy błędzie."""
+        if self.conn is None and not self.connect():
+            return None
+        try:
+            self.conn.send(json.dumps({cmd: arg} if arg is not None else cmd))
+            reply = json.loads(self.conn.recv()).get(cmd, {})
+        except Exception as e:
+            log.warning(f"CamillaDSP websocket: {e}")
+            self.close()
+            return None
+        if reply.get("result") != "Ok":
+            log.warning(f"CamillaDSP {cmd}: {reply.get('result')}")
+            return None
+        return reply.get("value", True)
+
+    def patch_filters(self, changed):
+        """changed: {nazwa: parametry} — tylko istniejące filtry, bez zmiany typu."""
+        patch = {"filters": {name: {"parameters": p} for name, p in changed.items()}}
+        return self.command("PatchConfig", patch) is not None
+
+    def reload(self):
+        return self.command("Reload") is not None
+
+    def get_filters(self):
+        """Filtry z configu aktywnego w CamillaDSP albo None."""
+        value = self.command("GetConfigJson")
+        if not isinstance(value, str):
+            return None
+        try:
+            doc = json.loads(value) or {}
+            return {name: Biquad.from_dict(d) if d.get("type") == "Biquad" else d
+                    for name, d in (doc.get("filters") or {}).items()}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            log.warning(f"CamillaDSP GetConfigJson: {e}")
+            return None
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+
+class DspBridge:
+    """
+    apply(cfg) można wołać przy każdym zapisie config-eq.json — zmiany są zbierane
+    przez DEBOUNCE s i wysyłane jako jedna różnica filtrów.
+    set_volume(v) — przy każdym kroku głośności; co najwyżej raz na
+    LIVE_INTERVAL s nowe wzmocnienia półek loudness.
+    apply/set_volume nigdy nie czekają na websocket ani systemctl —
+    I/O idzie pod osobną blokadą (io) w wątku timera / obserwatora.
+    """
+
+    def __init__(self, ws_url=CAMILLA_WS, base=None):
+        self.ws = CamillaWs(ws_url)
+        self.base = base or CamillaConfig.load()
+        self.cfg = None           # ostatni config-eq
+        self.config = None        # config załadowany w CamillaDSP
+        self.volume = STEPS
+        self.pending = None
+        self.timer = None
+        self.lock = threading.Lock()      # pending / timer / cfg / volume
+        self.io = threading.Lock()        # config + rozmowa z CamillaDSP
+        self.stats = {"patches": 0, "reloads": 0, "live": 0, "resyncs": 0}
+
+    def apply(self, cfg):
+        with self.lock:
+            self.pending = json.loads(json.dumps(cfg))     # kopia — UI zmienia swój słownik dalej
+            self._schedule(DEBOUNCE)
+
+    def set_volume(self, volume):
+        with self.lock:
+            step = max(0, min(STEPS, int(volume)))
+            if step == self.volume:
+                return
+            self.volume = step
+            if self.timer is None:
+                self._schedule(LIVE_INTERVAL)
+
+    def _schedule(self, delay):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending, self.timer = self.pending, None, None
+            if pending is not None:
+                self.cfg = pending
+            cfg, volume = self.cfg, self.volume
+        if cfg is None:
+            return
+        with self.io:
+            if pending is not None:
+                self._push(build_config(cfg, self.base, volume))
+            elif self.config is not None:
+                self._push_volume(build_config(cfg, self.base, volume))
+
+    def resync(self):
+        """Okresowo: martwe połączenie → nowe + porównanie z filtrami w CamillaDSP."""
+        with self.lock:
+            cfg, volume = self.cfg, self.volume
+        if cfg is None:
+            return
+        with self.io:
+            if self.config is None:
+                return
+            if self.ws.conn is not None and self.ws.command("GetVersion") is None:
+                log.info("DSP: websocket zerwany — CamillaDSP restartowany?")
+            self._push_volume(build_config(cfg, self.base, volume))
+
+    def _sync_ws(self):
+        # Po nowym połączeniu zapamiętany stan może być nieaktualny (restart CamillaDSP,
+        # Reload z innego configu) — diff liczony od filtrów faktycznie załadowanych
+        if not self.ws.connect() or self.config is None:
+            return
+        live = self.ws.get_filters()
+        if live is not None and live != self.config.filters:
+            self.config = dataclasses.replace(self.config, filters=live)
+            self.stats["resyncs"] += 1
+            log.info("DSP: filtry w CamillaDSP inne niż zapamiętane — wyrównuję")
+
+    def _patch(self, new):
+        """Różnica do self.config; patch po websockecie. Zwraca (wysłane, diff)."""
+        for _ in range(2):
+            self._sync_ws()
+            d = diff(self.config, new)
+            if d.empty or not d.hot:
+                return False, d
+            if self.ws.patch_filters(d.patch):
+                self.config = new
+                return True, d
+            # połączenie padło — jeszcze raz, od GetConfigJson na nowym
+        return False, d
+
+    def _push_volume(self, new):
+        # Tylko półki loudness; bez websocketu zostają do następnego połączenia
+        # (przeładowanie przy każdym kroku głośności dawałoby przerwy w dźwięku).
+        sent, _d = self._patch(new)
+        if sent:
+            self.stats["live"] += 1
+
+    def _push(self, new):
+        if self.config is not None:
+            sent, d = self._patch(new)
+            if sent:
+                self.stats["patches"] += 1
+                log.info(f"DSP: zmienione filtry {', '.join(d.patch)}")
+                return
+            if d.empty:
+                return
+            reason = ", ".join(d.restart) or "brak websocketu"
+        else:
+            reason = "start"
+        # Plik zawsze aktualny — CamillaDSP po restarcie wstaje z ostatnim EQ
+        write_camilla_yaml(new.to_yaml())
+        if not self.ws.reload():
             reload_camilla()
-            last = cfg
-        time.sleep(1)
+        self.config = new
+        self.stats["reloads"] += 1
+        log.info(f"DSP: config przeładowany ({reason})")
+
+
+# -------------------------------
+# OBSERWACJA PLIKU (inotify)
+# -------------------------------
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify_open(path):
+    """fd inotify obserwujący katalog pliku (zapis atomowy = rename) albo None."""
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        wd = libc.inotify_add_watch(fd, str(path.parent).encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _inotify_names(fd, timeout):
+    """Nazwy plików ze zdarzeń (pusta lista po timeout)."""
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if not ready:
+        return []
+    data = os.read(fd, 4096)
+    names, pos = [], 0
+    while pos + _EVENT.size <= len(data):
+        _wd, _mask, _cookie, length = _EVENT.unpack_from(data, pos)
+        pos += _EVENT.size
+        names.append(data[pos:pos + length].rstrip(b"\0").decode(errors="ignore"))
+        pos += length
+    return names
+
+
+def watch(path, on_change):
+    """Woła on_change() przy starcie i po każdym zapisie pliku (seria zapisów → DspBridge.apply)."""
+    fd = _inotify_open(path)
+    if fd is None:
+        # Bez inotify: tylko stat() co sekundę, plik parsowany dopiero przy zmianie
+        log.warning("inotify niedostępne — sprawdzanie mtime co 1 s")
+        last = None
+        while True:
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != last:
+                last = mtime
+                on_change()
+            time.sleep(1)
+
+    on_change()
+    while True:
+        if path.name in _inotify_names(fd, None):
+            on_change()
+
+
+def follow_volume(bridge):
+    """Głośność z MPD (idle mixer — bez odpytywania) → bridge.set_volume."""
+    if MPDClient is None:
+        log.warning("python-mpd2 niedostępny — loudness bez śledzenia głośności")
+        return
+    while True:
+        client = MPDClient()
+        try:
+            client.connect("localhost", 6600)
+            while True:
+                vol = int(client.status().get("volume", -1))
+                if vol >= 0:
+                    bridge.set_volume(vol)
+                client.idle("mixer")
+        except Exception as e:
+            log.warning(f"MPD: {e} — ponowna próba za {MPD_RETRY} s")
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+        time.sleep(MPD_RETRY)
+
+
+def _resync_loop(bridge):
+    while True:
+        time.sleep(RESYNC_INTERVAL)
+        bridge.resync()
+
+
+def main():
+    # Uruchamiane jako moduł z katalogu repo: python3 -m audio.dsp [--render]
+    if "--render" in sys.argv[1:]:
+        # ExecStartPre usługi camilladsp: config z aktualnym EQ i loudness dla
+        # bieżącej głośności zanim wstanie DSP
+        vol = mpd_volume()
+        write_camilla_yaml(render_yaml(load_cfg(), volume=STEPS if vol is None else vol))
+        return
+
+    bridge = DspBridge()
+    vol = mpd_volume()
+    if vol is not None:
+        bridge.set_volume(vol)
+    threading.Thread(target=follow_volume, args=(bridge,), daemon=True, name="DSP-Volume").start()
+    threading.Thread(target=_resync_loop, args=(bridge,), daemon=True, name="DSP-Resync").start()
+
+    def reload_cfg():
+        try:
+            bridge.apply(load_cfg())
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"DSP: pomijam niepełny config-eq.json ({e})")
+
+    watch(EQ_CONFIG, reload_cfg)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
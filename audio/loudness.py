@@ -0,0 +1,80 @@
+# streamer/audio/loudness.py
+#
+# Loudness zależny od głośności (krzywe jednakowej głośności ISO 226:2003).
+# Przy cichym słuchaniu ucho traci bas i górę bardziej niż środek — półki
+# loud_low / loud_high dostają różnicę krzywej dla bieżącego poziomu
+# względem poziomu odniesienia (REF_PHON przy głośności 100).
+#
+# Tablica LUT liczona raz przy imporcie: krok głośności 0–100 → (dB nisko, dB wysoko)
+# dla pełnej siły; loudness.strength z config-eq.json (0–100%) tylko ją skaluje.
+
+import math
+
+LOUD_LOW_FREQ = 80    # Hz — półki loud_low / loud_high
+LOUD_HIGH_FREQ = 8000
+REF_PHON = 80.0       # poziom przy głośności 100 — tu korekcja = 0
+DB_RANGE = 60.0       # tłumienie od głośności 100 do 0 (dB)
+MIN_PHON = 20.0       # poniżej krzywe ISO 226 nie są określone
+MAX_BOOST = 12.0      # dB — sufit półek (zapas przed przesterowaniem)
+STEPS = 100
+
+# ISO 226:2003, tabela 1: f, alpha_f, L_U, T_f
+_ISO226 = (
+    (20, 0.532, -31.6, 78.5), (25, 0.506, -27.2, 68.7), (31.5, 0.480, -23.0, 59.5),
+    (40, 0.455, -19.1, 51.1), (50, 0.432, -15.9, 44.0), (63, 0.409, -13.0, 37.5),
+    (80, 0.387, -10.3, 31.5), (100, 0.367, -8.1, 26.5), (125, 0.349, -6.2, 22.1),
+    (160, 0.330, -4.5, 17.9), (200, 0.315, -3.1, 14.4), (250, 0.301, -2.0, 11.4),
+    (315, 0.288, -1.1, 8.6), (400, 0.276, -0.4, 6.2), (500, 0.267, 0.0, 4.4),
+    (630, 0.259, 0.3, 3.0), (800, 0.253, 0.5, 2.2), (1000, 0.250, 0.0, 2.4),
+    (1250, 0.246, -2.7, 3.5), (1600, 0.244, -4.1, 1.7), (2000, 0.243, -1.0, -1.3),
+    (2500, 0.243, 1.7, -4.2), (3150, 0.243, 2.5, -6.0), (4000, 0.242, 1.2, -5.4),
+    (5000, 0.242, -2.1, -1.5), (6300, 0.245, -7.1, 6.0), (8000, 0.254, -11.2, 12.6),
+    (10000, 0.271, -10.7, 13.9), (12500, 0.301, -3.1, 12.3),
+)
+
+
+def _spl_at(row, phon):
+    _f, af, lu, tf = row
+    a = 4.47e-3 * (10 ** (0.025 * phon) - 1.15) + (0.4 * 10 ** ((tf + lu) / 10 - 9)) ** af
+    return 10 / af * math.log10(a) - lu + 94
+
+
+def spl(freq, phon):
+    """Poziom SPL (dB) tonu freq odbieranego jako phon (interpolacja w log f)."""
+    rows = _ISO226
+    if freq <= rows[0][0]:
+        return _spl_at(rows[0], phon)
+    if freq >= rows[-1][0]:
+        return _spl_at(rows[-1], phon)
+    for lo, hi in zip(rows, rows[1:]):
+        if lo[0] <= freq <= hi[0]:
+            t = math.log(freq / lo[0]) / math.log(hi[0] / lo[0])
+            return _spl_at(lo, phon) * (1 - t) + _spl_at(hi, phon) * t
+
+
+def compensation(freq, phon, ref=REF_PHON):
+    """Ile dB więcej niż 1 kHz potrzebuje freq przy phon, względem poziomu ref."""
+    return (spl(freq, phon) - phon) - (spl(freq, ref) - ref)
+
+
+def volume_phon(step):
+    return max(MIN_PHON, REF_PHON - DB_RANGE * (1 - step / STEPS))
+
+
+def _build_lut():
+    lut = []
+    for step in range(STEPS + 1):
+        phon = volume_phon(step)
+        lut.append(tuple(min(MAX_BOOST, max(0.0, compensation(f, phon)))
+                         for f in (LOUD_LOW_FREQ, LOUD_HIGH_FREQ)))
+    return lut
+
+
+LUT = _build_lut()
+
+
+def shelf_gains(volume, strength):
+    """(dB nisko, dB wysoko) dla kroku głośności 0–100 i siły 0–100%."""
+    low, high = LUT[max(0, min(STEPS, int(volume)))]
+    k = max(0, min(100, strength)) / 100
+    return round(low * k, 1), round(high * k, 1)
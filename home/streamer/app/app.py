@@ -11,18 +11,24 @@ from logging.handlers import RotatingFileHandler
 import threading
 import time
 import json
+import signal
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flask import Flask, render_template
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
 
+from modules.config_store import get_store
 from modules.source_manager import SourceManager
 from modules.eq_manager import EQManager
 from display.frontpanel_manager import FrontpanelManager
 from modules.bt_manager import BTManager
 from modules.network_manager import NetworkManager
+from modules.meter_publisher import MeterPublisher, METERS_ROOM
+from modules.analysis_demand import AnalysisDemand
+from modules.meter_bus import MeterBusWriter, BAND_SETS
+from modules.cover_manager import request_cover, cover_url
 from sources.bluetooth import BluetoothSource
 
 from routes import bp as api_bp
@@ -56,16 +62,9 @@ logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 # ── Config ─────────────────────────────────────────────────────────────────
 
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-
-def load_config() -> dict:
-    try:
-        with open(CONFIG_PATH) as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-cfg = load_config()
+# Jeden dokument config.json dla całego procesu (modules/config_store.py)
+config_store = get_store()
+cfg = config_store.doc
 ALSA_DEVICE = os.environ.get('ALSA_DEVICE', cfg.get('alsa_device', 'hw:sndrpihifiberry,0'))
 WEB_PORT    = int(os.environ.get('WEB_PORT', 8000))
 
@@ -119,7 +118,7 @@ class _UartAdapter:
 
 # ── Callbacks SocketIO i Pico ──────────────────────────────────────────────
 
-_cover_thread = None
+_cover_key = None   # ostatnio żądana okładka — starsze wyniki nie nadpisują nowszych
 
 def on_state_change(source_id: str, state: str):
     sm = app.source_manager
@@ -151,28 +150,22 @@ def on_meta_change(source_id: str, meta: dict):
         title   = meta.get('title', '')
         station = meta.get('station', '')
 
-        # Pobierz okładkę w tle — używamy jednego dedykowanego wątku, by uniknąć zombie
-        global _cover_thread
-        if _cover_thread and _cover_thread.is_alive():
-            # Jeśli poprzedni wątek jeszcze pobiera, nie spawnujemy nowego bezmyślnie
-            # (opcjonalnie można tu dodać kolejkę, ale dla stabilności ograniczamy liczbę wątków)
-            pass
+        # Okładka w tle — pula resolvera w cover_manager (bez wątku na każdą zmianę tytułu)
+        global _cover_key
+        key = (artist, title, station)
+        _cover_key = key
 
-        def _fetch_cover():
+        def _on_cover(cover_path):
+            if not cover_path or _cover_key != key:
+                return
             try:
-                from modules.cover_manager import get_cover_url, get_cover
-                cover_url = get_cover_url(artist, title, station)
-                if cover_url:
-                    socketio.emit('cover', {'url': cover_url, 'source': source_id})
-                    if app.frontpanel:
-                        cover_path = get_cover(artist, title, station)
-                        if cover_path:
-                            app.frontpanel.send_cover_to_pico(cover_path)
+                socketio.emit('cover', {'url': cover_url(cover_path), 'source': source_id})
+                if app.frontpanel:
+                    app.frontpanel.send_cover_to_pico(cover_path)
             except Exception as e:
                 log.error(f"Cover fetch error: {e}")
 
-        _cover_thread = threading.Thread(target=_fetch_cover, daemon=True)
-        _cover_thread.start()
+        request_cover(artist, title, station, callback=_on_cover)
 
         socketio.emit('meta', {'source': source_id, **meta})
 
@@ -191,6 +184,9 @@ app.frontpanel     = None
 app.uart_manager   = None
 app.bt_manager     = None
 app.net_manager    = None
+app.meters         = None
+app.demand         = None
+app.meter_bus      = None
 
 eq_mgr  = EQManager()
 net_mgr = NetworkManager()
@@ -208,6 +204,31 @@ app.frontpanel = FrontpanelManager(source_manager=source_mgr)
 app.frontpanel.start()
 app.uart_manager = _UartAdapter(app.frontpanel)
 
+app.meters = MeterPublisher(socketio, source_mgr)
+app.meters.start()
+
+# Ramki level/spectrum także w /dev/shm — dla OLED i innych procesów (modules/meter_bus.py)
+app.meter_bus = MeterBusWriter()
+if not app.meter_bus.open():
+    app.meter_bus = None
+
+def _on_radio_meters(source_id: str):
+    if app.meter_bus:
+        radio = source_mgr.get_source('radio')
+        app.meter_bus.publish(radio.get_level(), {n: radio.get_spectrum(n) for n in BAND_SETS})
+    app.meters.notify(source_id)
+
+source_mgr.get_source('radio')._on_meters = _on_radio_meters
+
+# Analiza level/spectrum tylko gdy ktoś ją ogląda (Web UI, panel z wizualizacją, OLED)
+app.demand = AnalysisDemand(on_change=source_mgr.get_source('radio').set_analysis)
+source_mgr.get_source('radio').set_analysis(False)
+app.frontpanel.on_meters_demand = lambda: app.demand.set('frontpanel', app.frontpanel.wants_meters)
+app.frontpanel.on_meters_demand()   # panel mógł połączyć się już w start(), przed podpięciem
+if app.meter_bus:
+    # Czytelnicy /dev/shm nie mają sesji — ich heartbeat odnawia odbiorcę 'shm' z TTL
+    app.meter_bus.watch_readers(lambda: app.demand.touch('shm'))
+
 bt_source = source_mgr.get_source('bluetooth')
 bt_mgr    = BTManager(bt_source)
 app.bt_manager = bt_mgr
@@ -234,6 +255,28 @@ def ws_connect():
         'uart':   app.uart_manager.connected if app.uart_manager else False,
     })
 
+@socketio.on('disconnect')
+def ws_disconnect():
+    if app.meters:
+        app.meters.unsubscribe(request.sid)
+        app.demand.set(f'web:{request.sid}', False)
+
+@socketio.on('meters_subscribe')
+def ws_meters_subscribe():
+    join_room(METERS_ROOM)
+    n = app.meters.subscribe(request.sid)
+    app.demand.set(f'web:{request.sid}', True)
+    log.debug(f"Meters: +{request.sid} ({n} subskrybentów)")
+    if app.meters.last_frame:
+        emit('meters', app.meters.last_frame)
+
+@socketio.on('meters_unsubscribe')
+def ws_meters_unsubscribe():
+    leave_room(METERS_ROOM)
+    n = app.meters.unsubscribe(request.sid)
+    app.demand.set(f'web:{request.sid}', False)
+    log.debug(f"Meters: -{request.sid} ({n} subskrybentów)")
+
 @socketio.on('play_radio')
 def ws_play_radio(data):
     url          = (data or {}).get('url', '')
@@ -302,6 +345,15 @@ def _status_push():
 
 threading.Thread(target=_status_push, daemon=True, name='status-push').start()
 
+# ── Shutdown ───────────────────────────────────────────────────────────────
+
+def _on_sigterm(signum, frame):
+    """systemd stop → zwykłe wyjście, żeby zadziałały atexit (config, cache okładek)."""
+    log.info("SIGTERM — zapis zaległych zmian i wyjście")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, _on_sigterm)
+
 # ── Main ───────────────────────────────────────────────────────────────────
 
 if __name__ == '__main__':
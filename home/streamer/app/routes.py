@@ -12,6 +12,8 @@ import subprocess
 import time
 from flask import Blueprint, jsonify, request, current_app, send_file
 
+from sources.spectrum import RESOLUTIONS as SPECTRUM_RESOLUTIONS
+
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 STATIONS_FILE = os.path.join(os.path.dirname(__file__), '..', 'radio', 'stations.json')
@@ -154,8 +156,15 @@ def api_volume_set():
 
 # ── Level (VU meter) ───────────────────────────────────────────────────────
 
+def _poll_demand():
+    """Polling HTTP to też odbiorca analizy — odnawiany przy każdym zapytaniu, wygasa sam.
+    Pierwsza odpowiedź po bezczynności bywa jeszcze ciszą (analiza dopiero rusza)."""
+    if current_app.demand:
+        current_app.demand.touch('web-poll')
+
 @bp.route('/level', methods=['GET'])
 def api_level():
+    _poll_demand()
     source = _mgr().active_source
     if source and hasattr(source, 'get_level'):
         return jsonify(source.get_level())
@@ -163,15 +172,23 @@ def api_level():
 
 @bp.route('/spectrum', methods=['GET'])
 def api_spectrum():
+    n_bands = request.args.get('bands', 32, type=int)
+    if n_bands not in SPECTRUM_RESOLUTIONS:
+        return jsonify({'error': f'bands must be one of {list(SPECTRUM_RESOLUTIONS)}'}), 400
+    _poll_demand()
     source = _mgr().active_source
     if source and hasattr(source, 'get_spectrum'):
-        return jsonify({'bands': source.get_spectrum()})
-    return jsonify({'bands': [-60.0] * 32})
+        try:
+            return jsonify({'bands': source.get_spectrum(n_bands)})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify({'bands': [-60.0] * n_bands})
 
 @bp.route('/meters', methods=['GET'])
 def api_meters():
     """Level + Spectrum w jednym requeście."""
     global _last_led_send
+    _poll_demand()
     source = _mgr().active_source
     level = {'rms_l': -60.0, 'rms_r': -60.0, 'peak_l': -60.0, 'peak_r': -60.0}
     bands = [-60.0] * 32
@@ -190,6 +207,29 @@ def api_meters():
     return jsonify({**level, 'bands': bands})
 
 
+@bp.route('/meters/demand', methods=['GET'])
+def api_meters_demand():
+    """Odbiorcy analizy level/spectrum i duty cycle analizy."""
+    return jsonify(current_app.demand.stats() if current_app.demand else {})
+
+@bp.route('/meters/demand', methods=['POST'])
+def api_meters_demand_set():
+    """Zewnętrzny odbiorca (np. OLED) zgłasza czy ogląda pomiary: {"consumer": "oled", "active": true}."""
+    data     = request.get_json(silent=True) or {}
+    consumer = str(data.get('consumer', '')).strip()
+    if not consumer or consumer.startswith('web:') or consumer in ('frontpanel', 'web-poll', 'shm'):
+        return jsonify({'error': 'invalid consumer'}), 400
+    current_app.demand.set(consumer, bool(data.get('active', False)))
+    return jsonify(current_app.demand.stats())
+
+
+@bp.route('/frontpanel/stats', methods=['GET'])
+def api_frontpanel_stats():
+    """Łącze z panelem RP2040: bajty/s i odrzucone ramki per klasa ruchu, przesył okładek."""
+    fp = current_app.frontpanel
+    return jsonify(fp.link_stats() if fp else {})
+
+
 # ── Stream Info ────────────────────────────────────────────────────────────
 
 @bp.route('/stream', methods=['GET'])
@@ -227,6 +267,19 @@ def api_cover_fetch():
     except Exception as e:
         return jsonify({'url': None, 'error': str(e)})
 
+@bp.route('/covers/stats', methods=['GET'])
+def api_cover_stats():
+    """Cache okładek: hit/miss/negative-hit per dostawca, stan circuit breakerów."""
+    from modules.cover_manager import cover_stats
+    return jsonify(cover_stats())
+
+
+@bp.route('/config/stats', methods=['GET'])
+def api_config_stats():
+    """Zapis config.json: liczba zmian / zapisów, opóźnienie zapisu (ostatnie, maksymalne)."""
+    from modules.config_store import get_store
+    return jsonify(get_store().stats())
+
 
 # ── Settings ───────────────────────────────────────────────────────────────
 
@@ -405,6 +458,13 @@ def api_radio_stop():
     return jsonify({'status': 'stopped'})
 
 
+@bp.route('/radio/reconnects', methods=['GET'])
+def api_radio_reconnects():
+    """Historia awarii, reconnectów i czasu odzyskania per stacja."""
+    radio = _mgr().get_source('radio')
+    return jsonify(radio.get_reconnect_stats() if radio else {})
+
+
 # ── Network ─────────────────────────────────────────────────────────────────
 
 @bp.route('/network/status', methods=['GET'])
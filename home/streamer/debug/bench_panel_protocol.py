@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Benchmark ramek meters (JSON vs binarny protokół panelu)
+Sprawdza round-trip encode/decode i porównuje rozmiar + czas kodowania.
+--images: symulacja przesyłu okienkowego okładki (uszkodzone / zgubione kawałki,
+wznowienie po zerwaniu łącza, meters przeplatane z kawałkami).
+
+Użycie:
+  python3 bench_panel_protocol.py
+  python3 bench_panel_protocol.py --frames 10000 --bands 32
+  python3 bench_panel_protocol.py --images --size 60000 --loss 0.03
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from display import panel_protocol as pp
+from display.image_transfer import ImageTransfer
+
+
+def make_bands(n: int) -> list:
+    # Jak RadioSource._log_bands: int dB w zakresie -60..0
+    return [random.randint(-60, 0) for _ in range(n)]
+
+
+def check_roundtrip(frames: list):
+    stream = b''.join(pp.encode_meters(b) for b in frames)
+    # Śmieci na początku — dekoder musi się zsynchronizować
+    buf = bytearray(b'{"evt":"hb"}\n' + stream)
+    out = []
+    while buf:
+        res, used = pp.decode_frame(bytes(buf))
+        if used == 0:
+            break
+        del buf[:used]
+        if res:
+            ftype, payload = res
+            assert ftype == pp.FRAME_METERS
+            out.append(pp.decode_meters(payload))
+    expected = [[int(v) for v in b] for b in frames]
+    assert out == expected, "round-trip mismatch"
+
+    # StreamAssembler: linie JSON i ramki przeplatane, pocięte jak przez read()
+    lines = [f'{{"evt":"img_ack","id":1,"next":{i}}}' for i in range(len(frames))]
+    mixed = b''.join(l.encode() + b'\n' + pp.encode_meters(f) for l, f in zip(lines, frames))
+    asm, got = pp.StreamAssembler(), []
+    i = 0
+    while i < len(mixed):
+        n = random.randint(1, 64)
+        got += asm.feed(mixed[i:i + n])
+        i += n
+    assert [x for k, x in got if k == 'line'] == lines, "assembler: linie"
+    assert [pp.decode_meters(x[1]) for k, x in got if k == 'frame'] == expected, "assembler: ramki"
+    print(f"Round-trip OK: {len(out)} ramek")
+
+
+class FakePanel:
+    """Panel po drugiej stronie łącza: składa obraz, odsyła img_* jak firmware."""
+
+    def __init__(self, loss: float, credit: int = 8):
+        self.loss    = loss
+        self.credit  = credit
+        self.xfer    = None                   # ImageTransfer (odpowiedzi)
+        self.lock    = threading.Lock()
+        self.cut_at  = None                   # po tylu kawałkach "zerwij" łącze
+        self.chunks  = 0
+        self.meters  = 0
+        self.between = 0                      # ramki meters odebrane w trakcie obrazu
+        self.hdr     = None
+        self.buf     = bytearray()
+        self.have    = 0                      # kolejnych poprawnych kawałków
+        self.image   = None
+
+    def reply(self, **evt):
+        evt['id'] = self.hdr[0]
+        threading.Thread(target=self.xfer.on_event, args=(evt,), daemon=True).start()
+
+    def write(self, frame: bytes) -> bool:
+        with self.lock:
+            if self.cut_at is not None and self.chunks >= self.cut_at:
+                return False
+            if random.random() < self.loss:
+                return True                   # zgubiona ramka
+            if random.random() < self.loss:
+                frame = frame[:-9] + bytes([frame[-9] ^ 0x55]) + frame[-8:]   # uszkodzona
+            (res, _used) = pp.decode_frame(frame)
+            if res is None:
+                return True                   # zły CRC ramki — panel ją pomija
+            ftype, payload = res
+            if ftype == pp.FRAME_METERS:
+                self.meters += 1
+                self.between += self.hdr is not None and self.image is None
+            elif ftype == pp.FRAME_IMG_BEGIN:
+                hdr = pp.decode_img_begin(payload)
+                same = self.hdr and self.hdr[2:4] == hdr[2:4]
+                self.hdr, self.image = hdr, None
+                if same and self.have:
+                    self.reply(evt='img_resume', offset=self.have * hdr[4], credit=self.credit)
+                else:
+                    self.buf, self.have = bytearray(), 0
+                    self.reply(evt='img_ack', next=0, credit=self.credit)
+            elif ftype == pp.FRAME_IMG_CHUNK:
+                self.chunks += 1
+                got = pp.decode_img_chunk(payload)
+                if not self.hdr or (got and got[0] != self.hdr[0]):
+                    return True               # kawałek nieznanego przesyłu — pominięty
+                if got is None:
+                    self.reply(evt='img_nack', seq=self.have, credit=self.credit)
+                elif got[1] == self.have:
+                    self.buf += got[2]
+                    self.have += 1
+                    self.reply(evt='img_ack', next=self.have, credit=self.credit)
+                elif got[1] > self.have:
+                    self.reply(evt='img_nack', seq=self.have, credit=self.credit)
+            elif ftype == pp.FRAME_IMG_END:
+                ok = self.have == self.hdr[5] and zlib.crc32(self.buf) == pp.decode_img_end(payload)[1]
+                if ok:
+                    self.image = bytes(self.buf)
+                self.reply(evt='img_done', ok=ok)
+            return True
+
+
+def check_images(size: int, loss: float):
+    data = random.randbytes(size)
+    panel = FakePanel(loss)
+    xfer = ImageTransfer(panel.write, ack_timeout=0.05, max_retries=50)
+    panel.xfer = xfer
+
+    stop = threading.Event()
+    def meters():
+        while not stop.is_set():
+            panel.write(pp.encode_meters(make_bands(32)))
+            time.sleep(0.001)
+    threading.Thread(target=meters, daemon=True).start()
+
+    # 1. Zerwanie łącza w połowie, 2. ponowny przesył → wznowienie od offsetu panelu
+    panel.cut_at = (size // pp.CHUNK_DATA) // 2
+    assert not xfer.send(data)
+    half = panel.have
+    panel.cut_at = None
+    t0 = time.perf_counter()
+    ok = xfer.send(data)
+    dt = time.perf_counter() - t0
+    stop.set()
+
+    assert ok and panel.image == data, "image mismatch"
+    assert xfer.stats['resumed_bytes'] == half * pp.CHUNK_DATA
+    print(f"Obraz OK: {size} B, wznowiono od {half * pp.CHUNK_DATA} B, "
+          f"retransmisje {xfer.stats['retransmits']}, meters w trakcie {panel.between}, {dt * 1000:.0f} ms")
+
+
+def bench(name: str, fn, frames: list):
+    t0 = time.perf_counter()
+    total = 0
+    for b in frames:
+        total += len(fn(b))
+    dt = time.perf_counter() - t0
+    print(f"{name:6s} {total / len(frames):7.1f} B/ramka  {dt / len(frames) * 1e6:7.2f} µs/ramka")
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=5000)
+    ap.add_argument('--bands',  type=int, default=32)
+    ap.add_argument('--images', action='store_true')
+    ap.add_argument('--size',   type=int, default=40000)
+    ap.add_argument('--loss',   type=float, default=0.02)
+    args = ap.parse_args()
+
+    if args.images:
+        check_images(args.size, args.loss)
+        return
+
+    frames = [make_bands(args.bands) for _ in range(args.frames)]
+    check_roundtrip(frames[:200])
+
+    js = bench('JSON', lambda b: json.dumps({"cmd": "meters", "data": b}, ensure_ascii=False).encode('utf-8') + b'\n', frames)
+    bn = bench('BIN',  pp.encode_meters, frames)
+    print(f"Redukcja pasma: {js / bn:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
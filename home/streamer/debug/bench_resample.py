@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Benchmark CPU resamplingu (profile low/medium/high/max + passthrough)
+Dekoduje nagrane strumienie bez synchronizacji zegara i mierzy czas CPU procesu
+względem długości audio: CPU% = czas CPU / czas audio × 100 (na jeden rdzeń).
+
+Użycie:
+  # nagraj 30 s strumienia (surowy MP3/AAC/FLAC tak jak przychodzi z sieci)
+  python3 bench_resample.py --record flac96.bin --url http://stream... --seconds 30
+  # zmierz wszystkie profile przy konwersji do 48 kHz (typowy DAC HiFiBerry)
+  python3 bench_resample.py flac96.bin mp3_44.bin --rate 48000
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sources.radio import Gst, GLib
+from sources.resample_policy import RESAMPLE_PROFILES, detect_profile, cpu_score, board_model
+
+
+def record(path: str, url: str, seconds: int):
+    pipe = Gst.parse_launch(f'souphttpsrc location={url} is-live=true ! filesink location={path}')
+    pipe.set_state(Gst.State.PLAYING)
+    time.sleep(seconds)
+    pipe.send_event(Gst.Event.new_eos())
+    pipe.get_bus().timed_pop_filtered(5 * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipe.set_state(Gst.State.NULL)
+    print(f"Zapisano {os.path.getsize(path) // 1024} kB → {path}")
+
+
+def _run(desc: str):
+    """Uruchom pipeline do EOS → (czas CPU s, czas audio s, rate wejścia)."""
+    pipe = Gst.parse_launch(desc)
+    rate_in = 0
+
+    def on_caps(pad, _pspec):
+        nonlocal rate_in
+        caps = pad.get_current_caps()
+        if caps:
+            rate_in = caps.get_structure(0).get_value('rate') or 0
+
+    pipe.get_by_name('rs').get_static_pad('sink').connect('notify::caps', on_caps)
+    cpu0 = time.process_time()
+    pipe.set_state(Gst.State.PLAYING)
+    msg = pipe.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    cpu = time.process_time() - cpu0
+    ok, pos = pipe.query_position(Gst.Format.TIME)
+    pipe.set_state(Gst.State.NULL)
+    if msg.type == Gst.MessageType.ERROR:
+        err, _ = msg.parse_error()
+        raise RuntimeError(err.message)
+    return cpu, (pos / Gst.SECOND) if ok else 0.0, rate_in
+
+
+def bench_file(path: str, rate: int):
+    def desc(q: int, caps: str) -> str:
+        return (f'filesrc location={path} ! decodebin ! audioconvert ! '
+                f'audioresample name=rs quality={q} ! {caps} ! fakesink sync=false')
+
+    # Bazowy koszt dekodowania: wyjście w rate strumienia (resampler w passthrough)
+    cpu, audio_s, rate_in = _run(desc(4, 'audio/x-raw'))
+    if not audio_s:
+        print(f"{path}: brak danych audio")
+        return
+    print(f"\n{os.path.basename(path)}: {audio_s:.1f} s audio, {rate_in} Hz → {rate} Hz")
+    decode_pct = cpu / audio_s * 100
+    print(f"  {'passthrough':12s} {decode_pct:6.2f}% CPU")
+
+    for name, q in RESAMPLE_PROFILES.items():
+        cpu, audio_s, _ = _run(desc(q, f'audio/x-raw,rate={rate}'))
+        pct = cpu / audio_s * 100
+        print(f"  {name:12s} {pct:6.2f}% CPU  (quality {q:2d}, resampling {pct - decode_pct:+6.2f}%)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('files', nargs='*')
+    ap.add_argument('--record')
+    ap.add_argument('--url',     default='')
+    ap.add_argument('--seconds', type=int, default=30)
+    ap.add_argument('--rate',    type=int, default=48000, help='rate wyjścia (DAC)')
+    args = ap.parse_args()
+
+    if args.record:
+        if not args.url:
+            ap.error('--record wymaga --url')
+        record(args.record, args.url, args.seconds)
+    if not args.files and not args.record:
+        ap.print_help()
+        return
+
+    print(f"Płytka: {board_model() or 'nieznana'}, wynik CPU {cpu_score()} → profil auto: {detect_profile()}")
+    for path in args.files:
+        bench_file(path, args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Benchmark mapowania widma (stary _log_bands vs SpectrumMapper/NumPy)
+Porównuje wynik obu implementacji i czas na ramkę.
+
+Użycie:
+  python3 bench_spectrum.py
+  python3 bench_spectrum.py --frames 5000 --bins 128 --rate 44100
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sources.spectrum import SpectrumMapper
+
+
+class LegacyBands:
+    """Kopia RadioSource._log_bands sprzed wektoryzacji (pętla per pasmo)."""
+
+    def __init__(self):
+        self._prev_bars = None
+
+    def log_bands(self, gst_vals, n_out=32, rate=44100):
+        if self._prev_bars is None:
+            self._prev_bars = [-60.0] * n_out
+        n_in = len(gst_vals)
+        hz_per_band = (rate / 2.0) / n_in
+        BAR_FALLOFF = 0.7
+        GAIN = 1.6
+        result = []
+        for i in range(n_out):
+            f_lo = 20.0 * (20000.0 / 20.0) ** (i / n_out)
+            f_hi = 20.0 * (20000.0 / 20.0) ** ((i + 1) / n_out)
+            idx_lo = max(0, int(f_lo / hz_per_band))
+            idx_hi = min(n_in - 1, int(f_hi / hz_per_band))
+            if idx_hi - idx_lo > 2:
+                current_val = sum(gst_vals[idx_lo:idx_hi+1]) / (idx_hi - idx_lo + 1)
+            else:
+                current_val = max(gst_vals[idx_lo:idx_hi+1]) if idx_lo < idx_hi else gst_vals[idx_lo]
+            current_val = current_val * GAIN
+            if current_val > self._prev_bars[i]:
+                bar_final = current_val
+            else:
+                bar_final = self._prev_bars[i] * BAR_FALLOFF + current_val * (1 - BAR_FALLOFF)
+            self._prev_bars[i] = bar_final
+            result.append(int(max(-60, min(0, bar_final))))
+        return result
+
+
+def make_frames(n: int, bins: int) -> list:
+    # Magnitudy dB jak z elementu 'spectrum' (threshold -60)
+    return [[random.uniform(-60.0, -5.0) for _ in range(bins)] for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=2000)
+    ap.add_argument('--bins',   type=int, default=128)
+    ap.add_argument('--rate',   type=int, default=44100)
+    args = ap.parse_args()
+
+    frames = make_frames(args.frames, args.bins)
+    legacy = LegacyBands()
+    mapper = SpectrumMapper(n_out=32)
+
+    # Zgodność wyników (różnice ±1 dB z float32 vs float64 są akceptowalne)
+    worst = 0
+    for f in frames[:200]:
+        a = legacy.log_bands(f, rate=args.rate)
+        b = mapper.process(f, args.rate).tolist()
+        worst = max(worst, max(abs(x - y) for x, y in zip(a, b)))
+    print(f"Max różnica legacy vs NumPy: {worst} dB")
+
+    legacy = LegacyBands()
+    mapper = SpectrumMapper(n_out=32)
+
+    t0 = time.perf_counter()
+    for f in frames:
+        legacy.log_bands(f, rate=args.rate)
+    t_legacy = (time.perf_counter() - t0) / len(frames)
+
+    t0 = time.perf_counter()
+    for f in frames:
+        mapper.process(f, args.rate)
+    t_numpy = (time.perf_counter() - t0) / len(frames)
+
+    print(f"legacy  {t_legacy * 1e6:8.1f} µs/ramka")
+    print(f"numpy   {t_numpy * 1e6:8.1f} µs/ramka  ({t_legacy / t_numpy:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Benchmark odczytu magnitud z wiadomości GStreamer 'spectrum'
+Odtwarza nagrane struktury i porównuje: get_value / get_list / regex po to_string().
+
+Użycie:
+  # nagraj 300 struktur z radia (lub z audiotestsrc gdy brak URL)
+  python3 bench_spectrum_parse.py --record spectrum.txt --url http://stream... --count 300
+  # odtwórz i zmierz
+  python3 bench_spectrum_parse.py --replay spectrum.txt
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sources.radio import Gst, GLib, _mag_get_value, _mag_get_list, _mag_regex
+
+
+def record(path: str, url: str, count: int):
+    if url:
+        desc = f'uridecodebin uri={url} ! audioconvert ! audioresample ! '
+    else:
+        desc = 'audiotestsrc wave=pink-noise is-live=true ! '
+    desc += ('spectrum bands=128 interval=100000000 threshold=-60 '
+             'post-messages=true message-magnitude=true ! fakesink sync=true')
+    pipe = Gst.parse_launch(desc)
+    loop = GLib.MainLoop()
+    out  = open(path, 'w')
+    n    = 0
+
+    def on_msg(bus, msg):
+        nonlocal n
+        if msg.type == Gst.MessageType.ELEMENT:
+            s = msg.get_structure()
+            if s and s.get_name() == 'spectrum':
+                out.write(s.to_string() + '\n')
+                n += 1
+                if n >= count:
+                    loop.quit()
+        elif msg.type in (Gst.MessageType.ERROR, Gst.MessageType.EOS):
+            loop.quit()
+
+    bus = pipe.get_bus()
+    bus.add_signal_watch()
+    bus.connect('message', on_msg)
+    pipe.set_state(Gst.State.PLAYING)
+    loop.run()
+    pipe.set_state(Gst.State.NULL)
+    out.close()
+    print(f"Zapisano {n} struktur → {path}")
+
+
+def replay(path: str, rounds: int):
+    structs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                s = Gst.Structure.from_string(line)
+                structs.append(s[0] if isinstance(s, tuple) else s)
+    print(f"Wczytano {len(structs)} struktur")
+
+    reference = [_mag_regex(s) for s in structs]
+    for reader in (_mag_get_value, _mag_get_list, _mag_regex):
+        try:
+            vals = [list(reader(s)) for s in structs]
+        except Exception as e:
+            print(f"{reader.__name__:16s} niedostępny: {e}")
+            continue
+        same = all(len(a) == len(b) and all(abs(x - y) < 1e-3 for x, y in zip(a, b))
+                   for a, b in zip(vals, reference))
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for s in structs:
+                reader(s)
+        dt = (time.perf_counter() - t0) / (rounds * len(structs))
+        print(f"{reader.__name__:16s} {dt * 1e6:8.1f} µs/wiadomość  zgodne: {same}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--record')
+    ap.add_argument('--replay')
+    ap.add_argument('--url',    default='')
+    ap.add_argument('--count',  type=int, default=300)
+    ap.add_argument('--rounds', type=int, default=20)
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.url, args.count)
+    if args.replay:
+        replay(args.replay, args.rounds)
+    if not args.record and not args.replay:
+        ap.print_help()
+
+
+if __name__ == '__main__':
+    main()
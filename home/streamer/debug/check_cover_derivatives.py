@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Sprawdzenie powtarzalności pochodnych okładki (Web JPEG / QOI)
+Buduje pochodne dwa razy z tego samego oryginału (render w pamięci + build() na dysk)
+i porównuje bajty. Z --golden porównuje też z zapisanymi wcześniej skrótami SHA-256
+(np. po aktualizacji Pillow / qoi).
+
+Użycie:
+  python3 check_cover_derivatives.py
+  python3 check_cover_derivatives.py --cover ../covers/0123456789ab.jpg
+  python3 check_cover_derivatives.py --save-golden golden.json
+  python3 check_cover_derivatives.py --golden golden.json
+"""
+
+import sys
+import os
+import json
+import hashlib
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from modules import cover_derivatives as cd
+
+
+def make_master(folder: str) -> str:
+    """Syntetyczna okładka 240×240 zapisana jak w cover_manager._download_and_cache."""
+    img = Image.new('RGB', (240, 240))
+    px = img.load()
+    for y in range(240):
+        for x in range(240):
+            px[x, y] = ((x * 255) // 239, (y * 255) // 239, ((x ^ y) * 3) & 0xFF)
+    path = os.path.join(folder, '0123456789ab.jpg')
+    img.save(path, 'JPEG', quality=95)
+    return path
+
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--cover')
+    ap.add_argument('--golden')
+    ap.add_argument('--save-golden')
+    args = ap.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        master = args.cover or make_master(tmp)
+
+        first  = cd.render(master)
+        second = cd.render(master)
+
+        # build() na kopii oryginału w osobnym katalogu — jak odtworzenie pochodnej później
+        copy = os.path.join(tmp, 'copy')
+        os.mkdir(copy)
+        master_copy = os.path.join(copy, os.path.basename(master))
+        with open(master, 'rb') as src, open(master_copy, 'wb') as dst:
+            dst.write(src.read())
+        names = cd.build(master_copy)
+        built = {}
+        for kind in cd.KINDS:
+            with open(os.path.join(copy, cd.derivative_name(cd.cover_id_of(master_copy), kind)), 'rb') as f:
+                built[kind] = f.read()
+        assert len(names) == len(cd.KINDS)
+
+        hashes = {}
+        for kind in cd.KINDS:
+            same = first[kind] == second[kind] == built[kind]
+            ok &= same
+            hashes[kind] = sha(first[kind])
+            print(f"{kind:6s} {len(first[kind]):7d} B  {hashes[kind][:16]}  powtarzalne: {same}")
+
+        # QOI musi się dekodować do 240×240 RGBA
+        import qoi
+        assert qoi.decode(first['panel']).shape == (240, 240, 4)
+
+    if args.save_golden:
+        with open(args.save_golden, 'w') as f:
+            json.dump(hashes, f, indent=2)
+        print(f"Zapisano {args.save_golden}")
+    if args.golden:
+        with open(args.golden) as f:
+            golden = json.load(f)
+        for kind, h in golden.items():
+            match = hashes.get(kind) == h
+            ok &= match
+            print(f"golden {kind:6s} {'OK' if match else 'RÓŻNE'}")
+
+    print("OK" if ok else "BŁĄD: pochodne nie są bajtowo powtarzalne")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+PylonisAmp — Podgląd Meter Bus (/dev/shm) z osobnego procesu
+Czyta ramki level/spectrum zapisywane przez streamer i mierzy koszt odczytu.
+
+Użycie:
+  python3 meter_bus_dump.py              # podgląd na żywo (~30 FPS)
+  python3 meter_bus_dump.py --bench      # koszt read() i liczba ponowień seqlocka
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.meter_bus import MeterBusReader, BUS_PATH
+
+BAR = ' ▁▂▃▄▅▆▇█'
+
+
+def bars(bands) -> str:
+    return ''.join(BAR[max(0, min(8, (b + 60) * 8 // 60))] for b in bands)
+
+
+def live(reader: MeterBusReader, fps: int):
+    last = 0
+    while True:
+        head = reader.head()
+        if head != last:
+            last = head
+            f = reader.read()
+            if f:
+                print(f"\r#{f.frame:7d}  L {f.rms_l:6.1f}/{f.peak_l:6.1f}  R {f.rms_r:6.1f}/{f.peak_r:6.1f}  "
+                      f"{bars(f.bands32)}", end='', flush=True)
+        time.sleep(1.0 / fps)
+
+
+def bench(reader: MeterBusReader, n: int):
+    t0 = time.perf_counter()
+    got = 0
+    for _ in range(n):
+        if reader.read() is not None:
+            got += 1
+    dt = time.perf_counter() - t0
+    print(f"read(): {dt / n * 1e6:.2f} µs  ramek: {got}/{n}  ponowień seqlocka: {reader.retries}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--path',  default=BUS_PATH)
+    ap.add_argument('--fps',   type=int, default=30)
+    ap.add_argument('--bench', action='store_true')
+    ap.add_argument('--reads', type=int, default=200000)
+    args = ap.parse_args()
+
+    reader = MeterBusReader(args.path)
+    if not reader.open():
+        print(f"Brak Meter Bus w {args.path} (streamer nie działa?)")
+        return
+    try:
+        if args.bench:
+            bench(reader, args.reads)
+        else:
+            live(reader, args.fps)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
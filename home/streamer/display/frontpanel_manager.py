@@ -12,12 +12,33 @@ import logging
 import re
 import os
 import struct
-import qoi
-from PIL import Image
-from modules.cover_manager import get_cover
+import fnmatch
+try:
+    import pyudev
+    PYUDEV_OK = True
+except ImportError:
+    PYUDEV_OK = False
+from modules.cover_manager import get_cover, ensure_derivative
+from display import panel_protocol, serial_writer
+from display.image_transfer import ImageTransfer
+from display.panel_state import PanelStateSync
 
 log = logging.getLogger(__name__)
 
+WRITE_TIMEOUT = 1.0     # s — zapis blokuje tylko wątek FP-Write
+READ_TIMEOUT  = 1.0     # s — read() czeka na dane, co tyle sprawdza self.running
+RECONNECT_MIN    = 2.0   # s — minimalny odstęp między próbami otwarcia portu
+RECONNECT_POLL   = 10.0  # s — bez pyudev: odpytywanie portu
+HOTPLUG_FALLBACK = 60.0  # s — z pyudev: zapasowa próba, gdyby zdarzenie umknęło
+HOTPLUG_SETTLE   = 10.0  # s — po zdarzeniu add ponawiaj co RECONNECT_MIN
+HOTPLUG_PATTERN  = '/dev/ttyACM*'
+
+# Klasa ruchu per komenda JSON (reszta → STATE, deduplikowana po nazwie komendy)
+_CMD_CLASS = {
+    'proto':  serial_writer.CONTROL,
+    'meters': serial_writer.METERS,
+}
+
 def safe_text(text):
     if not text: return ""
     return str(text).strip()
@@ -33,50 +54,139 @@ class FrontpanelManager:
         self.viz_modes = ['spectrum', 'uv', 'none']
         self.current_viz_mode_idx = 0
         self.last_reconnect_attempt = 0
-        self._lock = threading.Lock()
+        self._rx = panel_protocol.StreamAssembler()
+        self._plugged = threading.Event()    # udev: pojawił się /dev/ttyACM*
+        self._plugged_node = None
+        self._plugged_at = 0.0
+        self._hotplug = False
+        self.binary_meters = False   # negocjowane w evt 'ready' (firmware z "bin" >= 1)
+        self.chunked_images = False  # przesył okienkowy okładek (firmware z "img" >= 1)
+        self.images = ImageTransfer(self._write_frame)
+        self.writer = serial_writer.SerialWriter(lambda: self.serial, self._on_write_error)
+        # Stan liczony przy wysyłaniu — w kolejce STATE zawsze najwyżej jeden element 'state'
+        self.state_sync = PanelStateSync(
+            lambda render: self.writer.post(serial_writer.STATE, render, key='state'))
+        self.on_meters_demand = None  # fn() — zmiana zapotrzebowania na pomiary (połączenie / tryb viz)
 
     def start(self):
         self.running = True
+        self.writer.start()
         # Wątek do odbierania zdarzeń (np. dotyk) - musi działać niezależnie od wysyłania
         threading.Thread(target=self._read_loop, daemon=True, name="FP-Read").start()
+        if PYUDEV_OK:
+            self._hotplug = True
+            threading.Thread(target=self._hotplug_monitor, daemon=True, name="FP-Hotplug").start()
+        else:
+            log.warning(f"pyudev nie zainstalowane — panel sprawdzany co {RECONNECT_POLL:.0f}s")
         # Wątek do cyklicznego wysyłania widma
         threading.Thread(target=self._send_loop, daemon=True, name="FP-Spectrum").start()
         log.info(f"FrontpanelManager uruchomiony na port USB: {self.port} (Baud: {self.baud})")
 
     def stop(self):
         self.running = False
+        self._plugged.set()
+        self.writer.stop()
+        self.images.cancel()
         if self.serial:
             self.serial.close()
 
+    @property
+    def wants_meters(self) -> bool:
+        """Panel podłączony i wyświetla wizualizację (tryb 'none' nie potrzebuje analizy)."""
+        return bool(self.serial and self.serial.is_open
+                    and self.viz_modes[self.current_viz_mode_idx] != 'none')
+
+    def _demand_changed(self):
+        if self.on_meters_demand:
+            try:
+                self.on_meters_demand()
+            except Exception as e:
+                log.debug(f"on_meters_demand error: {e}")
+
     def _read_loop(self):
+        """Blokujący read() z timeoutem + składanie linii — bezczynne łącze nie zużywa CPU."""
         while self.running:
+            if not self.serial or not self.serial.is_open:
+                if not self._connect():
+                    self._wait_for_port()
+                continue
             try:
-                if not self.serial or not self.serial.is_open:
-                    now = time.time()
-                    if now - self.last_reconnect_attempt < 10:
-                        time.sleep(1)
-                        continue
-                    self.last_reconnect_attempt = now
-                    try:
-                        self.serial = serial.Serial(self.port, self.baud, timeout=0, write_timeout=0)
-                        log.info(f"Połączono z ekranem Pico na {self.port}!")
-                        self.send_current_state()
-                    except Exception:
-                        self.serial = None
-                        continue
-                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    self._handle_incoming(line)
+                data = self.serial.read(self.serial.in_waiting or 1)
             except Exception as e:
                 log.error(f"Błąd USB Pico: {e}")
-                self.serial = None
-                time.sleep(2)
+                self._drop_link()
+                continue
+            for kind, item in self._rx.feed(data):
+                if kind == 'line':
+                    self._handle_incoming(item)
+                else:
+                    log.debug(f"Ramka binarna od panelu: typ {item[0]:#04x}, {len(item[1])} B")
+
+    def _connect(self) -> bool:
+        wait = RECONNECT_MIN - (time.time() - self.last_reconnect_attempt)
+        if wait > 0:
+            time.sleep(wait)                 # łącze pada zaraz po otwarciu — nie kręć się w kółko
+        self.last_reconnect_attempt = time.time()
+        port = self.port
+        if not os.path.exists(port) and self._plugged_node and os.path.exists(self._plugged_node):
+            port = self._plugged_node        # panel wrócił pod inną nazwą (np. ttyACM1)
+        try:
+            self.serial = serial.Serial(port, self.baud, timeout=READ_TIMEOUT, write_timeout=WRITE_TIMEOUT)
+        except Exception:
+            self.serial = None
+            return False
+        self._rx.reset()
+        self.binary_meters = False
+        self.chunked_images = False
+        self.writer.clear()
+        self.state_sync.reset(delta=False)
+        log.info(f"Połączono z ekranem Pico na {port}!")
+        self.send_current_state()
+        self._demand_changed()
+        return True
+
+    def _drop_link(self):
+        try:
+            if self.serial:
+                self.serial.close()
+        except Exception:
+            pass
+        self.serial = None
+        self._demand_changed()
+
+    def _wait_for_port(self):
+        """Czekaj na podłączenie panelu: zdarzenie udev, a bez pyudev — odpytywanie co RECONNECT_POLL s."""
+        if time.time() - self._plugged_at < HOTPLUG_SETTLE:
+            timeout = RECONNECT_MIN          # świeżo podłączony — CDC może jeszcze nie być gotowe
+        else:
+            timeout = HOTPLUG_FALLBACK if self._hotplug else RECONNECT_POLL
+        self._plugged.wait(timeout)
+        self._plugged.clear()
+
+    def _hotplug_monitor(self):
+        try:
+            context = pyudev.Context()
+            monitor = pyudev.Monitor.from_netlink(context)
+            monitor.filter_by('tty')
+            for device in iter(monitor.poll, None):
+                if not self.running:
+                    break
+                node = device.device_node or ''
+                if device.action == 'add' and fnmatch.fnmatch(node, HOTPLUG_PATTERN):
+                    log.info(f"Hotplug: {node}")
+                    self._plugged_node = node
+                    self._plugged_at = time.time()
+                    self._plugged.set()
+        except Exception as e:
+            log.warning(f"Monitor udev niedostępny ({e}) — panel sprawdzany co {RECONNECT_POLL:.0f}s")
+            self._hotplug = False
+            self._plugged.set()
 
     def _send_loop(self):
         """Pętla wysyłająca dane widma (ograniczona do ~30 FPS dla oszczędności CPU)."""
         while self.running:
             start_time = time.time()
-            if self.sm and self.sm.active_source and hasattr(self.sm.active_source, 'get_spectrum'):
+            if self.wants_meters and self.sm and self.sm.active_source and hasattr(self.sm.active_source, 'get_spectrum'):
                 try:
                     spectrum = self.sm.active_source.get_spectrum()
                     if spectrum:
@@ -93,18 +203,50 @@ class FrontpanelManager:
         try:
             data = json.loads(line)
             evt = data.get('evt')
+            if self.images.on_event(data):
+                return
             if evt == 'ready':
+                self._negotiate_protocol(data)
                 self.send_current_state()
                 if self.last_cover_path and os.path.exists(self.last_cover_path):
                     self.send_cover_to_pico(self.last_cover_path)
+            elif evt == 'state_resync':
+                log.debug(f"Panel prosi o pełny stan (seq {data.get('seq')})")
+                self.state_sync.resync()
             elif evt == 'touch':
                 # Przełącz tryb wizualizacji po dotknięciu ekranu
                 self.current_viz_mode_idx = (self.current_viz_mode_idx + 1) % len(self.viz_modes)
                 log.info(f"Touch event: zmiana trybu viz na {self.viz_modes[self.current_viz_mode_idx]}")
                 self.send_current_state()
+                self._demand_changed()
         except Exception as e:
             log.error(f"Błąd podczas obsługi danych przychodzących: {e}")
 
+    def _negotiate_protocol(self, ready: dict):
+        """Włącz binarne ramki meters jeśli firmware je obsługuje, inaczej JSON."""
+        try:
+            fw_bin = int(ready.get('bin', 0))
+        except (TypeError, ValueError):
+            fw_bin = 0
+        self.binary_meters = fw_bin >= panel_protocol.PROTO_VERSION
+        try:
+            fw_img = int(ready.get('img', 0))
+        except (TypeError, ValueError):
+            fw_img = 0
+        self.chunked_images = self.binary_meters and fw_img >= panel_protocol.IMG_PROTO
+        try:
+            fw_delta = int(ready.get('delta', 0))
+        except (TypeError, ValueError):
+            fw_delta = 0
+        self.state_sync.reset(delta=fw_delta >= 1)
+        if self.binary_meters:
+            # Potwierdzenie — firmware przełącza parser dopiero po tej komendzie
+            self._send({"cmd": "proto", "bin": panel_protocol.PROTO_VERSION})
+        mode = f"BIN v{panel_protocol.PROTO_VERSION}" if self.binary_meters else "JSON"
+        img = "okienkowo" if self.chunked_images else "strumień"
+        state = "różnicowo" if fw_delta >= 1 else "pełny"
+        log.info(f"Panel fw {ready.get('fw', '?')}: meters → {mode}, okładki → {img}, stan → {state}")
+
     def send_current_state(self):
         if not self.sm: return
         active_src = self.sm.active_source
@@ -124,16 +266,19 @@ class FrontpanelManager:
             else:
                 title = cleaned_title
 
-        msg = {
-            "cmd": "state",
+        # Do panelu idą tylko pola zmienione od ostatniej wysyłki (panel_state.py)
+        self.state_sync.update({
             "station": safe_text(status.get('station', 'RADIO')),
             "volume": self.sm.get_volume(),
             "title": title,
             "artist": artist,
             "time": status.get('time', '00:00'),
             "mode": self.viz_modes[self.current_viz_mode_idx]
-        }
-        self._send(msg)
+        })
+
+    def send_fast_update(self):
+        """Zmiana głośności z enkodera / Web UI — różnica stanu, ograniczona do MIN_INTERVAL."""
+        self.send_current_state()
 
     def send_cover_to_pico(self, path):
         """Wysyła okładkę w osobnym wątku, aby nie blokować pętli głównej."""
@@ -143,72 +288,67 @@ class FrontpanelManager:
 
     def _do_send_cover(self, path):
         try:
-            log.debug(f"Rozpoczęto kompresję QOI obrazu: {path}")
-            img = Image.open(path).convert('RGBA')
-            # Bilinear jest szybszy od Lanczos na RPi3
-            img = img.resize((240, 240), Image.Resampling.BILINEAR)
-            
-            import numpy as np
-            pixel_data = np.array(img)
-            qoi_data = qoi.encode(pixel_data)
-
-            with self._lock:
-                log.info(f"Wysyłam QOI: {len(qoi_data)} bajtów")
-                self._send_locked({"cmd": "img_qoi", "size": len(qoi_data)})
-                
-                chunk_size = 4096
-                for i in range(0, len(qoi_data), chunk_size):
-                    if not self.serial or not self.serial.is_open: return
-                    try:
-                        if self.serial.out_waiting > 2048:
-                            log.critical("Buffer overflow! Resetting.")
-                            self.serial.reset_output_buffer()
-                            break
-                        
-                        chunk = qoi_data[i:i+chunk_size]
-                        self.serial.write(chunk)
-                        self.serial.flush()
-                        time.sleep(0.0005)
-                    except (serial.SerialException, OSError) as e:
-                        log.error(f"Serial error: {e}")
-                        self.serial = None
-                        return
-                
-                self._send_locked({"cmd": "img_end"})
-            log.debug("Transfer obrazu zakończony.")
+            # QOI liczony raz przy pobraniu okładki (cover_derivatives) — tu tylko bajty z dysku
+            qoi_path = ensure_derivative(path, 'panel')
+            if not qoi_path:
+                return
+            with open(qoi_path, 'rb') as f:
+                qoi_data = f.read()
+
+            if self.chunked_images:
+                # Kawałki w kolejce BULK — meters i stan wyprzedzają je między kawałkami
+                self.images.send(qoi_data)
+                return
+
+            # Stary firmware: nagłówek + surowy strumień + img_end jako jeden element kolejki
+            log.info(f"Wysyłam QOI: {len(qoi_data)} bajtów")
+            blob = (self._encode({"cmd": "img_qoi", "size": len(qoi_data)}) + qoi_data
+                    + self._encode({"cmd": "img_end"}))
+            if not self.writer.post(serial_writer.BULK, blob):
+                log.warning("Kolejka BULK pełna — okładka pominięta")
 
         except Exception as e:
             log.error(f"Błąd przetwarzania okładki: {e}")
 
     def send_meters(self, data: list):
-        self._send({"cmd": "meters", "data": data})
+        if self.binary_meters:
+            self.writer.post(serial_writer.METERS, panel_protocol.encode_meters(data))
+        else:
+            self._send({"cmd": "meters", "data": data})
 
-    def _send(self, msg_dict):
-        with self._lock:
-            self._send_locked(msg_dict)
+    def link_stats(self) -> dict:
+        """Przepływność i odrzucone ramki per klasa ruchu + statystyki przesyłu okładek."""
+        return {
+            'connected':  bool(self.serial and self.serial.is_open),
+            'binary':     self.binary_meters,
+            'chunked':    self.chunked_images,
+            'classes':    self.writer.stats(),
+            'images':     dict(self.images.stats),
+            'state':      self.state_sync.stats(),
+        }
+
+    @staticmethod
+    def _encode(msg_dict) -> bytes:
+        # ensure_ascii=False dla poprawnej obsługi UTF-8
+        return json.dumps(msg_dict, ensure_ascii=False).encode('utf-8') + b'\n'
 
-    def _send_locked(self, msg_dict):
+    def _send(self, msg_dict):
         # FUTURE v0.3 - ENCODER & MENU
         if not self.serial or not self.serial.is_open:
             return
+        payload = self._encode(msg_dict)
+        log.debug(f"Serial write: {payload[:50]}...")
+        cmd = msg_dict.get('cmd', '')
+        # Stan deduplikowany po komendzie: w kolejce zostaje tylko najnowszy "state", "eq"...
+        self.writer.post(_CMD_CLASS.get(cmd, serial_writer.STATE), payload, key=cmd)
 
-        try:
-            if self.serial.out_waiting > 2048:
-                log.critical(f"Buffer overflow in _send_locked: {self.serial.out_waiting}. Resetting.")
-                self.serial.reset_output_buffer()
-                return
+    def _write_frame(self, frame: bytes) -> bool:
+        """Ramka obrazu do kolejki BULK (dla ImageTransfer). False — brak połączenia / pełna kolejka."""
+        if not self.serial or not self.serial.is_open:
+            return False
+        return self.writer.post(serial_writer.BULK, frame)
 
-            # ensure_ascii=False dla poprawnej obsługi UTF-8
-            payload = json.dumps(msg_dict, ensure_ascii=False).encode('utf-8') + b'\n'
-            log.debug(f"Serial write: {payload[:50]}...")
-            self.serial.write(payload)
-            self.serial.flush()
-        except (serial.SerialException, OSError) as e:
-            log.warning(f"Połączenie utracone (Pico) podczas wysyłania JSON: {e}")
-            try:
-                self.serial.close()
-            except:
-                pass
-            self.serial = None
-        except Exception as e:
-            log.error(f"Błąd wysyłania JSON: {e}")
+    def _on_write_error(self, e: Exception):
+        log.warning(f"Połączenie utracone (Pico) podczas wysyłania: {e}")
+        self.writer.clear()
+        self._drop_link()
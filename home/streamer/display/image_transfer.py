@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Okienkowy przesył okładki do panelu RP2040 (ramki FRAME_IMG_* z panel_protocol).
+
+RPi → panel:
+  IMG_BEGIN (id, rozmiar, crc32 całości, rozmiar kawałka, liczba kawałków)
+  IMG_CHUNK (id, seq, crc32 kawałka, dane)   — najwyżej `credit` niepotwierdzonych
+  IMG_END   (id, crc32 całości)
+
+Panel → RPi (linie JSON, jak pozostałe zdarzenia):
+  {"evt":"img_ack",    "id":X, "next":N,   "credit":K}  — ma wszystkie kawałki < N, przyjmie jeszcze K
+  {"evt":"img_nack",   "id":X, "seq":N,    "credit":K}  — zły CRC / dziura od N → powtórz od N
+  {"evt":"img_resume", "id":X, "offset":O, "credit":K}  — ma już O bajtów tego obrazu (ten sam crc32),
+                                                          np. po zerwaniu połączenia → wznów od O
+  {"evt":"img_done",   "id":X, "ok":true}               — obraz złożony, crc32 całości zgodne
+
+Brak odpowiedzi przez ACK_TIMEOUT → powtórka od pierwszego niepotwierdzonego
+kawałka (go-back-N), po MAX_RETRIES kolejnych — przerwanie przesyłu.
+Każda ramka wysyłana osobno (write_frame), więc meters mogą iść pomiędzy kawałkami.
+"""
+
+import time
+import zlib
+import threading
+import logging
+from typing import Callable
+
+from display import panel_protocol as pp
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CREDIT = 4          # kawałków w locie zanim panel poda własne 'credit'
+MAX_CREDIT     = 32
+ACK_TIMEOUT    = 0.5        # s
+DONE_TIMEOUT   = 2.0        # s — złożenie i weryfikacja całości po IMG_END
+MAX_RETRIES    = 5
+
+
+class ImageTransfer:
+    def __init__(self, write_frame: Callable[[bytes], bool], chunk: int = pp.CHUNK_DATA,
+                 ack_timeout: float = ACK_TIMEOUT, max_retries: int = MAX_RETRIES):
+        self.write_frame = write_frame       # fn(bytes) → False gdy łącze padło
+        self.chunk       = chunk
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self._cond   = threading.Condition()
+        self._busy   = threading.Lock()      # jeden przesył naraz; nowy wypiera stary
+        self._gen    = 0
+        self._id     = 0
+        # Stan bieżącego przesyłu (pod _cond)
+        self._base   = 0                     # pierwszy niepotwierdzony kawałek
+        self._next   = 0                     # następny do wysłania
+        self._count  = 0
+        self._events = 0                     # licznik odpowiedzi panelu (do czekania)
+        self._credit = DEFAULT_CREDIT
+        self._done   = None                  # None / True / False
+        self.stats   = {'transfers': 0, 'failed': 0, 'chunks': 0,
+                        'retransmits': 0, 'resumed_bytes': 0, 'last_kbps': 0.0}
+
+    # ── API ────────────────────────────────────────────────────
+
+    def send(self, data: bytes) -> bool:
+        """Wyślij obraz (blokuje do img_done / błędu). Wywołanie z osobnego wątku."""
+        with self._cond:
+            self._gen += 1
+            gen = self._gen
+            self._cond.notify_all()          # poprzedni przesył zauważy zmianę generacji
+        with self._busy:
+            if gen != self._gen:
+                return False                 # w międzyczasie przyszła nowsza okładka
+            ok = self._run(gen, data)
+        self.stats['transfers' if ok else 'failed'] += 1
+        return ok
+
+    def cancel(self):
+        with self._cond:
+            self._gen += 1
+            self._cond.notify_all()
+
+    def on_event(self, evt: dict) -> bool:
+        """Zdarzenie img_* od panelu (z wątku czytającego). False — nie dotyczy przesyłu."""
+        kind = evt.get('evt', '')
+        if not kind.startswith('img_'):
+            return False
+        with self._cond:
+            if evt.get('id') != self._id:
+                return True                  # spóźnione potwierdzenie starego przesyłu
+            if 'credit' in evt:
+                self._credit = max(1, min(MAX_CREDIT, int(evt['credit'])))
+            if kind == 'img_ack':
+                self._base = max(self._base, int(evt.get('next', 0)))
+                self._next = max(self._next, self._base)
+            elif kind == 'img_nack':
+                seq = int(evt.get('seq', self._base))
+                self._base = min(max(self._base, seq), self._count)
+                self._next = self._base
+                self.stats['retransmits'] += 1
+            elif kind == 'img_resume':
+                seq = min(int(evt.get('offset', 0)) // self.chunk, self._count)
+                self.stats['resumed_bytes'] += seq * self.chunk
+                self._base = self._next = max(self._base, seq)
+            elif kind == 'img_done':
+                self._done = bool(evt.get('ok'))
+            self._events += 1
+            self._cond.notify_all()
+        return True
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _run(self, gen: int, data: bytes) -> bool:
+        crc = zlib.crc32(data)
+        with self._cond:
+            self._id     = self._id % 255 + 1
+            xid          = self._id
+            self._count  = (len(data) + self.chunk - 1) // self.chunk
+            self._base   = self._next = 0
+            self._credit = DEFAULT_CREDIT
+            self._done   = None
+            seen         = self._events
+        t0 = time.monotonic()
+        log.info(f"Wysyłam QOI #{xid}: {len(data)} bajtów, {self._count} kawałków")
+
+        # Odpowiedź na BEGIN: img_ack / img_resume z 'credit' (panel może mieć już część obrazu).
+        # Bez niej panel nie zna przesyłu i pominie kawałki — BEGIN powtarzany.
+        for attempt in range(self.max_retries + 1):
+            if not self.write_frame(pp.encode_img_begin(xid, len(data), crc, self.chunk)):
+                return False
+            with self._cond:
+                if self._cond.wait_for(lambda: self._events != seen or gen != self._gen,
+                                       self.ack_timeout):
+                    break
+        else:
+            log.warning(f"QOI #{xid}: panel nie odpowiada na IMG_BEGIN")
+            return False
+
+        retries = 0
+        while True:
+            with self._cond:
+                if gen != self._gen:
+                    log.debug(f"QOI #{xid}: wyparty przez nowszy obraz")
+                    return False
+                if self._base >= self._count:
+                    break
+                todo = range(self._next, min(self._count, self._base + self._credit))
+                self._next = max(self._next, todo.stop)
+                seen = self._events
+            for seq in todo:
+                off = seq * self.chunk
+                if not self.write_frame(pp.encode_img_chunk(xid, seq, data[off:off + self.chunk])):
+                    return False
+                self.stats['chunks'] += 1
+            with self._cond:
+                if self._cond.wait_for(lambda: self._events != seen or gen != self._gen,
+                                       self.ack_timeout):
+                    retries = 0
+                    continue
+                retries += 1
+                if retries > self.max_retries:
+                    log.warning(f"QOI #{xid}: brak potwierdzeń od panelu — przerywam ({self._base}/{self._count})")
+                    return False
+                # Go-back-N: od pierwszego niepotwierdzonego
+                self.stats['retransmits'] += self._next - self._base
+                self._next = self._base
+
+        for _ in range(2):
+            if not self.write_frame(pp.encode_img_end(xid, crc)):
+                return False
+            with self._cond:
+                self._cond.wait_for(lambda: self._done is not None or gen != self._gen, DONE_TIMEOUT)
+                done = self._done
+            if done is not None:
+                break
+        if not done:
+            log.warning(f"QOI #{xid}: panel nie potwierdził całości ({done})")
+            return False
+
+        dt = time.monotonic() - t0
+        self.stats['last_kbps'] = round(len(data) / 1024 / dt, 1) if dt > 0 else 0.0
+        log.debug(f"QOI #{xid}: przesłano w {dt * 1000:.0f} ms ({self.stats['last_kbps']} KB/s)")
+        return True
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Binarny protokół ramek RPi → RP2040 (link USB CDC).
+
+Ramka:
+  [HDR][TYPE][LEN][PAYLOAD × LEN][CRC]
+
+  HDR   — 0xA0 | wersja (v1 = 0xA1); bajt synchronizacji, nigdy nie wystąpi
+          jako pierwszy znak linii JSON ('{' = 0x7B)
+  TYPE  — typ ramki (FRAME_METERS, ...)
+  LEN   — długość payloadu 0..255
+  CRC   — młodszy bajt CRC-32 liczony po TYPE, LEN i PAYLOAD
+
+FRAME_METERS: payload = pasma jako int8 (dB, -60..0), 32 pasma → 36 bajtów
+zamiast ~150–250 bajtów JSON.
+
+FRAME_IMG_BEGIN / FRAME_IMG_CHUNK / FRAME_IMG_END: okładka QOI w kawałkach
+z numerem sekwencyjnym i CRC-32 każdego kawałka (protokół okienkowy —
+display/image_transfer.py). Kawałek mieści się w jednej ramce, więc ramki
+meters mogą iść między kawałkami.
+
+Tryb binarny włączany jest tylko gdy panel w evt 'ready' zgłosi "bin" >= 1;
+stary firmware dostaje dalej JSON. Przesył okienkowy — gdy dodatkowo "img" >= 1.
+"""
+
+import struct
+import zlib
+from typing import List, Optional, Tuple
+
+PROTO_VERSION = 1
+HDR_BASE      = 0xA0
+HDR           = HDR_BASE | PROTO_VERSION
+
+FRAME_METERS    = 0x01
+FRAME_IMG_BEGIN = 0x02
+FRAME_IMG_CHUNK = 0x03
+FRAME_IMG_END   = 0x04
+
+IMG_PROTO     = 1           # wersja przesyłu okienkowego ("img" w evt 'ready')
+IMG_FMT_QOI   = 1
+
+MAX_PAYLOAD   = 255
+
+_IMG_BEGIN    = struct.Struct('<BBIIHH')    # id, format, rozmiar, crc32, rozmiar kawałka, liczba kawałków
+_IMG_CHUNK    = struct.Struct('<BHI')       # id, seq, crc32 danych
+_IMG_END      = struct.Struct('<BI')        # id, crc32 całości
+CHUNK_DATA    = 240                         # ≤ MAX_PAYLOAD - nagłówek kawałka
+
+
+def checksum(data: bytes) -> int:
+    """Najmłodszy bajt CRC-32 (zlib, liczone w C — tanie przy 30 FPS)."""
+    return zlib.crc32(data) & 0xFF
+
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload too long: {len(payload)} > {MAX_PAYLOAD}")
+    body = bytes((frame_type, len(payload))) + payload
+    return bytes((HDR,)) + body + bytes((checksum(body),))
+
+
+def decode_frame(buf: bytes) -> Tuple[Optional[Tuple[int, bytes]], int]:
+    """
+    Zdekoduj jedną ramkę z początku bufora.
+    Zwraca ((type, payload), zużyte_bajty) albo (None, zużyte_bajty):
+      - (None, 0)  — za mało danych, dołóż bajty i spróbuj ponownie
+      - (None, n)  — śmieci / zły CRC, pomiń n bajtów (resync)
+    """
+    if not buf:
+        return None, 0
+    if buf[0] & 0xF0 != HDR_BASE or buf[0] & 0x0F != PROTO_VERSION:
+        return None, 1
+    if len(buf) < 4:
+        return None, 0
+    length = buf[2]
+    total  = 4 + length
+    if len(buf) < total:
+        return None, 0
+    body = bytes(buf[1:3 + length])
+    if checksum(body) != buf[3 + length]:
+        return None, 1
+    return (body[0], body[2:]), total
+
+
+class StreamAssembler:
+    """
+    Przyrostowe składanie danych z łącza: linie JSON ('\\n') i ramki binarne
+    (bajt HDR). feed() przyjmuje dowolnie pocięte kawałki z read() i zwraca
+    kompletne elementy: ('line', str) albo ('frame', (type, payload)).
+    """
+
+    MAX_LINE = 4096
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[str, object]]:
+        buf = self._buf
+        buf += data
+        out = []
+        while buf:
+            if buf[0] & 0xF0 == HDR_BASE:
+                res, used = decode_frame(bytes(buf[:4 + MAX_PAYLOAD]))
+                if used == 0:
+                    break
+                if res:
+                    out.append(('frame', res))
+                del buf[:used]
+                continue
+            nl = buf.find(b'\n')
+            if nl < 0:
+                if len(buf) > self.MAX_LINE:
+                    buf.clear()             # śmieci bez końca linii — resync
+                break
+            line = buf[:nl].decode('utf-8', errors='ignore').strip()
+            del buf[:nl + 1]
+            if line:
+                out.append(('line', line))
+        return out
+
+    def reset(self):
+        self._buf.clear()
+
+
+# ── Meters ─────────────────────────────────────────────────────
+
+def encode_meters(bands: List[float]) -> bytes:
+    """Pasma dB → ramka FRAME_METERS (int8, przycięte do -128..127)."""
+    bands = bands[:MAX_PAYLOAD]
+    try:
+        # Szybka ścieżka: RadioSource oddaje już int w zakresie -60..0
+        packed = struct.pack(f'{len(bands)}b', *bands)
+    except struct.error:
+        packed = bytes([max(-128, min(127, int(v))) & 0xFF for v in bands])
+    return encode_frame(FRAME_METERS, packed)
+
+
+def decode_meters(payload: bytes) -> List[int]:
+    return list(struct.unpack(f'{len(payload)}b', payload))
+
+
+# ── Obraz (przesył okienkowy) ──────────────────────────────────
+
+def encode_img_begin(xfer_id: int, size: int, crc: int, chunk: int = CHUNK_DATA,
+                     fmt: int = IMG_FMT_QOI) -> bytes:
+    count = (size + chunk - 1) // chunk
+    return encode_frame(FRAME_IMG_BEGIN, _IMG_BEGIN.pack(xfer_id, fmt, size, crc, chunk, count))
+
+
+def decode_img_begin(payload: bytes) -> Tuple[int, int, int, int, int, int]:
+    """→ (id, format, rozmiar, crc32, rozmiar kawałka, liczba kawałków)"""
+    return _IMG_BEGIN.unpack(payload)
+
+
+def encode_img_chunk(xfer_id: int, seq: int, data: bytes) -> bytes:
+    return encode_frame(FRAME_IMG_CHUNK, _IMG_CHUNK.pack(xfer_id, seq, zlib.crc32(data)) + data)
+
+
+def decode_img_chunk(payload: bytes) -> Optional[Tuple[int, int, bytes]]:
+    """→ (id, seq, dane) albo None przy złym CRC kawałka."""
+    if len(payload) < _IMG_CHUNK.size:
+        return None
+    xfer_id, seq, crc = _IMG_CHUNK.unpack_from(payload)
+    data = payload[_IMG_CHUNK.size:]
+    if zlib.crc32(data) != crc:
+        return None
+    return xfer_id, seq, data
+
+
+def encode_img_end(xfer_id: int, crc: int) -> bytes:
+    return encode_frame(FRAME_IMG_END, _IMG_END.pack(xfer_id, crc))
+
+
+def decode_img_end(payload: bytes) -> Tuple[int, int]:
+    return _IMG_END.unpack(payload)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Stan panelu RP2040 wysyłany różnicowo.
+
+Model trzyma stan pożądany (ostatni z send_current_state) i stan już wysłany.
+Wiadomość budowana jest dopiero w wątku zapisu (SerialWriter woła render()),
+więc kilka zmian w kolejce zlewa się w jedną różnicę:
+
+  {"cmd":"state","seq":7,"station":"RMF FM","volume":40,...}   pełny stan
+  {"cmd":"state_delta","seq":8,"volume":42}                     tylko zmienione pola
+
+Panel pamięta seq; gdy następna różnica nie ma seq+1 (zgubiona ramka, restart),
+odsyła {"evt":"state_resync"} i dostaje pełny stan. Pola często zmieniane
+(głośność z enkodera, czas) wysyłane są najwyżej raz na MIN_INTERVAL.
+Stary firmware (bez "delta" w evt 'ready') dostaje zawsze pełny stan —
+ale tylko gdy coś się zmieniło.
+"""
+
+import json
+import time
+import threading
+import logging
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+MIN_INTERVAL  = 0.033       # s — jak pętla meters (~30 FPS panelu)
+RATE_LIMITED  = frozenset(('volume', 'time'))
+
+
+class PanelStateSync:
+    def __init__(self, post: Callable[[Callable[[], Optional[bytes]]], None],
+                 min_interval: float = MIN_INTERVAL):
+        self.post         = post             # fn(render) — wstawia render do kolejki STATE
+        self.min_interval = min_interval
+        self._lock    = threading.Lock()
+        self._want    = {}                   # stan pożądany
+        self._sent    = {}                   # stan po ostatniej wysłanej wiadomości
+        self._seq     = 0
+        self._full    = True                 # następna wiadomość — pełny stan
+        self._delta   = False                # firmware obsługuje state_delta
+        self._last    = 0.0                  # czas ostatniego post()
+        self._timer: Optional[threading.Timer] = None
+        self.counters = {'full': 0, 'delta': 0, 'skipped': 0, 'resyncs': 0}
+
+    # ── API ────────────────────────────────────────────────────
+
+    def reset(self, delta: bool):
+        """Nowe połączenie / evt 'ready': następny update() wyśle pełny stan."""
+        with self._lock:
+            self._delta = delta
+            self._sent  = {}
+            self._full  = True
+
+    def resync(self):
+        """Panel zgubił ciągłość seq — wyślij pełny stan."""
+        with self._lock:
+            self._full = True
+            self.counters['resyncs'] += 1
+        self._post_now()
+
+    def update(self, state: dict):
+        with self._lock:
+            self._want = dict(state)
+            changed = {k for k, v in self._want.items() if self._sent.get(k) != v}
+            if not changed and not self._full:
+                return
+            wait = self._last + self.min_interval - time.monotonic()
+            if changed <= RATE_LIMITED and wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._post_now)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self._post_now()
+
+    def render(self) -> Optional[bytes]:
+        """Wiadomość dla panelu z tego, co zmieniło się od ostatniej wysłanej (wątek zapisu)."""
+        with self._lock:
+            if self._full or not self._delta:
+                changed = self._want if (self._full or self._want != self._sent) else {}
+                cmd = 'state'
+            else:
+                changed = {k: v for k, v in self._want.items() if self._sent.get(k) != v}
+                cmd = 'state_delta'
+            if not changed:
+                self.counters['skipped'] += 1
+                return None
+            self._seq += 1
+            self._sent.update(changed)
+            self._full = False
+            self.counters['full' if cmd == 'state' else 'delta'] += 1
+            msg = {'cmd': cmd, 'seq': self._seq, **changed}
+        return json.dumps(msg, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'seq': self._seq, 'delta': self._delta, **self.counters}
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _post_now(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._last = time.monotonic()
+        self.post(self.render)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Wątek zapisu do panelu RP2040 z kolejkami priorytetowymi.
+
+Klasy ruchu (od najważniejszej):
+  CONTROL — negocjacja protokołu, potwierdzenia; nigdy nie gubione (do limitu kolejki)
+  STATE   — stan odtwarzania, EQ, tekst; ta sama komenda (klucz) w kolejce → zostaje najnowsza
+  METERS  — ramki widma; jedno miejsce, nowa ramka nadpisuje niewysłaną
+  BULK    — okładki (kawałki IMG_CHUNK albo cały strumień starego firmware)
+
+Nadawcy tylko wrzucają bajty do kolejki (post) i wracają od razu. Zamiast bajtów
+można podać funkcję — zostanie wywołana dopiero przy wysyłaniu (np. różnica stanu
+liczona od ostatnio wysłanego, panel_state.py); None = nic do wysłania. Jeden wątek
+pisze blokująco (write_timeout) i czeka na opróżnienie bufora (flush), więc
+w buforze systemowym nie zalega nic, co mogłoby wyprzedzić ważniejszą ramkę.
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+CONTROL, STATE, METERS, BULK = range(4)
+CLASS_NAMES = ('control', 'state', 'meters', 'bulk')
+
+MAX_CONTROL  = 64
+MAX_BULK     = 64           # ramek; ImageTransfer i tak trzyma ≤ credit w locie
+RATE_WINDOW  = 5.0          # s — okno liczenia przepływności
+WRITE_SLICE  = 4096         # duże elementy (stary przesył okładki) pisane w kawałkach
+
+
+class SerialWriter:
+    def __init__(self, get_port: Callable, on_error: Callable[[Exception], None]):
+        self.get_port = get_port            # fn() → otwarty serial.Serial albo None
+        self.on_error = on_error            # fn(exc) — łącze padło przy zapisie
+        self._cond    = threading.Condition()
+        self._control = deque()
+        self._state: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._meters: Optional[bytes] = None
+        self._bulk    = deque()
+        self._running = False
+        self._bytes   = [0] * 4
+        self._sent    = [0] * 4
+        self._drops   = [0] * 4             # nadpisane / odrzucone przed wysłaniem
+        self._recent  = [deque() for _ in range(4)]   # [sekunda, bajty] w oknie RATE_WINDOW
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._loop, daemon=True, name="FP-Write").start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    # ── API ────────────────────────────────────────────────────
+
+    def post(self, cls: int, data, key: str = '') -> bool:
+        """Dodaj bajty (albo fn() → bajty) do kolejki klasy cls. False — odrzucone (pełna kolejka)."""
+        with self._cond:
+            if cls == METERS:
+                if self._meters is not None:
+                    self._drops[METERS] += 1
+                self._meters = data
+            elif cls == STATE:
+                if key in self._state:
+                    self._drops[STATE] += 1
+                self._state[key] = data         # pozycja w kolejce zostaje, treść najnowsza
+            else:
+                q, limit = (self._control, MAX_CONTROL) if cls == CONTROL else (self._bulk, MAX_BULK)
+                if len(q) >= limit:
+                    self._drops[cls] += 1
+                    return False
+                q.append(data)
+            self._cond.notify()
+        return True
+
+    def clear(self):
+        """Porzuć wszystko w kolejkach (np. po zerwaniu łącza — nowy panel dostanie stan od nowa)."""
+        with self._cond:
+            n = [len(self._control), len(self._state), self._meters is not None, len(self._bulk)]
+            for cls, k in enumerate(n):
+                self._drops[cls] += k
+            self._control.clear()
+            self._state.clear()
+            self._meters = None
+            self._bulk.clear()
+
+    def stats(self) -> dict:
+        now = int(time.monotonic())
+        out = {}
+        with self._cond:
+            for cls, name in enumerate(CLASS_NAMES):
+                recent = self._recent[cls]
+                while recent and now - recent[0][0] >= RATE_WINDOW:
+                    recent.popleft()
+                out[name] = {
+                    'bytes':   self._bytes[cls],
+                    'frames':  self._sent[cls],
+                    'dropped': self._drops[cls],
+                    'bps':     round(sum(n for _t, n in recent) / RATE_WINDOW),
+                }
+            out['queued'] = len(self._control) + len(self._state) + (self._meters is not None) + len(self._bulk)
+        return out
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _next(self):
+        if self._control:
+            return CONTROL, self._control.popleft()
+        if self._state:
+            return STATE, self._state.popitem(last=False)[1]
+        if self._meters is not None:
+            data, self._meters = self._meters, None
+            return METERS, data
+        if self._bulk:
+            return BULK, self._bulk.popleft()
+        return None, None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running and not (self._control or self._state
+                                             or self._meters is not None or self._bulk):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                cls, data = self._next()
+            if callable(data):
+                try:
+                    data = data()
+                except Exception as e:
+                    log.error(f"Błąd budowania ramki ({CLASS_NAMES[cls]}): {e}")
+                    data = None
+                if not data:
+                    continue
+            port = self.get_port()
+            if not port or not port.is_open:
+                with self._cond:
+                    self._drops[cls] += 1
+                continue
+            try:
+                for i in range(0, len(data), WRITE_SLICE):
+                    port.write(data[i:i + WRITE_SLICE])
+                port.flush()
+            except Exception as e:
+                with self._cond:
+                    self._drops[cls] += 1
+                self.on_error(e)
+                continue
+            with self._cond:
+                self._bytes[cls] += len(data)
+                self._sent[cls]  += 1
+                sec    = int(time.monotonic())
+                recent = self._recent[cls]
+                if recent and recent[-1][0] == sec:
+                    recent[-1][1] += len(data)
+                else:
+                    recent.append([sec, len(data)])
+                    if len(recent) > RATE_WINDOW + 1:
+                        recent.popleft()
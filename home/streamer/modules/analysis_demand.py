@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Rejestr odbiorców pomiarów (level/spectrum) — analiza działa tylko gdy ktoś patrzy.
+
+Odbiorcy to nazwane klucze:
+  - 'web:<sid>'   — klient SocketIO w pokoju 'meters',
+  - 'frontpanel'  — panel RP2040 podłączony i w trybie viz innym niż 'none',
+  - 'oled'        — wyświetlacz OLED z włączonym ekranem (zgłasza się przez REST),
+  - 'web-poll'    — polling HTTP (/api/meters, /api/spectrum, /api/level), z TTL,
+  - 'shm'         — czytelnik Meter Bus z żywym heartbeatem (modules/meter_bus.py), z TTL,
+  - dowolny inny proces przez POST /api/meters/demand.
+
+Odbiorcy bez sesji (polling, /dev/shm) zgłaszają się touch(key, ttl) przy każdym
+odczycie — wygasają sami, gdy przez ttl sekund nikt ich nie odnowi.
+
+Przy zmianie "ktoś / nikt" rejestr woła on_change(bool) — RadioSource
+przełącza valve gałęzi analizy i post-messages elementów level/spectrum.
+Liczy też duty cycle: jaki ułamek czasu analiza była włączona.
+"""
+
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+POLL_TTL = 3.0    # s — odbiorca touch() wygasa po tylu sekundach bez odnowienia
+
+
+class AnalysisDemand:
+    def __init__(self, on_change: Optional[Callable[[bool], None]] = None):
+        self.on_change   = on_change
+        self._consumers: Dict[str, float] = {}    # klucz → monotonic od kiedy
+        self._expiry: Dict[str, float] = {}       # klucz touch() → monotonic wygaśnięcia
+        self._reaper: Optional[threading.Thread] = None
+        self._lock       = threading.Lock()
+        self._t_start    = time.monotonic()
+        self._on_since: Optional[float] = None
+        self._on_total   = 0.0
+        self._switches   = 0
+
+    # ── API ────────────────────────────────────────────────────
+
+    def set(self, key: str, active: bool) -> bool:
+        """Dodaj / usuń odbiorcę. Zwraca czy analiza jest teraz potrzebna."""
+        with self._lock:
+            changed, now_on, n = self._set_locked(key, active)
+        if changed:
+            log.info(f"Analiza {'ON' if now_on else 'OFF'} ({key}, odbiorców: {n})")
+        return now_on
+
+    def touch(self, key: str, ttl: float = POLL_TTL) -> bool:
+        """Odbiorca z TTL — aktywny do ttl s po ostatnim touch(). Zwraca czy analiza działa."""
+        with self._lock:
+            self._expiry[key] = time.monotonic() + ttl
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, daemon=True,
+                                                name='AnalysisDemand-TTL')
+                self._reaper.start()
+            changed, now_on, n = self._set_locked(key, True)
+        if changed:
+            log.info(f"Analiza ON ({key}, odbiorców: {n})")
+        return now_on
+
+    @property
+    def active(self) -> bool:
+        return bool(self._consumers)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._consumers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now     = time.monotonic()
+            on_time = self._on_total + (now - self._on_since if self._on_since is not None else 0.0)
+            elapsed = max(1e-6, now - self._t_start)
+            kinds: Dict[str, int] = {}
+            for key in self._consumers:
+                kind = key.split(':', 1)[0]
+                kinds[kind] = kinds.get(kind, 0) + 1
+            return {
+                'active':      bool(self._consumers),
+                'subscribers': len(self._consumers),
+                'consumers':   kinds,
+                'duty_cycle':  round(on_time / elapsed, 3),
+                'on_seconds':  round(on_time),
+                'uptime':      round(elapsed),
+                'switches':    self._switches,
+            }
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _set_locked(self, key: str, active: bool):
+        was = bool(self._consumers)
+        if active:
+            self._consumers.setdefault(key, time.monotonic())
+        else:
+            self._consumers.pop(key, None)
+            self._expiry.pop(key, None)
+        now_on = bool(self._consumers)
+        if now_on != was:
+            self._account(now_on)
+            # Pod lockiem — dwa szybkie set() nie mogą dojść do źródła w odwrotnej kolejności
+            self._notify(now_on)
+        return now_on != was, now_on, len(self._consumers)
+
+    def _reap_loop(self):
+        while True:
+            with self._lock:
+                now  = time.monotonic()
+                gone = [k for k, t in self._expiry.items() if t <= now]
+                for key in gone:
+                    changed, now_on, n = self._set_locked(key, False)
+                    if changed:
+                        log.info(f"Analiza OFF ({key} wygasł, odbiorców: {n})")
+                nearest = min(self._expiry.values(), default=now + POLL_TTL)
+            time.sleep(min(1.0, max(0.1, nearest - now)))
+
+    def _account(self, now_on: bool):
+        now = time.monotonic()
+        if now_on:
+            self._on_since = now
+        elif self._on_since is not None:
+            self._on_total += now - self._on_since
+            self._on_since = None
+        self._switches += 1
+
+    def _notify(self, active: bool):
+        if self.on_change:
+            try:
+                self.on_change(active)
+            except Exception as e:
+                log.error(f"AnalysisDemand on_change error: {e}")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Config Store — jeden dokument config.json w pamięci dla całego procesu.
+
+Wcześniej SourceManager i EQManager robiły każdy własny odczyt-modyfikację-zapis
+całego pliku (bez blokady, bez atomowej podmiany), a set_volume zapisywał plik
+przy każdym kroku pokrętła. Teraz:
+
+- wszyscy czytają i zmieniają ten sam słownik (set / set_in pod blokadą),
+- zmiany tylko oznaczają klucze jako brudne; wątek ConfigWriter zapisuje
+  po FLUSH_QUIET s bez zmian, ale nie później niż FLUSH_MAX_LAG s od pierwszej
+  niezapisanej zmiany (kręcenie pokrętłem → jeden zapis na FLUSH_MAX_LAG),
+- flush() przy wyjściu (atexit; SIGTERM w app.py zamienia się na normalne wyjście),
+  opóźnienie zapisu mierzone: stats()['last_lag_ms'] / ['max_lag_ms'],
+- zapis: plik tymczasowy + fsync + rename (+ fsync katalogu) — po zaniku
+  zasilania zostaje stary albo nowy config, nigdy ucięty.
+"""
+
+import os
+import copy
+import json
+import time
+import atexit
+import threading
+import logging
+from typing import Any, Optional
+
+log = logging.getLogger(__name__)
+
+CONFIG_PATH    = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+FLUSH_QUIET    = 1.0        # s — zapis po takiej przerwie w zmianach...
+FLUSH_MAX_LAG  = 5.0        # s — ...ale najpóźniej tyle po pierwszej niezapisanej zmianie
+
+
+class ConfigStore:
+    def __init__(self, path: str = CONFIG_PATH, quiet: float = FLUSH_QUIET,
+                 max_lag: float = FLUSH_MAX_LAG):
+        self.path     = os.path.abspath(path)
+        self.quiet    = quiet
+        self.max_lag  = max_lag
+        self._cond    = threading.Condition()
+        self._io      = threading.Lock()     # jeden zapis naraz (wątek ConfigWriter / flush())
+        self._dirty   = set()
+        self._first_dirty = 0.0              # monotonic — pierwsza niezapisana zmiana
+        self._last_change = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {'sets': 0, 'writes': 0, 'errors': 0, 'last_lag_ms': 0, 'max_lag_ms': 0}
+        self.doc      = self._load()
+        atexit.register(self.flush)
+
+    # ── API ────────────────────────────────────────────────────
+
+    def get(self, key: str, default=None) -> Any:
+        """Kopia wartości — zmiany wyłącznie przez set / set_in."""
+        with self._cond:
+            return copy.deepcopy(self.doc.get(key, default))
+
+    def set(self, key: str, value):
+        """Zapisuje kopię — późniejsze zmiany obiektu wołającego nie omijają _mark.
+        TypeError od razu, gdy value nie da się zapisać jako JSON."""
+        value = _checked(key, value)
+        with self._cond:
+            self.doc[key] = value
+            self._mark(key)
+
+    def set_in(self, key: str, subkey: str, value):
+        """doc[key][subkey] = kopia value (np. eq.radio, source_gains.radio). TypeError jak w set()."""
+        value = _checked(f'{key}.{subkey}', value)
+        with self._cond:
+            section = self.doc.get(key)
+            if not isinstance(section, dict):
+                section = self.doc[key] = {}
+            section[subkey] = value
+            self._mark(key)
+
+    def setdefaults(self, defaults: dict):
+        """Uzupełnij brakujące klucze (słowniki — o brakujące podklucze). Nie oznacza zmian."""
+        with self._cond:
+            for k, v in defaults.items():
+                if k not in self.doc:
+                    self.doc[k] = copy.deepcopy(v)
+                elif isinstance(v, dict) and isinstance(self.doc[k], dict):
+                    for sk, sv in v.items():
+                        self.doc[k].setdefault(sk, copy.deepcopy(sv))
+
+    def flush(self):
+        """Zapisz zaległe zmiany teraz (synchronicznie, z wątku wołającego)."""
+        with self._io:
+            with self._cond:
+                if not self._dirty:
+                    return
+                data, keys, since = self._take_locked()
+            self._write(data, keys, since)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = time.monotonic() - self._first_dirty if self._dirty else 0.0
+            return {**self.counters, 'dirty': sorted(self._dirty),
+                    'pending_ms': round(pending * 1000),
+                    'quiet_s': self.quiet, 'max_lag_s': self.max_lag}
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _mark(self, key: str):
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_dirty = now
+        self._last_change = now
+        self._dirty.add(key)
+        self.counters['sets'] += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, daemon=True, name="ConfigWriter")
+            self._thread.start()
+        self._cond.notify()
+
+    def _take_locked(self):
+        data = json.dumps(self.doc, indent=2, ensure_ascii=False)
+        keys, self._dirty = self._dirty, set()
+        return data, keys, self._first_dirty
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+                due  = min(self._last_change + self.quiet, self._first_dirty + self.max_lag)
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)        # kolejne zmiany dołączą do tego zapisu
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                # set() odrzuca wartości nie do serializacji — tu tylko to, czego nie przewidziano
+                log.error(f"ConfigWriter: {e}")
+                with self._cond:
+                    self.counters['errors'] += 1
+                    self._first_dirty = self._last_change = time.monotonic()   # ponowna próba po FLUSH_QUIET
+
+    def _write(self, data: str, keys: set, since: float):
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            dfd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+            try:
+                os.fsync(dfd)
+            finally:
+                os.close(dfd)
+            lag = round((time.monotonic() - since) * 1000)
+            with self._cond:
+                self.counters['writes'] += 1
+                self.counters['last_lag_ms'] = lag
+                self.counters['max_lag_ms']  = max(self.counters['max_lag_ms'], lag)
+            log.debug(f"Config zapisany ({', '.join(sorted(keys))})")
+        except Exception as e:
+            log.error(f"Config save error: {e}")
+            with self._cond:
+                self.counters['errors'] += 1
+                self._first_dirty = min(self._first_dirty, since) if self._dirty else since
+                self._last_change = time.monotonic()     # ponowna próba po FLUSH_QUIET
+                self._dirty |= keys
+                self._cond.notify()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+            log.error(f"Config: {self.path} nie jest obiektem JSON — start z pustym")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # Zachowaj nieczytelny plik — pierwszy zapis nadpisałby go dokumentem z domyślnymi
+            log.error(f"Config load error: {e} — kopia w {self.path}.bad")
+            try:
+                os.replace(self.path, self.path + '.bad')
+            except OSError:
+                pass
+        return {}
+
+
+def _checked(key: str, value):
+    """Kopia value po sprawdzeniu, że przejdzie przez json.dumps — jedna zła wartość
+    w dokumencie blokowałaby każdy następny zapis."""
+    try:
+        json.dumps(value, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        raise TypeError(f"Config {key}: wartość nie do zapisu w JSON: {e}") from None
+    return copy.deepcopy(value)
+
+
+_store: Optional[ConfigStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ConfigStore:
+    """Wspólny magazyn config.json (tworzony przy pierwszym użyciu)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore()
+        return _store
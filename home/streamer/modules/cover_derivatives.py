@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Pochodne okładki — każdy format docelowy liczony raz, przy pobraniu, obok oryginału.
+
+  {id}.jpg        oryginał 240×240 JPEG q95 (źródło wszystkich pochodnych)
+  {id}.web.jpg    Web UI — 240×240 JPEG q80, progresywny, bez metadanych
+  {id}.qoi        panel RP2040 — 240×240 RGBA QOI, wysyłany bajt w bajt
+
+Pochodne powstają zawsze ze zdekodowanego oryginału, więc są bajtowo
+powtarzalne — tak samo przy pobraniu, jak i przy późniejszym odtworzeniu
+(np. dla cache sprzed tego modułu). Sprawdzenie: debug/check_cover_derivatives.py
+"""
+
+import os
+import logging
+from io import BytesIO
+from typing import Dict, List
+
+import numpy as np
+import qoi
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+PANEL_SIZE = (240, 240)
+WEB_QUALITY = 80
+
+KINDS = ('web', 'panel')
+_SUFFIX = {
+    'web':   '.web.jpg',
+    'panel': '.qoi',
+}
+
+
+def derivative_name(cover_id: str, kind: str) -> str:
+    return cover_id + _SUFFIX[kind]
+
+
+def cover_id_of(path: str) -> str:
+    return os.path.basename(path).split('.', 1)[0]
+
+
+def _render_web(img: Image.Image) -> bytes:
+    buf = BytesIO()
+    img.convert('RGB').save(buf, 'JPEG', quality=WEB_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _render_panel(img: Image.Image) -> bytes:
+    rgba = img.convert('RGBA')
+    if rgba.size != PANEL_SIZE:
+        rgba = rgba.resize(PANEL_SIZE, Image.Resampling.BILINEAR)
+    return bytes(qoi.encode(np.asarray(rgba)))
+
+
+_RENDER = {
+    'web':   _render_web,
+    'panel': _render_panel,
+}
+
+
+def render(master_path: str, kinds=KINDS) -> Dict[str, bytes]:
+    """Zdekoduj oryginał raz i policz wybrane pochodne (w pamięci)."""
+    with Image.open(master_path) as im:
+        im.load()
+        return {k: _RENDER[k](im) for k in kinds}
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build(master_path: str, kinds=KINDS) -> List[str]:
+    """Zapisz pochodne obok oryginału. Zwraca nazwy plików (bez katalogu)."""
+    cover_id = cover_id_of(master_path)
+    folder   = os.path.dirname(master_path)
+    names = []
+    for kind, data in render(master_path, kinds).items():
+        name = derivative_name(cover_id, kind)
+        _write_atomic(os.path.join(folder, name), data)
+        names.append(name)
+    log.debug(f'Cover {cover_id}: pochodne {", ".join(names)}')
+    return names
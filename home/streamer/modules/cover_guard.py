@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Ochrona dostawców okładek: negatywny cache, circuit breaker i statystyki per dostawca.
+
+- NegativeCache — trwała pamięć "dostawca X nie ma okładki dla cover_id" z TTL,
+  więc powtórzony tag ICY nie odpala znowu całego łańcucha zapytań,
+- CircuitBreaker — po serii błędów albo 429/503 dostawca jest pomijany
+  przez rosnący czas (albo tyle, ile każe Retry-After), potem jedna próba (half-open),
+- ProviderStats — liczniki hit / miss / negative-hit / błędy / pominięcia.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import logging
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+BREAKER_THRESHOLD = 3        # kolejne błędy → otwarcie
+BREAKER_BASE      = 60.0     # s — pierwsze otwarcie
+BREAKER_CAP       = 3600.0   # s — maksymalna przerwa
+NEG_SAVE_DELAY    = 30.0     # s — zapis negatywnego cache najwyżej co tyle
+NEG_MAX_ENTRIES   = 20000
+
+
+class ProviderError(Exception):
+    """Błąd dostawcy, który liczy się do circuit breakera (5xx, 429, timeout...)."""
+
+    def __init__(self, message: str, status: int = 0, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status      = status
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 base: float = BREAKER_BASE, cap: float = BREAKER_CAP):
+        self.name        = name
+        self.threshold   = threshold
+        self.base        = base
+        self.cap         = cap
+        self.failures    = 0          # kolejne błędy
+        self.trips       = 0          # ile razy otwarty (do backoffu)
+        self.open_until  = 0.0
+        self.half_open   = False
+        self.last_error  = ''
+        self._lock       = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.half_open:
+            return 'half-open'
+        return 'open' if time.time() < self.open_until else 'closed'
+
+    def allow(self) -> bool:
+        """Czy można zapytać dostawcę. Po upływie przerwy przepuszcza jedno zapytanie próbne."""
+        with self._lock:
+            if self.open_until == 0.0:
+                return True
+            if self.half_open or time.time() < self.open_until:
+                return False
+            self.half_open = True
+            return True
+
+    def abandon(self):
+        """Zapytanie próbne anulowane (wygrał inny dostawca) — następne może spróbować znowu."""
+        with self._lock:
+            self.half_open = False
+
+    def success(self):
+        with self._lock:
+            if self.open_until:
+                log.info(f"Cover {self.name}: circuit zamknięty")
+            self.failures   = 0
+            self.trips      = 0
+            self.open_until = 0.0
+            self.half_open  = False
+
+    def failure(self, error: str = '', status: int = 0, retry_after: Optional[float] = None):
+        with self._lock:
+            self.failures  += 1
+            self.last_error = error
+            throttled = status in (429, 503)
+            if not (throttled or self.half_open or self.failures >= self.threshold):
+                return
+            self.trips += 1
+            delay = min(self.cap, self.base * 2 ** (self.trips - 1))
+            delay *= random.uniform(0.8, 1.2)
+            if retry_after:
+                delay = max(delay, min(self.cap, retry_after))
+            self.open_until = time.time() + delay
+            self.half_open  = False
+        log.warning(f"Cover {self.name}: circuit otwarty na {delay:.0f}s ({status or error})")
+
+    def snapshot(self) -> dict:
+        return {
+            'state':       self.state,
+            'failures':    self.failures,
+            'trips':       self.trips,
+            'retry_in':    max(0, round(self.open_until - time.time())),
+            'last_error':  self.last_error,
+        }
+
+
+class NegativeCache:
+    """Klucz (dostawca, cover_id) → czas wygaśnięcia. Plik JSON, zapis z opóźnieniem."""
+
+    def __init__(self, path: str):
+        self.path    = path
+        self._items: Dict[str, float] = {}
+        self._lock   = threading.Lock()
+        self._dirty  = False
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+
+    def has(self, provider: str, cover_id: str) -> bool:
+        key = f'{provider}:{cover_id}'
+        with self._lock:
+            exp = self._items.get(key)
+            if exp is None:
+                return False
+            if exp < time.time():
+                del self._items[key]
+                self._dirty = True
+                return False
+            return True
+
+    def add(self, provider: str, cover_id: str, ttl: float):
+        with self._lock:
+            self._items[f'{provider}:{cover_id}'] = time.time() + ttl
+            if len(self._items) > NEG_MAX_ENTRIES:
+                self._prune_locked()
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(NEG_SAVE_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            self._prune_locked()
+            data = dict(self._items)
+            self._dirty = False
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning(f"Negative cache: zapis nieudany: {e}")
+
+    def _prune_locked(self):
+        now = time.time()
+        self._items = {k: v for k, v in self._items.items() if v > now}
+        if len(self._items) > NEG_MAX_ENTRIES:
+            # Najwcześniej wygasające wypadają pierwsze
+            keep = sorted(self._items.items(), key=lambda kv: kv[1])[-NEG_MAX_ENTRIES:]
+            self._items = dict(keep)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            now = time.time()
+            self._items = {k: float(v) for k, v in data.items() if float(v) > now}
+            log.info(f"Negative cache: {len(self._items)} wpisów")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"Negative cache: nieczytelny {self.path}: {e}")
+
+
+class ProviderStats:
+    FIELDS = ('hits', 'misses', 'negative_hits', 'errors', 'skipped')
+
+    def __init__(self):
+        self._c: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, provider: str, field: str):
+        with self._lock:
+            c = self._c.setdefault(provider, dict.fromkeys(self.FIELDS, 0))
+            c[field] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            out = {}
+            for name, c in self._c.items():
+                lookups = c['hits'] + c['misses'] + c['negative_hits']
+                out[name] = {
+                    **c,
+                    'hit_rate':          round(c['hits'] / lookups, 3) if lookups else None,
+                    'miss_rate':         round(c['misses'] / lookups, 3) if lookups else None,
+                    'negative_hit_rate': round(c['negative_hits'] / lookups, 3) if lookups else None,
+                }
+            return out
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Indeks cache okładek (SQLite) — zamiast glob + stat po całym katalogu covers/.
+
+covers(cover_id → pliki, rozmiar, ostatni dostęp, dostawca)
+
+- odczyt: słownik w pamięci (OrderedDict w kolejności LRU) — O(1), bez Path.exists(),
+- dostęp tylko przesuwa wpis w LRU; last_access trafia do bazy zbiorczo (write-behind),
+- dodanie okładki od razu usuwa najdawniej używane, aż cache zmieści się w budżecie,
+- przy starcie jedno przejście os.scandir() uzgadnia indeks z katalogiem
+  (pliki bez wpisu → dopisane, wpisy bez plików → usunięte, rozmiary poprawione).
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+log = logging.getLogger(__name__)
+
+INDEX_NAME      = 'index.db'
+TOUCH_FLUSH     = 60.0      # s — zapis last_access najwyżej co tyle
+DEFAULT_BUDGET  = 500       # MB
+
+_COVER_FILE = re.compile(r'^([0-9a-f]{12})\.')
+
+
+class _Entry:
+    __slots__ = ('files', 'size', 'last_access', 'provider')
+
+    def __init__(self, files: List[str], size: int, last_access: float, provider: str):
+        self.files       = files
+        self.size        = size
+        self.last_access = last_access
+        self.provider    = provider
+
+
+class CoverIndex:
+    def __init__(self, covers_dir: str, budget_mb: int = DEFAULT_BUDGET):
+        self.dir     = covers_dir
+        self.budget  = budget_mb * 1024 * 1024
+        self.total   = 0
+        self._lru: 'OrderedDict[str, _Entry]' = OrderedDict()   # najstarszy pierwszy
+        self._touched = set()
+        self._lock    = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.evictions = 0
+        self._db = sqlite3.connect(os.path.join(covers_dir, INDEX_NAME), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS covers (
+                                cover_id    TEXT PRIMARY KEY,
+                                files       TEXT NOT NULL,
+                                size        INTEGER NOT NULL,
+                                last_access REAL NOT NULL,
+                                provider    TEXT NOT NULL DEFAULT '')''')
+        self._load()
+
+    # ── API ────────────────────────────────────────────────────
+
+    def lookup(self, cover_id: str) -> Optional[str]:
+        """Ścieżka głównego pliku okładki albo None. Zalicza dostęp (LRU)."""
+        with self._lock:
+            e = self._lru.get(cover_id)
+            if e is None:
+                return None
+            self._lru.move_to_end(cover_id)
+            e.last_access = time.time()
+            self._touched.add(cover_id)
+            self._schedule_flush()
+            return os.path.join(self.dir, e.files[0])
+
+    def file(self, cover_id: str, name: str) -> Optional[str]:
+        """Ścieżka konkretnego pliku okładki (np. pochodnej), jeśli jest w indeksie."""
+        with self._lock:
+            e = self._lru.get(cover_id)
+            if e is None or name not in e.files:
+                return None
+            return os.path.join(self.dir, name)
+
+    def add(self, cover_id: str, files: List[str], provider: str = ''):
+        """Zarejestruj nową okładkę (pierwszy plik = główny) i zmieść się w budżecie."""
+        size = sum(self._size(f) for f in files)
+        now  = time.time()
+        with self._lock:
+            old = self._lru.pop(cover_id, None)
+            if old:
+                self.total -= old.size
+            self._lru[cover_id] = _Entry(list(files), size, now, provider)
+            self.total += size
+            self._db.execute('INSERT OR REPLACE INTO covers VALUES (?,?,?,?,?)',
+                             (cover_id, ' '.join(files), size, now, provider))
+            victims = self._evict_locked(keep=cover_id)
+            self._db.commit()
+        self._unlink(victims)
+
+    def attach(self, cover_id: str, name: str):
+        """Dopisz plik pochodny (np. wersja dla panelu) do istniejącej okładki."""
+        with self._lock:
+            e = self._lru.get(cover_id)
+            if e is None:
+                return
+            if name not in e.files:
+                e.files.append(name)
+            size = sum(self._size(f) for f in e.files)
+            self.total += size - e.size
+            e.size = size
+            self._db.execute('UPDATE covers SET files=?, size=? WHERE cover_id=?',
+                             (' '.join(e.files), e.size, cover_id))
+            victims = self._evict_locked(keep=cover_id)
+            self._db.commit()
+        self._unlink(victims)
+
+    def evict(self, budget_mb: Optional[int] = None) -> int:
+        """Wymuś budżet (np. po jego zmniejszeniu). Zwraca liczbę usuniętych okładek."""
+        with self._lock:
+            if budget_mb is not None:
+                self.budget = budget_mb * 1024 * 1024
+            victims = self._evict_locked()
+            self._db.commit()
+        self._unlink(victims)
+        return len(victims)
+
+    def flush(self):
+        """Zapisz zaległe last_access do bazy."""
+        with self._lock:
+            self._timer = None
+            rows = [(self._lru[c].last_access, c) for c in self._touched if c in self._lru]
+            self._touched.clear()
+            if rows:
+                self._db.executemany('UPDATE covers SET last_access=? WHERE cover_id=?', rows)
+                self._db.commit()
+
+    def stats(self) -> dict:
+        return {
+            'covers':    len(self._lru),
+            'size_mb':   round(self.total / 1048576, 1),
+            'budget_mb': round(self.budget / 1048576),
+            'evictions': self.evictions,
+        }
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _size(self, name: str) -> int:
+        try:
+            return os.stat(os.path.join(self.dir, name)).st_size
+        except OSError:
+            return 0
+
+    def _evict_locked(self, keep: str = '') -> List[List[str]]:
+        victims = []
+        while self.total > self.budget and len(self._lru) > 1:
+            cover_id, e = next(iter(self._lru.items()))
+            if cover_id == keep:
+                self._lru.move_to_end(cover_id)
+                continue
+            del self._lru[cover_id]
+            self._touched.discard(cover_id)
+            self.total -= e.size
+            self._db.execute('DELETE FROM covers WHERE cover_id=?', (cover_id,))
+            victims.append(e.files)
+            self.evictions += 1
+            log.info(f'Cover cache evicted: {cover_id}')
+        return victims
+
+    def _unlink(self, victims: List[List[str]]):
+        for files in victims:
+            for name in files:
+                try:
+                    os.unlink(os.path.join(self.dir, name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    log.warning(f'Cover cache: nie można usunąć {name}: {e}')
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(TOUCH_FLUSH, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _load(self):
+        """Wczytaj indeks i uzgodnij go z katalogiem (jedno przejście scandir)."""
+        t0 = time.monotonic()
+        rows = self._db.execute(
+            'SELECT cover_id, files, size, last_access, provider FROM covers ORDER BY last_access').fetchall()
+
+        on_disk = {}    # cover_id → {nazwa: (rozmiar, mtime)}
+        with os.scandir(self.dir) as it:
+            for de in it:
+                m = _COVER_FILE.match(de.name)
+                if m and not de.name.endswith('.tmp') and de.is_file():
+                    st = de.stat()
+                    on_disk.setdefault(m.group(1), {})[de.name] = (st.st_size, st.st_mtime)
+
+        added = dropped = fixed = 0
+        for cover_id, files, size, last_access, provider in rows:
+            disk  = on_disk.pop(cover_id, None)
+            names = [f for f in files.split() if disk and f in disk]
+            if not names:
+                self._db.execute('DELETE FROM covers WHERE cover_id=?', (cover_id,))
+                dropped += 1
+                continue
+            names += [f for f in disk if f not in names]        # pochodne spoza indeksu
+            real = sum(disk[f][0] for f in names)
+            if names != files.split() or real != size:
+                self._db.execute('UPDATE covers SET files=?, size=? WHERE cover_id=?',
+                                 (' '.join(names), real, cover_id))
+                fixed += 1
+            self._lru[cover_id] = _Entry(names, real, last_access, provider)
+            self.total += real
+
+        # Pliki bez wpisu (np. cache sprzed indeksu) — dostęp = mtime, główny = .jpg
+        orphans = []
+        for cover_id, disk in on_disk.items():
+            names = sorted(disk, key=lambda n: (not n.endswith('.jpg'), len(n)))
+            size  = sum(v[0] for v in disk.values())
+            mtime = max(v[1] for v in disk.values())
+            orphans.append((mtime, cover_id, names, size))
+        for mtime, cover_id, names, size in sorted(orphans):
+            self._db.execute('INSERT OR REPLACE INTO covers VALUES (?,?,?,?,?)',
+                             (cover_id, ' '.join(names), size, mtime, ''))
+            added += 1
+        if orphans:
+            # Kolejność LRU: odtwórz po last_access razem z dopisanymi
+            entries = list(self._lru.items()) + [(c, _Entry(n, s, m, '')) for m, c, n, s in orphans]
+            entries.sort(key=lambda kv: kv[1].last_access)
+            self._lru = OrderedDict(entries)
+            self.total += sum(s for _m, _c, _n, s in orphans)
+
+        victims = self._evict_locked()
+        self._db.commit()
+        self._unlink(victims)
+        log.info(f'Cover index: {len(self._lru)} okładek, {self.total / 1048576:.1f} MB '
+                 f'(+{added} / -{dropped} / ~{fixed}, {(time.monotonic() - t0) * 1000:.0f} ms)')
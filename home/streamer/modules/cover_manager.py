@@ -2,74 +2,142 @@
 PylonisAmp — Cover Manager
 Pobiera okładki albumów i loga stacji radiowych.
 
-Priorytet:
-  1. MusicBrainz Cover Art Archive
-  2. iTunes Search API
-  3. Last.fm API
-  4. Logo stacji radiowej (gdy brak artysty/tytułu)
-  5. placeholder (None)
-
-Cache: streamer/covers/{hash}.jpg  (240×240 JPEG)
+Źródła okładek (MusicBrainz Cover Art Archive, iTunes Search API, Last.fm)
+są odpytywane równolegle — wygrywa pierwszy poprawny wynik, reszta jest anulowana.
+Gdy żadne nie da okładki: logo stacji radiowej (RadioBrowser), potem placeholder (None).
+Last.fm tylko z kluczem (zmienna środowiskowa LASTFM_API_KEY).
+
+Wynik "nie mam" jest pamiętany per dostawca (negatywny cache z TTL, covers/negative.json),
+a dostawca, który się sypie lub dławi (429/503), jest pomijany przez circuit breaker.
+
+Resolver:
+  - ograniczona pula wątków (zamiast wątku na każdą zmianę tytułu),
+  - wspólna requests.Session — keep-alive / pula połączeń per host,
+  - równoczesne żądania o ten sam cover_id są sklejane w jeden Future.
+
+Cache: streamer/covers/{hash}.jpg  (240×240 JPEG), indeks SQLite covers/index.db (LRU, budżet MB)
+Pochodne (Web JPEG, QOI panelu) liczone raz przy pobraniu — cover_derivatives.py
 """
 
 import os
+import atexit
 import hashlib
 import logging
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
 from pathlib import Path
+from typing import Callable, Dict, Optional
 from PIL import Image
 from io import BytesIO
 
+from modules.cover_guard import CircuitBreaker, NegativeCache, ProviderError, ProviderStats
+from modules.cover_index import CoverIndex
+from modules import cover_derivatives
+
 log = logging.getLogger('cover_manager')
 
 COVERS_DIR  = Path(__file__).parent.parent / 'covers'
 COVER_SIZE  = (240, 240)
 JPEG_QUALITY = 95
-HTTP_TIMEOUT = 10  # sekundy
+HTTP_TIMEOUT = 10  # sekundy — pojedyncze żądanie
+RESOLVE_TIMEOUT = 20  # sekundy — cała rozdzielczość okładki dla wywołań blokujących
+PROVIDER_WORKERS = 6  # równoległe żądania do dostawców (3 dostawców × 2 okładki)
+RESOLVE_WORKERS  = 2  # równoległe rozwiązywane okładki
+USER_AGENT   = 'PylonisAmp/1.0 (pylonisamp@localhost)'
+LASTFM_API_KEY  = os.environ.get('LASTFM_API_KEY', '')   # bez klucza Last.fm zawsze odmawia
+NEG_TTL_ALBUM   = 3 * 24 * 3600   # s — "dostawca nie ma okładki tego utworu"
+NEG_TTL_STATION = 7 * 24 * 3600   # s — "brak logo stacji"
+COVER_CACHE_MB  = 500             # budżet katalogu covers/ (LRU)
 
 COVERS_DIR.mkdir(exist_ok=True)
 
 
+# ── HTTP ─────────────────────────────────────────────────────────────────────
+
+def _make_session() -> requests.Session:
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=PROVIDER_WORKERS)
+    s.mount('https://', adapter)
+    s.mount('http://',  adapter)
+    s.headers['User-Agent'] = USER_AGENT
+    return s
+
+_session = _make_session()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _check(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise _Cancelled()
+
+
 # ── Główny interfejs ─────────────────────────────────────────────────────────
 
 def get_cover(artist: str, title: str, station_name: str = '') -> str | None:
     """
     Zwróć ścieżkę do pliku okładki (240×240 JPEG).
-    Jeśli nie ma w cache — pobierz i zapisz.
+    Jeśli nie ma w cache — pobierz i zapisz (blokuje maks. RESOLVE_TIMEOUT).
     Zwróć None jeśli nie udało się pobrać.
     """
-    cover_id = _make_id(artist, title, station_name)
-    cache_path = COVERS_DIR / f'{cover_id}.jpg'
-
-    if cache_path.exists():
-        log.debug(f'Cover cache hit: {cover_id}')
-        return str(cache_path)
-
-    log.info(f'Cover cache miss: {cover_id} — pobieranie...')
-    img_url = None
-
-    if artist and title:
-        # Szukaj okładki albumu
-        img_url = (_try_musicbrainz(artist, title)
-                or _try_itunes(artist, title)
-                or _try_lastfm(artist, title))
-    
-    if not img_url and station_name:
-        # Brak okładki — spróbuj logo stacji
-        img_url = _try_station_logo(station_name)
-
-    if not img_url:
-        log.debug(f'Brak okładki dla: {artist} — {title} / {station_name}')
+    try:
+        return request_cover(artist, title, station_name).result(timeout=RESOLVE_TIMEOUT)
+    except Exception as e:
+        log.debug(f'Cover timeout/błąd: {artist} — {title}: {e}')
         return None
 
-    return _download_and_cache(img_url, cache_path)
+
+def request_cover(artist: str, title: str, station_name: str = '',
+                  callback: Optional[Callable[[Optional[str]], None]] = None) -> Future:
+    """
+    Nieblokujące pobranie okładki → Future ze ścieżką (albo None).
+    callback(path) wołany z wątku puli po zakończeniu.
+    """
+    fut = _resolver.submit(artist, title, station_name)
+    if callback is not None:
+        fut.add_done_callback(lambda f: callback(f.result() if not f.cancelled() and not f.exception() else None))
+    return fut
 
 def get_cover_url(artist: str, title: str, station_name: str = '') -> str | None:
     """Zwróć URL do serwowania przez /api/cover — relative path."""
     path = get_cover(artist, title, station_name)
     if not path:
         return None
-    return f'/api/cover/{os.path.basename(path)}'
+    return cover_url(path)
+
+
+def cover_url(path: str) -> str:
+    """URL wersji Web okładki (pochodna .web.jpg, a gdy jej brak — oryginał)."""
+    web = ensure_derivative(path, 'web')
+    return f'/api/cover/{os.path.basename(web or path)}'
+
+
+def ensure_derivative(path: str, kind: str) -> str | None:
+    """
+    Ścieżka pochodnej okładki ('web' / 'panel').
+    Dla okładek sprzed pochodnych liczy ją raz i dopisuje do indeksu.
+    """
+    cover_id = cover_derivatives.cover_id_of(path)
+    name     = cover_derivatives.derivative_name(cover_id, kind)
+    index    = _resolver.index
+    known    = index.file(cover_id, name)
+    if known and os.path.exists(known):
+        return known
+    if index.file(cover_id, os.path.basename(path)) is None:
+        # Okładka spoza indeksu — najpierw wpis, inaczej pochodna nigdy nie wypadłaby przez LRU
+        if not os.path.exists(path):
+            return None
+        index.add(cover_id, [os.path.basename(path)])
+    try:
+        cover_derivatives.build(path, (kind,))
+    except Exception as e:
+        log.warning(f'Cover {cover_id}: pochodna {kind} nieudana: {e}')
+        return None
+    index.attach(cover_id, name)
+    return os.path.join(os.path.dirname(path), name)
 
 
 def cover_id_for(artist: str, title: str, station_name: str = '') -> str:
@@ -77,119 +145,263 @@ def cover_id_for(artist: str, title: str, station_name: str = '') -> str:
 
 
 # ── Źródła ─────────────────────────────────────────────────────────────────
+# Dostawca zwraca URL albo None ("nie mam"). Błędy sieci / 429 / 5xx → ProviderError
+# (liczone przez circuit breaker, nie zapisywane do negatywnego cache).
 
-def _try_musicbrainz(artist: str, title: str) -> str | None:
-    """MusicBrainz Cover Art Archive."""
+def _retry_after(r) -> Optional[float]:
     try:
-        # Szukaj nagrania
-        url = 'https://musicbrainz.org/ws/2/recording'
-        params = {
-            'query': f'recording:"{title}" AND artist:"{artist}"',
-            'fmt':   'json',
-            'limit': 5,
-        }
-        headers = {'User-Agent': 'PylonisAmp/1.0 (pylonisamp@localhost)'}
-        r = requests.get(url, params=params, headers=headers, timeout=HTTP_TIMEOUT)
-        if r.status_code != 200:
-            return None
+        return float(r.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
 
-        data = r.json()
-        recordings = data.get('recordings', [])
-
-        for rec in recordings:
-            for release in rec.get('releases', []):
-                rid = release.get('id')
-                if not rid:
-                    continue
-                # Sprawdź Cover Art Archive
-                ca_url = f'https://coverartarchive.org/release/{rid}/front-250'
-                try:
-                    cr = requests.head(ca_url, timeout=HTTP_TIMEOUT, allow_redirects=True)
-                    if cr.status_code == 200:
-                        log.debug(f'MusicBrainz cover: {ca_url}')
-                        return ca_url
-                except Exception:
-                    continue
-    except Exception as e:
-        log.debug(f'MusicBrainz error: {e}')
+def _http(method: str, url: str, **kw):
+    try:
+        r = _session.request(method, url, timeout=HTTP_TIMEOUT, **kw)
+    except requests.RequestException as e:
+        raise ProviderError(type(e).__name__)
+    if r.status_code == 429 or r.status_code >= 500:
+        raise ProviderError(f'HTTP {r.status_code}', r.status_code, _retry_after(r))
+    return r
+
+def _try_musicbrainz(artist: str, title: str, cancel: Optional[threading.Event] = None) -> str | None:
+    """MusicBrainz Cover Art Archive."""
+    # Szukaj nagrania
+    r = _http('GET', 'https://musicbrainz.org/ws/2/recording', params={
+        'query': f'recording:"{title}" AND artist:"{artist}"',
+        'fmt':   'json',
+        'limit': 5,
+    })
+    if r.status_code != 200:
+        return None
+
+    for rec in r.json().get('recordings', []):
+        for release in rec.get('releases', []):
+            rid = release.get('id')
+            if not rid:
+                continue
+            # Sprawdź Cover Art Archive
+            ca_url = f'https://coverartarchive.org/release/{rid}/front-250'
+            _check(cancel)
+            cr = _http('HEAD', ca_url, allow_redirects=True)
+            if cr.status_code == 200:
+                log.debug(f'MusicBrainz cover: {ca_url}')
+                return ca_url
     return None
 
-def _try_itunes(artist: str, title: str) -> str | None:
+def _try_itunes(artist: str, title: str, cancel: Optional[threading.Event] = None) -> str | None:
     """iTunes Search API."""
-    try:
-        r = requests.get(
-            'https://itunes.apple.com/search',
-            params={'term': f'{artist} {title}', 'media': 'music', 'limit': 3},
-            timeout=HTTP_TIMEOUT
-        )
-        if r.status_code != 200:
-            return None
-        results = r.json().get('results', [])
-        for item in results:
-            art = item.get('artworkUrl100', '')
-            if art:
-                # Zamień 100x100 na 240x240
-                art = art.replace('100x100', '240x240')
-                log.debug(f'iTunes cover: {art}')
-                return art
-    except Exception as e:
-        log.debug(f'iTunes error: {e}')
+    r = _http('GET', 'https://itunes.apple.com/search',
+              params={'term': f'{artist} {title}', 'media': 'music', 'limit': 3})
+    if r.status_code != 200:
+        return None
+    for item in r.json().get('results', []):
+        art = item.get('artworkUrl100', '')
+        if art:
+            # Zamień 100x100 na 240x240
+            art = art.replace('100x100', '240x240')
+            log.debug(f'iTunes cover: {art}')
+            return art
     return None
 
-def _try_lastfm(artist: str, title: str) -> str | None:
-    """Last.fm API (bez klucza — public endpoint)."""
-    try:
-        r = requests.get(
-            'https://ws.audioscrobbler.com/2.0/',
-            params={
-                'method':  'track.getInfo',
-                'artist':  artist,
-                'track':   title,
-                'api_key': 'LASTFM_API_KEY_PLACEHOLDER',
-                'format':  'json',
-            },
-            timeout=HTTP_TIMEOUT
-        )
-        if r.status_code != 200:
-            return None
-        data = r.json()
-        images = data.get('track', {}).get('album', {}).get('image', [])
-        # Wybierz największy rozmiar
-        for img in reversed(images):
-            url = img.get('#text', '')
-            if url and 'noimage' not in url:
-                log.debug(f'Last.fm cover: {url}')
-                return url
-    except Exception as e:
-        log.debug(f'Last.fm error: {e}')
+def _try_lastfm(artist: str, title: str, cancel: Optional[threading.Event] = None) -> str | None:
+    """Last.fm API (wymaga klucza: LASTFM_API_KEY)."""
+    r = _http('GET', 'https://ws.audioscrobbler.com/2.0/', params={
+        'method':  'track.getInfo',
+        'artist':  artist,
+        'track':   title,
+        'api_key': LASTFM_API_KEY,
+        'format':  'json',
+    })
+    if r.status_code != 200:
+        return None
+    images = r.json().get('track', {}).get('album', {}).get('image', [])
+    # Wybierz największy rozmiar
+    for img in reversed(images):
+        url = img.get('#text', '')
+        if url and 'noimage' not in url:
+            log.debug(f'Last.fm cover: {url}')
+            return url
     return None
 
-def _try_station_logo(station_name: str) -> str | None:
+def _try_station_logo(station_name: str, cancel: Optional[threading.Event] = None) -> str | None:
     """
     Pobierz logo stacji radiowej.
     Używa RadioBrowser API — darmowe, bez klucza.
     """
-    try:
-        r = requests.get(
-            'https://de1.api.radio-browser.info/json/stations/byname/' + 
-            requests.utils.quote(station_name),
-            params={'limit': 3},
-            headers={'User-Agent': 'PylonisAmp/1.0'},
-            timeout=HTTP_TIMEOUT
-        )
-        if r.status_code != 200:
-            return None
-        stations = r.json()
-        for station in stations:
-            favicon = station.get('favicon', '')
-            if favicon and favicon.startswith('http'):
-                log.debug(f'Station logo: {favicon}')
-                return favicon
-    except Exception as e:
-        log.debug(f'Station logo error: {e}')
+    r = _http('GET', 'https://de1.api.radio-browser.info/json/stations/byname/' +
+              requests.utils.quote(station_name), params={'limit': 3})
+    if r.status_code != 200:
+        return None
+    for station in r.json():
+        favicon = station.get('favicon', '')
+        if favicon and favicon.startswith('http'):
+            log.debug(f'Station logo: {favicon}')
+            return favicon
     return None
 
 
+# ── Resolver ───────────────────────────────────────────────────────────────
+
+# nazwa → (funkcja, TTL negatywnego wyniku w s)
+ALBUM_PROVIDERS = {
+    'musicbrainz': (_try_musicbrainz, NEG_TTL_ALBUM),
+    'itunes':      (_try_itunes,      NEG_TTL_ALBUM),
+}
+if LASTFM_API_KEY:
+    ALBUM_PROVIDERS['lastfm'] = (_try_lastfm, NEG_TTL_ALBUM)
+else:
+    log.info('Last.fm pominięty — brak LASTFM_API_KEY')
+STATION_PROVIDER = ('radiobrowser', _try_station_logo, NEG_TTL_STATION)
+
+
+class CoverResolver:
+    """Pula wątków + sklejanie żądań o ten sam cover_id + wyścig dostawców."""
+
+    def __init__(self, providers=None,
+                 resolve_workers: int = RESOLVE_WORKERS, provider_workers: int = PROVIDER_WORKERS):
+        self.providers  = ALBUM_PROVIDERS if providers is None else providers
+        # Osobne pule: rozwiązywanie czeka na dostawców — wspólna pula mogłaby się zakleszczyć
+        self._resolve   = ThreadPoolExecutor(max_workers=resolve_workers,  thread_name_prefix='cover')
+        self._fetch     = ThreadPoolExecutor(max_workers=provider_workers, thread_name_prefix='cover-http')
+        self._inflight: Dict[str, Future] = {}
+        self._lock      = threading.Lock()
+        self.negative   = NegativeCache(str(COVERS_DIR / 'negative.json'))
+        self.breakers   = {name: CircuitBreaker(name) for name in [*self.providers, STATION_PROVIDER[0]]}
+        self.stats      = ProviderStats()
+        self.index      = CoverIndex(str(COVERS_DIR), COVER_CACHE_MB)
+        self.counters   = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'resolved': 0, 'not_found': 0}
+        atexit.register(self.negative.flush)
+        atexit.register(self.index.flush)
+
+    def submit(self, artist: str, title: str, station_name: str = '') -> Future:
+        cover_id = _make_id(artist, title, station_name)
+        self.counters['requests'] += 1
+        cached = self.index.lookup(cover_id)
+        if cached:
+            log.debug(f'Cover cache hit: {cover_id}')
+            self.counters['cache_hits'] += 1
+            fut = Future()
+            fut.set_result(cached)
+            return fut
+
+        with self._lock:
+            fut = self._inflight.get(cover_id)
+            if fut is not None:
+                log.debug(f'Cover w toku — dołączam: {cover_id}')
+                self.counters['coalesced'] += 1
+                return fut
+            fut = self._resolve.submit(self._resolve_one, cover_id, artist, title, station_name)
+            self._inflight[cover_id] = fut
+        fut.add_done_callback(lambda _f: self._done(cover_id))
+        return fut
+
+    def snapshot(self) -> dict:
+        providers = self.stats.snapshot()
+        for name, br in self.breakers.items():
+            providers.setdefault(name, {})['circuit'] = br.snapshot()
+        return {**self.counters, 'negative_entries': len(self.negative),
+                'cache': self.index.stats(), 'providers': providers}
+
+    def _done(self, cover_id: str):
+        with self._lock:
+            self._inflight.pop(cover_id, None)
+
+    def _resolve_one(self, cover_id: str, artist: str, title: str, station_name: str) -> str | None:
+        cached = self.index.lookup(cover_id)
+        if cached:
+            return cached
+        log.info(f'Cover cache miss: {cover_id} — pobieranie...')
+
+        img_url, provider = None, ''
+        if artist and title:
+            img_url, provider = self._race(cover_id, artist, title)
+        if not img_url and station_name:
+            # Brak okładki — spróbuj logo stacji (negatywny wynik wspólny dla wszystkich tytułów stacji)
+            provider, fn, ttl = STATION_PROVIDER
+            img_url = self._call(provider, fn, ttl, _make_id('', '', station_name), (station_name,))
+        if not img_url:
+            log.debug(f'Brak okładki dla: {artist} — {title} / {station_name}')
+            self.counters['not_found'] += 1
+            return None
+        path = _download_and_cache(img_url, COVERS_DIR / f'{cover_id}.jpg')
+        if path:
+            files = [os.path.basename(path)]
+            try:
+                files += cover_derivatives.build(path)
+            except Exception as e:
+                log.warning(f'Cover {cover_id}: pochodne nieudane: {e}')
+            self.index.add(cover_id, files, provider)
+            self.counters['resolved'] += 1
+        return path
+
+    def _call(self, name: str, fn, ttl: float, neg_key: str, args: tuple,
+              cancel: Optional[threading.Event] = None) -> str | None:
+        """Jedno zapytanie do dostawcy przez negatywny cache i circuit breaker."""
+        if self.negative.has(name, neg_key):
+            self.stats.inc(name, 'negative_hits')
+            return None
+        br = self.breakers[name]
+        if not br.allow():
+            self.stats.inc(name, 'skipped')
+            return None
+        try:
+            url = fn(*args, cancel)
+        except _Cancelled:
+            br.abandon()
+            return None
+        except ProviderError as e:
+            br.failure(str(e), e.status, e.retry_after)
+            self.stats.inc(name, 'errors')
+            log.debug(f'{name} error: {e}')
+            return None
+        except Exception as e:
+            br.failure(type(e).__name__)
+            self.stats.inc(name, 'errors')
+            log.debug(f'{name} error: {e}')
+            return None
+        br.success()
+        if url:
+            self.stats.inc(name, 'hits')
+        else:
+            self.stats.inc(name, 'misses')
+            self.negative.add(name, neg_key, ttl)
+        return url
+
+    def _race(self, cover_id: str, artist: str, title: str) -> tuple:
+        """Wszyscy dostawcy naraz — pierwszy poprawny URL wygrywa, reszta anulowana → (url, dostawca)."""
+        cancel  = threading.Event()
+        pending = {}
+        for name, (fn, ttl) in self.providers.items():
+            f = self._fetch.submit(self._call, name, fn, ttl, cover_id, (artist, title), cancel)
+            pending[f] = name
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=RESOLVE_TIMEOUT, return_when=FIRST_COMPLETED)
+                if not done:
+                    log.debug(f'Cover: dostawcy nie odpowiedzieli w {RESOLVE_TIMEOUT}s')
+                    return None, ''
+                for f in done:
+                    name = pending.pop(f)
+                    url  = f.result()
+                    if url:
+                        log.debug(f'Cover: wygrał {name}')
+                        return url, name
+            return None, ''
+        finally:
+            # Niezaczęte zadania wypadają z kolejki, trwające kończą się przy najbliższym _check()
+            cancel.set()
+            for f in pending:
+                f.cancel()
+
+
+_resolver = CoverResolver()
+
+
+def cover_stats() -> dict:
+    """Statystyki resolvera: cache, sklejone żądania, hit/miss/negative-hit per dostawca, circuit."""
+    return _resolver.snapshot()
+
+
 # ── Cache helpers ───────────────────────────────────────────────────────────
 
 def _make_id(artist: str, title: str, station: str) -> str:
@@ -201,7 +413,7 @@ def _make_id(artist: str, title: str, station: str) -> str:
 def _download_and_cache(url: str, path: Path) -> str | None:
     """Pobierz obraz, przeskaluj do 240×240, zapisz jako JPEG."""
     try:
-        r = requests.get(url, timeout=HTTP_TIMEOUT, stream=True)
+        r = _session.get(url, timeout=HTTP_TIMEOUT)
         if r.status_code != 200:
             return None
 
@@ -216,13 +428,6 @@ def _download_and_cache(url: str, path: Path) -> str | None:
         return None
 
 
-def cleanup_cache(max_mb: int = 500):
-    """Usuń najstarsze okładki gdy cache przekracza max_mb MB."""
-    files = sorted(COVERS_DIR.glob('*.jpg'), key=lambda f: f.stat().st_mtime)
-    total = sum(f.stat().st_size for f in files)
-    limit = max_mb * 1024 * 1024
-    while total > limit and files:
-        f = files.pop(0)
-        total -= f.stat().st_size
-        f.unlink()
-        log.info(f'Cover cache evicted: {f.name}')
+def cleanup_cache(max_mb: int = COVER_CACHE_MB) -> int:
+    """Usuń najdawniej używane okładki gdy cache przekracza max_mb MB (z indeksu, bez skanu katalogu)."""
+    return _resolver.index.evict(max_mb)
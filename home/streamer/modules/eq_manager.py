@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 """
 EQ Manager — zarządza nastawnymi 10-pasm EQ per źródło.
-Predefiniowane presety, zapis/odczyt z config.json.
+Predefiniowane presety, zapis/odczyt z config.json (wspólny config_store).
 """
 
-import json
-import os
 import logging
 
-log = logging.getLogger(__name__)
+from modules.config_store import get_store
 
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+log = logging.getLogger(__name__)
 
 EQ_BANDS = ['31Hz','63Hz','125Hz','250Hz','500Hz','1kHz','2kHz','4kHz','8kHz','16kHz']
 
@@ -46,6 +44,7 @@ SOURCE_DEFAULTS = {
 
 class EQManager:
     def __init__(self):
+        self._store = get_store()
         self._eq = self._load()
 
     def get(self, source_id: str) -> list:
@@ -56,7 +55,7 @@ class EQManager:
             raise ValueError("gains must have 10 elements")
         clamped = [max(-24.0, min(12.0, g)) for g in gains]
         self._eq[source_id] = clamped
-        self._save()
+        self._store.set_in('eq', source_id, clamped[:])
         return clamped
 
     def set_band(self, source_id: str, band: int, gain: float) -> list:
@@ -77,12 +76,7 @@ class EQManager:
 
     def get_preset_names(self) -> dict:
         """Zwróć nazwy user presetów."""
-        try:
-            with open(CONFIG_PATH) as f:
-                cfg = json.load(f)
-            names = cfg.get('preset_names', {})
-        except Exception:
-            names = {}
+        names = self._store.get('preset_names', {}) or {}
         return {k: names.get(k, v) for k, v in USER_PRESET_NAMES.items()}
 
     def set_preset_name(self, preset_id: str, name: str) -> str:
@@ -90,16 +84,7 @@ class EQManager:
         if preset_id not in USER_PRESET_NAMES:
             raise ValueError(f"Only user presets can be renamed: {list(USER_PRESET_NAMES)}")
         name = name.strip()[:32]
-        try:
-            with open(CONFIG_PATH) as f:
-                cfg = json.load(f)
-        except Exception:
-            cfg = {}
-        if 'preset_names' not in cfg:
-            cfg['preset_names'] = {}
-        cfg['preset_names'][preset_id] = name
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(cfg, f, indent=2, ensure_ascii=False)
+        self._store.set_in('preset_names', preset_id, name)
         return name
 
     def save_user_preset(self, preset_id: str, gains: list) -> list:
@@ -111,44 +96,16 @@ class EQManager:
         return PRESETS[preset_id][:]
 
     def _save_preset_gains(self, preset_id: str, gains: list):
-        try:
-            with open(CONFIG_PATH) as f:
-                cfg = json.load(f)
-        except Exception:
-            cfg = {}
-        if 'user_presets' not in cfg:
-            cfg['user_presets'] = {}
-        cfg['user_presets'][preset_id] = gains
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(cfg, f, indent=2, ensure_ascii=False)
+        self._store.set_in('user_presets', preset_id, gains[:])
 
     def _load(self) -> dict:
-        try:
-            with open(CONFIG_PATH) as f:
-                cfg = json.load(f)
-            # Wczytaj user preset gains jeśli zapisane
-            for pid in USER_PRESET_NAMES:
-                if pid in cfg.get('user_presets', {}):
-                    PRESETS[pid] = cfg['user_presets'][pid]
-            return cfg.get('eq', {})
-        except Exception:
-            return {}
+        # Wczytaj user preset gains jeśli zapisane
+        user_presets = self._store.get('user_presets', {}) or {}
+        for pid in USER_PRESET_NAMES:
+            if pid in user_presets:
+                PRESETS[pid] = user_presets[pid]
+        eq = self._store.get('eq', {})
+        return eq if isinstance(eq, dict) else {}
 
     def get_band_names(self) -> list:
         return EQ_BANDS[:]
-
-    # ── Persistence ────────────────────────────────────────────
-
-
-    def _save(self):
-        try:
-            try:
-                with open(CONFIG_PATH) as f:
-                    cfg = json.load(f)
-            except Exception:
-                cfg = {}
-            cfg['eq'] = self._eq
-            with open(CONFIG_PATH, 'w') as f:
-                json.dump(cfg, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            log.error(f"EQ save error: {e}")
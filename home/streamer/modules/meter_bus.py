@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Meter Bus — poziomy i widmo w pamięci współdzielonej (/dev/shm) dla innych procesów.
+
+Proces audio (Flask + RadioSource) zapisuje każdą ramkę level/spectrum do pliku
+zmapowanego w pamięci; dowolna liczba czytelników (OLED, inne wyświetlacze)
+mapuje go tylko do odczytu i czyta z częstotliwością ramek — bez HTTP,
+bez locków i bez wywołań systemowych na odczyt (zwykły dostęp do pamięci).
+
+Heartbeat czytelników: analiza radia działa tylko gdy ktoś ją ogląda, a bez niej
+bus stoi na ostatniej ramce. Dlatego head()/read() co HEARTBEAT_INTERVAL s
+odświeżają mtime pliku <BUS_PATH>.hb (jeden utime na sekundę); pisarz w
+watch_readers() sprawdza ten znacznik i zgłasza odbiorcę 'shm' w AnalysisDemand.
+Czytelnik, który przestaje czytać, po kilku sekundach przestaje być odbiorcą.
+
+Układ (little-endian, stały):
+  nagłówek 64 B: magic 'PAMB', wersja u16, liczba slotów u16, rozmiar slotu u32,
+                 pid pisarza u32, [pad], head u64 (numer ostatniej ramki) @16
+  ring slotów po SLOT_SIZE B:
+                 seq u32 (seqlock: nieparzysty = zapis w toku), pad u32,
+                 frame u64, t_ns u64 (CLOCK_MONOTONIC), rms_l rms_r peak_l peak_r f32,
+                 pasma int8 dB: 16 + 32 + 64
+
+Pisarz pisze zawsze do kolejnego slotu ringu, więc czytelnik czytający najnowszą
+ramkę nie ściga się z bieżącym zapisem; seqlock wykrywa rzadki przypadek,
+gdy czytelnik był wolniejszy niż cały ring.
+
+Moduł używa tylko biblioteki standardowej — czytelnik może go zaimportować
+w procesie bez GStreamera/Flaska.
+"""
+
+import os
+import mmap
+import struct
+import threading
+import time
+import logging
+from collections import namedtuple
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+BUS_PATH    = '/dev/shm/pylonisamp-meters'
+BUS_MAGIC   = b'PAMB'
+BUS_VERSION = 1
+BUS_SLOTS   = 8
+BAND_SETS   = (16, 32, 64)
+
+_HDR_FMT     = '<4sHHII'          # magic, wersja, sloty, rozmiar slotu, pid
+_HEAD_OFF    = 16                 # u64 numer ostatniej ramki
+HEADER_SIZE  = 64
+_SEQ_FMT     = '<I'
+_PAYLOAD_OFF = 8
+_PAYLOAD_FMT = '<QQ4f' + ''.join(f'{n}b' for n in BAND_SETS)
+_PAYLOAD     = struct.Struct(_PAYLOAD_FMT)
+HB_SUFFIX    = '.hb'
+HEARTBEAT_INTERVAL = 1.0          # s — co ile czytelnik odświeża heartbeat
+HEARTBEAT_TTL      = 3.0          # s — heartbeat starszy niż to = brak czytelników
+SLOT_SIZE    = (_PAYLOAD_OFF + _PAYLOAD.size + 63) // 64 * 64
+BUS_SIZE     = HEADER_SIZE + BUS_SLOTS * SLOT_SIZE
+
+MeterFrame = namedtuple('MeterFrame', 'frame t_ns rms_l rms_r peak_l peak_r bands16 bands32 bands64')
+
+_FLOOR = -60
+
+
+def _bands(values, n: int):
+    # Szybka ścieżka: SpectrumEngine daje krotki int -60..0 o właściwej długości
+    if values is not None and len(values) == n:
+        return values
+    vals = [max(-128, min(127, int(v))) for v in (values or ())][:n]
+    return vals + [_FLOOR] * (n - len(vals))
+
+
+class MeterBusWriter:
+    """Strona audio — jeden pisarz na plik."""
+
+    def __init__(self, path: str = BUS_PATH, slots: int = BUS_SLOTS):
+        self.path   = path
+        self.slots  = slots
+        self._mm: Optional[mmap.mmap] = None
+        self._seq   = [0] * slots
+        self._frame = 0
+        self._watch: Optional[threading.Thread] = None
+
+    def open(self) -> bool:
+        try:
+            size = HEADER_SIZE + self.slots * SLOT_SIZE
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, size)
+                self._mm = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            finally:
+                os.close(fd)
+            self._mm[:size] = bytes(size)
+            struct.pack_into(_HDR_FMT, self._mm, 0, BUS_MAGIC, BUS_VERSION, self.slots, SLOT_SIZE, os.getpid())
+            self._open_heartbeat()
+            log.info(f"MeterBus: {self.path} ({size} B, {self.slots} slotów)")
+            return True
+        except OSError as e:
+            log.warning(f"MeterBus niedostępny ({self.path}): {e}")
+            self._mm = None
+            return False
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def readers_alive(self, ttl: float = HEARTBEAT_TTL) -> bool:
+        """Czy jakiś czytelnik odświeżył heartbeat w ciągu ostatnich ttl s."""
+        try:
+            return time.time() - os.stat(self.path + HB_SUFFIX).st_mtime < ttl
+        except OSError:
+            return False
+
+    def watch_readers(self, on_alive: Callable[[], None], interval: float = HEARTBEAT_INTERVAL):
+        """Wątek: co interval s woła on_alive() dopóki czytelnicy dają heartbeat."""
+        if self._watch is not None:
+            return
+
+        def loop():
+            while self._mm is not None:
+                if self.readers_alive():
+                    try:
+                        on_alive()
+                    except Exception as e:
+                        log.error(f"MeterBus on_alive error: {e}")
+                time.sleep(interval)
+
+        self._watch = threading.Thread(target=loop, daemon=True, name='MeterBus-Readers')
+        self._watch.start()
+
+    def _open_heartbeat(self):
+        # Czytelnicy zwykle działają jako inny użytkownik — utime wymaga prawa zapisu
+        hb = self.path + HB_SUFFIX
+        try:
+            fd = os.open(hb, os.O_WRONLY | os.O_CREAT, 0o666)
+            try:
+                os.fchmod(fd, 0o666)
+            finally:
+                os.close(fd)
+            os.utime(hb, (0, 0))      # stary znacznik — brak czytelników do pierwszego heartbeatu
+        except OSError as e:
+            log.warning(f"MeterBus: heartbeat czytelników niedostępny ({hb}): {e}")
+
+    def publish(self, level: dict, bands: dict):
+        """level: rms_l/rms_r/peak_l/peak_r dB; bands: {16: [...], 32: [...], 64: [...]}."""
+        mm = self._mm
+        if mm is None:
+            return
+        self._frame += 1
+        i   = self._frame % self.slots
+        off = HEADER_SIZE + i * SLOT_SIZE
+        seq = self._seq[i]
+
+        try:
+            payload = _PAYLOAD.pack(
+                self._frame, time.monotonic_ns(),
+                level.get('rms_l', _FLOOR), level.get('rms_r', _FLOOR),
+                level.get('peak_l', _FLOOR), level.get('peak_r', _FLOOR),
+                *_bands(bands.get(16), 16), *_bands(bands.get(32), 32), *_bands(bands.get(64), 64))
+        except (struct.error, TypeError, ValueError) as e:
+            self._frame -= 1
+            log.debug(f"MeterBus: niepoprawna ramka: {e}")
+            return
+
+        start = off + _PAYLOAD_OFF
+        struct.pack_into(_SEQ_FMT, mm, off, seq + 1)          # nieparzysty — zapis w toku
+        mm[start:start + len(payload)] = payload
+        struct.pack_into(_SEQ_FMT, mm, off, seq + 2)          # parzysty — slot spójny
+        struct.pack_into('<Q', mm, _HEAD_OFF, self._frame)    # dopiero teraz widoczny dla czytelników
+        self._seq[i] = seq + 2
+
+
+class MeterBusReader:
+    """Strona UI — mapowanie tylko do odczytu, dowolnie wielu czytelników."""
+
+    def __init__(self, path: str = BUS_PATH):
+        self.path   = path
+        self._mm: Optional[mmap.mmap] = None
+        self.slots  = 0
+        self.retries = 0
+        self._next_beat = 0.0
+
+    def open(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                self._mm = mmap.mmap(fd, 0, mmap.MAP_SHARED, mmap.PROT_READ)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError):
+            self._mm = None
+            return False
+        magic, version, slots, slot_size, _pid = struct.unpack_from(_HDR_FMT, self._mm, 0)
+        if magic != BUS_MAGIC or version != BUS_VERSION or slot_size != SLOT_SIZE:
+            log.warning(f"MeterBus: niezgodny format {self.path} ({magic!r} v{version})")
+            self.close()
+            return False
+        self.slots = slots
+        return True
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def heartbeat(self):
+        """Zgłoś pisarzowi, że ktoś czyta (wołane samo z head()/read(), max raz na sekundę)."""
+        now = time.monotonic()
+        if now < self._next_beat:
+            return
+        self._next_beat = now + HEARTBEAT_INTERVAL
+        try:
+            os.utime(self.path + HB_SUFFIX)
+        except OSError:
+            pass
+
+    def head(self) -> int:
+        """Numer ostatniej ramki (0 = jeszcze nic) — tani test 'czy coś nowego'."""
+        if self._mm is None:
+            return 0
+        self.heartbeat()
+        return struct.unpack_from('<Q', self._mm, _HEAD_OFF)[0]
+
+    def read(self, tries: int = 4) -> Optional[MeterFrame]:
+        """Najnowsza spójna ramka albo None (brak pisarza / ciągle nadpisywany slot)."""
+        mm = self._mm
+        if mm is None:
+            return None
+        self.heartbeat()
+        for _ in range(tries):
+            head = struct.unpack_from('<Q', mm, _HEAD_OFF)[0]
+            if not head:
+                return None
+            off = HEADER_SIZE + (head % self.slots) * SLOT_SIZE
+            s1  = struct.unpack_from(_SEQ_FMT, mm, off)[0]
+            if s1 & 1:
+                self.retries += 1
+                continue
+            vals = _PAYLOAD.unpack_from(mm, off + _PAYLOAD_OFF)
+            s2  = struct.unpack_from(_SEQ_FMT, mm, off)[0]
+            if s1 != s2 or vals[0] != head:
+                self.retries += 1
+                continue
+            b16 = 6
+            b32 = b16 + BAND_SETS[0]
+            b64 = b32 + BAND_SETS[1]
+            return MeterFrame(vals[0], vals[1], vals[2], vals[3], vals[4], vals[5],
+                              vals[b16:b32], vals[b32:b64], vals[b64:])
+        return None
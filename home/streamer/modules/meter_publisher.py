@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Meter Publisher — jeden nadawca poziomu (VU) i widma dla wszystkich klientów Web UI.
+
+Zamiast pollingu /api/meters co 33 ms z każdej karty przeglądarki:
+  - RadioSource woła notify() z bus message 'level' / 'spectrum' (wątek GLib),
+  - wątek publishera składa jedną ramkę, koduje ją do JSON raz na tick
+    i rozsyła do pokoju SocketIO 'meters'.
+Koszt jest stały niezależnie od liczby otwartych kart.
+"""
+
+import json
+import threading
+import time
+import logging
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+METERS_ROOM = 'meters'
+MAX_FPS     = 30
+
+SILENT_LEVEL = {'rms_l': -60.0, 'rms_r': -60.0, 'peak_l': -60.0, 'peak_r': -60.0}
+
+
+class MeterPublisher:
+    def __init__(self, socketio, source_manager, max_fps: int = MAX_FPS):
+        self._sio          = socketio
+        self.sm            = source_manager
+        self._min_interval = 1.0 / max_fps
+        self._subscribers  = set()          # SocketIO sid subskrybentów
+        self._lock         = threading.Lock()
+        self._event        = threading.Event()
+        self._last_frame: Optional[str] = None
+        self.running       = False
+        self.frames_sent   = 0
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True, name='meter-pub').start()
+        log.info(f"MeterPublisher uruchomiony (max {round(1.0 / self._min_interval)} FPS)")
+
+    def stop(self):
+        self.running = False
+        self._event.set()
+
+    # ── Subskrypcje ────────────────────────────────────────────
+
+    def subscribe(self, sid: str) -> int:
+        with self._lock:
+            self._subscribers.add(sid)
+            return len(self._subscribers)
+
+    def unsubscribe(self, sid: str) -> int:
+        with self._lock:
+            self._subscribers.discard(sid)
+            return len(self._subscribers)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_frame(self) -> Optional[str]:
+        """Ostatnia wysłana ramka (JSON) — np. dla nowego subskrybenta."""
+        return self._last_frame
+
+    # ── Źródło danych ──────────────────────────────────────────
+
+    def notify(self, source_id: str = ''):
+        """Wołane z wątku GLib przy każdym level/spectrum — tylko budzi wątek publishera."""
+        if self._subscribers:
+            self._event.set()
+
+    def _build_frame(self) -> str:
+        source = self.sm.active_source if self.sm else None
+        level  = SILENT_LEVEL
+        bands  = [-60.0] * 32
+        if source:
+            if hasattr(source, 'get_level'):
+                level = source.get_level()
+            if hasattr(source, 'get_spectrum'):
+                bands = source.get_spectrum()
+        return json.dumps({**level, 'bands': bands}, separators=(',', ':'))
+
+    def _loop(self):
+        last = 0.0
+        while self.running:
+            if not self._event.wait(timeout=1.0):
+                continue
+            self._event.clear()
+            if not self._subscribers:
+                continue
+
+            # Limit FPS — kolejne notify() w tym oknie sklejają się w jedną ramkę
+            wait = self._min_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            last = time.monotonic()
+
+            try:
+                frame = self._build_frame()
+                self._last_frame = frame
+                self._sio.emit('meters', frame, to=METERS_ROOM)
+                self.frames_sent += 1
+            except Exception as e:
+                log.debug(f"MeterPublisher emit error: {e}")
@@ -4,12 +4,11 @@ Source Manager — zarządza aktywnym źródłem audio.
 Jedno źródło aktywne na raz. Przełączanie: deactivate stare → activate nowe.
 """
 
-import threading
 import logging
-import json
 import os
 from typing import Optional, Callable, Dict
 
+from modules.config_store import get_store
 from sources.base import AudioSource
 from sources.radio import RadioSource
 from sources.bluetooth import BluetoothSource
@@ -19,11 +18,7 @@ from sources.digital import SpdifSource
 
 log = logging.getLogger(__name__)
 
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-
-
 class SourceManager:
-    _config_lock = threading.Lock()
     def __init__(self,
                  alsa_device: str = 'hw:sndrpihifiberry,0',
                  on_state_change: Optional[Callable] = None,
@@ -32,7 +27,8 @@ class SourceManager:
         self._on_state_change = on_state_change
         self._on_meta_change  = on_meta_change
         self._active: Optional[AudioSource] = None
-        self._config = self._load_config()
+        self._store  = get_store()
+        self._config = self._load_config()      # tylko do odczytu — zmiany przez self._store
 
         common = dict(
             alsa_device     = alsa_device,
@@ -50,6 +46,22 @@ class SourceManager:
             'spdif':     SpdifSource(**common),
         }
 
+        self._sources['radio'].set_warm_standby(
+            self._config.get('radio_warm_standby', True),
+            self._config.get('radio_preconnect', False),
+        )
+        try:
+            self._sources['radio'].set_buffer_profile(self._config.get('radio_buffer_profile', 'default'))
+        except ValueError as e:
+            log.warning(f"Radio buffer: {e}")
+        try:
+            self._sources['radio'].set_resample_profile(
+                self._config.get('radio_resample', 'auto'),
+                self._config.get('resample_per_device', {}),
+            )
+        except ValueError as e:
+            log.warning(f"Radio resample: {e}")
+
         # NIE przywracamy źródła w __init__ — robimy to z app.py po pełnej inicjalizacji
         self._last_source = self._config.get('last_source', 'radio')
 
@@ -141,8 +153,7 @@ class SourceManager:
             new_source.set_volume(vol)
             new_source.set_eq_gains(eq)
             # Zapisz ostatnie źródło
-            self._config['last_source'] = source_id
-            self._save_config(debounce=True)
+            self._store.set('last_source', source_id)
             log.info(f"Active: {source_id}")
         else:
             log.error(f"Nie można aktywować: {source_id}")
@@ -174,8 +185,7 @@ class SourceManager:
 
     def set_volume(self, vol: int):
         """Ustaw głośnosc aktywnego zrodla i zapisz w config."""
-        self._config['volume'] = vol
-        self._save_config()
+        self._store.set('volume', vol)      # na dysk zbiorczo (config_store)
         if self._active:
             self._active.set_volume(vol)
 
@@ -189,10 +199,7 @@ class SourceManager:
     def set_source_gain(self, source_id: str, gain_db: float) -> float:
         """Ustaw gain dla danego zrodla (-10..+6 dB) i zastosuj jezeli aktywne."""
         gain_db = max(-10.0, min(6.0, float(gain_db)))
-        if 'source_gains' not in self._config:
-            self._config['source_gains'] = {}
-        self._config['source_gains'][source_id] = gain_db
-        self._save_config(debounce=True)
+        self._store.set_in('source_gains', source_id, gain_db)
         if self._active and self._active.SOURCE_ID == source_id:
             self._apply_source_gain(self._active, gain_db)
         return gain_db
@@ -215,10 +222,7 @@ class SourceManager:
         """Ustaw EQ dla danego źródła i zapisz."""
         if len(gains) != 10:
             return
-        if 'eq' not in self._config:
-            self._config['eq'] = {}
-        self._config['eq'][source_id] = gains
-        self._save_config(debounce=True)
+        self._store.set_in('eq', source_id, gains)
         src = self._sources.get(source_id)
         if src:
             src.set_eq_gains(gains)
@@ -228,14 +232,11 @@ class SourceManager:
 
     def save_source(self, source_id: str):
         """Zapisz ostatnie aktywne źródło w config."""
-        self._config['last_source'] = source_id
-        self._save_config()
+        self._store.set('last_source', source_id)
 
     def set_config(self, key: str, value):
         """Zapisz dowolny klucz w config (np. last_station_id, loudness)."""
-        self._config[key] = value
-        self._save_config()
-        self._save_config()
+        self._store.set(key, value)
 
     def get_config(self, key: str, default=None):
         return self._config.get(key, default)
@@ -259,6 +260,11 @@ class SourceManager:
             'meter_mode':      'vu',
             'uart_port':       '/dev/ttyAMA0',
             'uart_baud':       115200,
+            'radio_warm_standby': True,
+            'radio_preconnect':   False,
+            'radio_buffer_profile': 'default',
+            'radio_resample':     'auto',
+            'resample_per_device': {},
             'source_gains':    {},
             'eq': {
                 'radio':     [0]*10,
@@ -271,54 +277,13 @@ class SourceManager:
             'user_presets':  {},
             'preset_names':  {},
         }
-        try:
-            with open(CONFIG_PATH) as f:
-                saved = json.load(f)
-            for k, v in saved.items():
-                if isinstance(v, dict) and isinstance(defaults.get(k), dict):
-                    defaults[k].update(v)
-                else:
-                    defaults[k] = v
-            return defaults
-        except Exception:
-            return defaults
-
-    def _save_config(self, debounce: bool = False):
-        """Zapisz config na dysk. debounce=True: max raz na 5s."""
-        import time
-        now = time.monotonic()
-        if debounce and hasattr(self, '_last_save') and (now - self._last_save) < 5.0:
-            self._dirty = True
-            return
-        self._dirty = False
-        self._last_save = now
-        self._do_save()
-
-    def _flush_config(self):
-        if getattr(self, '_dirty', False):
-            self._dirty = False
-            self._do_save()
-
-    def _do_save(self):
-        try:
-            # Odczytaj aktualny config żeby nie nadpisać innych kluczy
-            try:
-                with open(CONFIG_PATH) as f:
-                    current = json.load(f)
-            except Exception:
-                current = {}
-            current.update(self._config)
-            with open(CONFIG_PATH, 'w') as f:
-                json.dump(current, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            log.error(f"Config save error: {e}")
+        # Wspólny dokument z EQManager — brakujące klucze z domyślnych, zapis przy pierwszej zmianie
+        self._store.setdefaults(defaults)
+        return self._store.doc
 
     # ── Callbacks ──────────────────────────────────────────────
 
     def _handle_state(self, source_id: str, state: str):
-        # Resetuj bufor wygładzania przy zmianie stanu
-        if hasattr(self, '_smooth_spectrum'):
-            self._smooth_spectrum = None
         if self._on_state_change:
             self._on_state_change(source_id, state)
 
@@ -329,55 +294,8 @@ class SourceManager:
     def _active_id(self) -> Optional[str]:
         return self._active.SOURCE_ID if self._active else None
 
-    def get_spectrum(self) -> list:
-        """Pobiera widmo, normalizuje i mapuje logarytmicznie na pasma (20Hz - 20kHz)."""
+    def get_spectrum(self, n_bands: int = 16) -> list:
+        """Widmo aktywnego źródła w żądanej rozdzielczości (16/32/64) — tylko odczyt snapshotu."""
         if not self._active or not hasattr(self._active, 'get_spectrum'):
             return []
-        
-        raw = self._active.get_spectrum()
-        if not raw:
-            return []
-
-        import math
-        num_bands = 16
-        bands = [0.0] * num_bands
-        n = len(raw)
-        
-        # Częstotliwości logarytmiczne od ok 20Hz do 20kHz
-        # Zakładamy że raw zawiera wartości w dB (np. -60 do 0)
-        # Rozdzielamy biny FFT na pasma w skali logarytmicznej 20Hz-20kHz
-        # Częstotliwości logarytmiczne od ok 20Hz do 20kHz
-        # Mapowanie binów FFT na pasma (logarithmic distribution)
-        # Biny o niższych częstotliwościach są ważniejsze dla percepcji
-        for i in range(1, n):
-            # i/n to skala liniowa. math.log rozkłada to muzycznie.
-            pos_log = math.log10(i) / math.log10(n)
-            band_idx = int(pos_log * num_bands)
-            if band_idx < 0: band_idx = 0
-            if band_idx >= num_bands: band_idx = num_bands - 1
-            
-            val = float(raw[i])
-            # Skalowanie logarytmiczne amplitudy (jeśli raw nie jest w dB)
-            # val = 20 * math.log10(max(1e-6, val))
-            if val > bands[band_idx]:
-                bands[band_idx] = val
-
-        if not hasattr(self, '_smooth_spectrum') or self._smooth_spectrum is None or len(self._smooth_spectrum) != num_bands:
-            self._smooth_spectrum = [0.0] * num_bands
-            
-        for i in range(num_bands):
-            target = bands[i]
-            # EMA Smoothing + Pro Decay
-            if target > self._smooth_spectrum[i]:
-                # Szybki atak: responsywność na rytm
-                self._smooth_spectrum[i] = (self._smooth_spectrum[i] * 0.2) + (target * 0.8)
-            else:
-                # Wolniejszy opad: efekt "analogowy"
-                self._smooth_spectrum[i] *= 0.88
-                self._smooth_spectrum[i] -= 0.2
-            
-            self._smooth_spectrum[i] = max(0.0, self._smooth_spectrum[i])
-            
-            self._smooth_spectrum[i] = max(0.0, self._smooth_spectrum[i])
-            
-        return [int(v) for v in self._smooth_spectrum]
+        return self._active.get_spectrum(n_bands)
@@ -9,11 +9,16 @@ gi.require_version('Gst', '1.0')
 gi.require_version('GLib', '2.0')
 from gi.repository import Gst, GLib
 
+import os
+import json
 import threading
 import logging
 import time
-from typing import Optional
+from typing import Optional, Dict
 from .base import AudioSource
+from .spectrum import SpectrumEngine
+from .reconnect import ReconnectScheduler
+from .resample_policy import RESAMPLE_PROFILES, resolve_profile, describe_path
 
 Gst.init(None)
 log = logging.getLogger(__name__)
@@ -24,53 +29,130 @@ EQ_BANDS      = [60, 170, 310, 600, 1000, 3000, 6000, 12000, 14000, 16000]
 EQ_BAND_NAMES = ['60Hz','170Hz','310Hz','600Hz','1kHz','3kHz','6kHz','12kHz','14kHz','16kHz']
 FLAT_PRESET   = [0.0] * 10
 
+STATIONS_FILE = os.path.join(os.path.dirname(__file__), '..', 'radio', 'stations.json')
+MAX_STANDBY   = 2     # ile ulubionych stacji trzymać podłączonych w tle (prev/next)
+
+# Bufor sieciowy (queue2 między souphttpsrc a decodebin).
+# low/high — watermarki w % bufora: pauza gdy poziom spadnie poniżej low,
+# wznowienie dopiero po napełnieniu do high (histereza zamiast przełączania co komunikat).
+# Stacja może wskazać profil ("buffer": "wifi") albo nadpisać pola ("buffer": {"time_ms": 6000}).
+BUFFER_PROFILES = {
+    'low':     {'time_ms': 1000, 'bytes_kb':  512, 'low_pct': 10, 'high_pct': 60},
+    'default': {'time_ms': 3000, 'bytes_kb': 2048, 'low_pct': 10, 'high_pct': 80},
+    'wifi':    {'time_ms': 8000, 'bytes_kb': 4096, 'low_pct': 20, 'high_pct': 90},
+    'hires':   {'time_ms': 5000, 'bytes_kb': 8192, 'low_pct': 15, 'high_pct': 80},
+}
+
+# Gałąź analizy: ile buforów może czekać zanim kolejka zacznie zrzucać najstarsze,
+# i maksymalny rate analizy (decymacja strumieni hi-res przed FFT)
+ANALYSIS_QUEUE_BUFFERS = 8
+ANALYSIS_MAX_RATE      = 48000
+
+_MAGNITUDE_RE = re.compile(r'magnitude=[(]float[)][{]([^}]+)[}]')
+
+
+# ── Spectrum: odczyt magnitud z GstStructure ───────────────────────────────
+
+def _mag_get_value(s: Gst.Structure):
+    # gst-python overrides: Gst.ValueList z atrybutem .array (lista float)
+    v = s.get_value('magnitude')
+    return getattr(v, 'array', v)
+
+def _mag_get_list(s: Gst.Structure):
+    ok, arr = s.get_list('magnitude')
+    if not ok:
+        return None
+    if hasattr(arr, 'n_values'):   # GObject.ValueArray bez konwersji PyGI
+        return [arr.get_nth(i) for i in range(arr.n_values)]
+    return arr
+
+def _mag_regex(s: Gst.Structure):
+    m = _MAGNITUDE_RE.search(s.to_string())
+    if not m:
+        return None
+    return [float(x) for x in m.group(1).split(',') if x.strip()]
+
+_MAG_READERS = [_mag_get_value, _mag_get_list, _mag_regex]
+
+
+def read_magnitudes(s: Gst.Structure) -> Optional[list]:
+    """
+    Magnitudy (dB) z wiadomości 'spectrum' bez serializacji całej struktury do stringa.
+    Sposób niezgodny z API PyGObject (TypeError / AttributeError) odpada na stałe;
+    pusty wynik pojedynczej wiadomości tylko przechodzi do następnego sposobu.
+    Regex po to_string() zostaje zawsze jako ostatni.
+    """
+    for reader in list(_MAG_READERS):
+        try:
+            vals = reader(s)
+        except (TypeError, AttributeError) as e:
+            if reader is _mag_regex:
+                raise
+            log.info(f"Spectrum: {reader.__name__} niedostępny ({e}) — fallback")
+            if reader in _MAG_READERS:
+                _MAG_READERS.remove(reader)
+            continue
+        except Exception as e:
+            if reader is _mag_regex:
+                raise
+            log.debug(f"Spectrum: {reader.__name__}: {e}")
+            continue
+        if vals is not None and len(vals):
+            return vals
+    return None
+
+
+def _load_stations() -> list:
+    try:
+        with open(STATIONS_FILE) as f:
+            return json.load(f).get('stations', [])
+    except Exception:
+        return []
+
+
+class _StreamHead:
+    """
+    Wymienna głowa pipeline: souphttpsrc → queue2 → decodebin, podpięta do input-selector.
+    Reszta łańcucha (convert/resample/tee/eq/volume/alsasink + gałąź analizy) zostaje.
+    """
+
+    def __init__(self, url: str, src: Gst.Element, queue: Gst.Element, decode: Gst.Element,
+                 buffer_profile: dict):
+        self.url     = url
+        self.src     = src
+        self.queue   = queue
+        self.decode  = decode
+        self.buffer_profile = buffer_profile
+        self.sel_pad: Optional[Gst.Pad] = None   # request pad input-selector (po pad-added)
+        self.dec_pad: Optional[Gst.Pad] = None   # pad audio decodebin podpięty do sel_pad
+        self.block_id = 0                        # sonda BLOCK na dec_pad, gdy głowa w standby
+        self.caps:    Optional[Gst.Structure] = None
+
+    def block(self):
+        """Standby: bez dekodowania — queue2 trzyma początek strumienia, dalej TCP backpressure."""
+        if self.dec_pad is not None and not self.block_id:
+            self.block_id = self.dec_pad.add_probe(Gst.PadProbeType.BLOCK_DOWNSTREAM,
+                                                   lambda *_a: Gst.PadProbeReturn.OK)
+
+    def unblock(self):
+        if self.dec_pad is not None and self.block_id:
+            self.dec_pad.remove_probe(self.block_id)
+        self.block_id = 0
+
+    def owns(self, obj) -> bool:
+        """Czy obiekt GStreamer (np. msg.src) należy do tej głowy."""
+        while obj is not None:
+            if obj == self.src or obj == self.queue or obj == self.decode:
+                return True
+            obj = obj.get_parent()
+        return False
+
 
 class RadioSource(AudioSource):
     SOURCE_ID   = 'radio'
     SOURCE_NAME = 'Internet Radio'
     AVAILABLE   = True
 
-    def _log_bands(self, gst_vals, n_out=32):
-        if not hasattr(self, '_prev_bars'):
-            self._prev_bars = [-60.0] * n_out
-            self._peaks = [-60.0] * n_out
-
-        n_in = len(gst_vals)
-        hz_per_band = (44100 / 2.0) / n_in
-        
-        # --- PARAMETRY DLA LEPSZEJ DYNAMIKI ---
-        BAR_FALLOFF = 0.7   # Wolniejsze opadanie dla płynności
-        GAIN = 1.6          # Zwiększony gain dla większego ruchu
-        
-        result = []
-        for i in range(n_out):
-            f_lo = 20.0 * (20000.0 / 20.0) ** (i / n_out)
-            f_hi = 20.0 * (20000.0 / 20.0) ** ((i + 1) / n_out)
-            
-            idx_lo = max(0, int(f_lo / hz_per_band))
-            idx_hi = min(n_in - 1, int(f_hi / hz_per_band))
-            
-            if idx_hi - idx_lo > 2:
-                current_val = sum(gst_vals[idx_lo:idx_hi+1]) / (idx_hi - idx_lo + 1)
-            else:
-                current_val = max(gst_vals[idx_lo:idx_hi+1]) if idx_lo < idx_hi else gst_vals[idx_lo]
-
-            # Poprawiona czułość (usunięto offset psujący dynamikę)
-            current_val = current_val * GAIN
-
-            if current_val > self._prev_bars[i]:
-                bar_final = current_val
-            else:
-                bar_final = self._prev_bars[i] * BAR_FALLOFF + current_val * (1 - BAR_FALLOFF)
-            
-            self._prev_bars[i] = bar_final
-            
-            # Przeskalowanie do 0..-60 (INT)
-            val_to_send = int(max(-60, min(0, bar_final)))
-            result.append(val_to_send)
-            
-        return result
-
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._current_url        = ''
@@ -88,15 +170,46 @@ class RadioSource(AudioSource):
         self._pipeline: Optional[Gst.Pipeline] = None
         self._eq_el:    Optional[Gst.Element]  = None
         self._vol_el:   Optional[Gst.Element]  = None
-        self._reconnect_url      = ''
-        self._lock               = threading.Lock()
+        self._reconnect_url      = ''               # podstawowy URL stacji = klucz historii awarii
+        self._reconnect          = ReconnectScheduler(self._do_reconnect)
+        self._lock               = threading.RLock()   # stop + start pipeline jako całość (play/stop/reconnect)
+        self._play_gen           = 0                # ++ przy każdym play/stop użytkownika
+        self._failure_gen        = 0                # _play_gen z chwili zgłoszenia awarii
         self._play_pending       = None   # URL do zagrania po zatrzymaniu
         self._level_rms          = (0.0, 0.0)   # (L, R) RMS dB, aktualizowane przez GStreamer
         self._level_peak         = (0.0, 0.0)
-        self._spectrum_bands     = [-60.0] * 32   # 32 pasma LOG 20-20000 Hz
+        self._spectrum           = SpectrumEngine()   # pasma LOG 20-20000 Hz: 16/32/64
         self._direct             = False            # bypass EQ+loudness
         self._pregain            = 0.0              # gain per source w dB
         self._on_clip            = None             # callback przy CLIP
+        self._on_meters          = None             # callback po nowym level/spectrum (MeterPublisher)
+        self._analysis_enabled   = True             # False → valve zrzuca bufory gałęzi analizy
+        self._analysis_valve: Optional[Gst.Element] = None
+        self._analysis_meters    = []               # level/spectrum — przełączane post-messages
+        self._analysis_rate      = 0
+
+        # Warm standby: wymiana tylko głowy src→decode, łańcuch do alsasink zostaje
+        self._warm_standby       = True
+        self._preconnect         = False            # podłączaj w tle prev/next ulubioną stację
+        self._selector: Optional[Gst.Element] = None
+        self._heads: Dict[str, _StreamHead] = {}
+        self._active_head: Optional[_StreamHead] = None
+        self._target_url         = ''               # głowa, która ma zostać aktywna
+        self._heads_lock         = threading.RLock()
+        self._switch_t0          = 0.0
+        self._switch_path        = ''
+        self._switch_stats       = {'count': 0, 'last_ms': None, 'avg_ms': None, 'path': ''}
+
+        # Bufor sieciowy
+        self._buffer_profile     = 'default'        # profil globalny; stacja może nadpisać
+        self._buffering          = False            # pipeline wstrzymany do napełnienia bufora
+        self._buffer_percent     = 0
+        self._buffer_stalls      = 0
+
+        # Resampling: passthrough gdy rate pasuje do DAC, inaczej jakość wg budżetu CPU
+        self._resample_profile, self._resample_source = resolve_profile('auto')
+        self._resample_el: Optional[Gst.Element] = None
+        self._resample_path      = describe_path(0, 0, self._resample_profile)
 
         # GLib MainLoop w osobnym wątku — wymagany przez GStreamer bus callbacks
         self._loop = GLib.MainLoop()
@@ -111,9 +224,12 @@ class RadioSource(AudioSource):
 
     def deactivate(self):
         self._active = False
-        self._reconnect_url = ''
-        self._play_pending  = None
-        self._stop_pipeline()
+        self._play_gen += 1
+        with self._lock:
+            self._reconnect_url = ''
+            self._reconnect.cancel()
+            self._play_pending  = None
+            self._stop_pipeline()
         self._set_state('stopped')
 
     def get_status(self) -> dict:
@@ -134,6 +250,10 @@ class RadioSource(AudioSource):
                 'sample_rate':   self._stream_rate,
                 'channels':      self._stream_channels,
                 'decoder_caps':  self._decoder_caps,
+                'switch':        dict(self._switch_stats),
+                'reconnect':     self._reconnect.stats(self._reconnect_url),
+                'buffer':        self._buffer_status(),
+                'resample':      self._resample_status(),
             },
         }
 
@@ -141,21 +261,92 @@ class RadioSource(AudioSource):
 
     def play(self, url: str, station_name: str = ''):
         log.info(f"Radio play: {url}")
+        self._play_gen += 1                  # reconnect czekający na _lock porzuci swoją próbę
+        with self._lock:
+            self._play_locked(url, station_name)
+
+    def _play_locked(self, url: str, station_name: str):
         self._station_name  = station_name
         self._current_title = ''
         self._stream_codec  = ''
         self._stream_bitrate_kbps = 0
         self._reconnect_url = url
+        self._reconnect.cancel()
+        # Po failoverze zacznij od ostatnio działającego URL-a stacji
+        url = self._reconnect.current_url(url, self._station_urls(url))
+        self._switch_t0     = time.monotonic()
+        if self._warm_standby and self._switch_head(url):
+            return
+        self._switch_path   = 'cold'
         self._stop_pipeline()
         # Krótka przerwa żeby ALSA zdążyła zwolnić urządzenie
         time.sleep(0.3)
         self._start_pipeline(url)
 
+    def set_warm_standby(self, enabled: bool, preconnect: bool = False):
+        """Warm standby: przełączanie stacji bez przebudowy łańcucha do alsasink."""
+        self._warm_standby = bool(enabled)
+        self._preconnect   = bool(enabled and preconnect)
+        if not self._preconnect:
+            GLib.idle_add(self._prune_heads)
+
+    def get_switch_stats(self) -> dict:
+        return dict(self._switch_stats)
+
+    def set_buffer_profile(self, name: str):
+        """Domyślny profil bufora sieciowego (dla stacji bez własnego 'buffer')."""
+        if name not in BUFFER_PROFILES:
+            raise ValueError(f"Unknown buffer profile: {name}. Available: {list(BUFFER_PROFILES)}")
+        self._buffer_profile = name
+
+    def set_resample_profile(self, name: str = 'auto', per_device: Optional[dict] = None):
+        """
+        Jakość resamplingu: 'auto' (wg CPU), low/medium/high/max,
+        albo per urządzenie ALSA ({"hw:...": "low"}) — ma pierwszeństwo.
+        """
+        profile, source = resolve_profile(name, self.alsa_device, per_device)
+        self._resample_profile = profile
+        self._resample_source  = source
+        if self._resample_el is not None:
+            # quality jest mutowalne w PLAYING — bez przebudowy pipeline
+            self._resample_el.set_property('quality', RESAMPLE_PROFILES[profile])
+        self._resample_path = describe_path(self._resample_path['rate_in'],
+                                            self._resample_path['rate_out'], profile)
+        log.info(f"Resample: profil {profile} ({source})")
+
+    def set_analysis(self, enabled: bool):
+        """
+        Włącz/wyłącz gałąź analizy — bez wpływu na odtwarzanie.
+        Wyłączona: valve zrzuca bufory przed level/spectrum, a elementy nie postują
+        wiadomości na bus (wątek GLib też nic nie robi).
+        """
+        enabled = bool(enabled)
+        if enabled == self._analysis_enabled:
+            return
+        self._analysis_enabled = enabled
+        if self._analysis_valve is not None:
+            self._analysis_valve.set_property('drop', not enabled)
+        for el in self._analysis_meters:
+            el.set_property('post-messages', enabled)
+        if not enabled:
+            # Konsumenci nie mogą zobaczyć zamrożonej ostatniej ramki po ponownym włączeniu
+            self._level_rms  = (-60.0, -60.0)
+            self._level_peak = (-60.0, -60.0)
+            self._spectrum.reset()
+        log.debug(f"Radio: analiza {'włączona' if enabled else 'wyłączona'}")
+
+    def get_reconnect_stats(self) -> dict:
+        """Historia awarii/reconnectów wszystkich stacji (klucz = podstawowy URL)."""
+        return self._reconnect.stats()
+
     def stop(self):
         log.info("Radio stop")
-        self._reconnect_url = ''
-        self._play_pending  = None
-        self._stop_pipeline()
+        self._play_gen += 1
+        with self._lock:
+            self._reconnect_url = ''
+            self._reconnect.cancel()
+            self._play_pending  = None
+            self._stop_pipeline()
         self._set_state('stopped')
 
     def set_volume(self, vol: int):
@@ -163,9 +354,9 @@ class RadioSource(AudioSource):
         if self._vol_el:
             self._vol_el.set_property('volume', self._volume / 100.0)
 
-    def get_spectrum(self) -> list:
-        """Zwróć 32 pasma FFT w dB [-60..0]."""
-        return [round(v, 1) for v in self._spectrum_bands]
+    def get_spectrum(self, n_bands: int = 32) -> list:
+        """Zwróć pasma FFT w dB [-60..0] (16/32/64) z ostatniej ramki analizy."""
+        return list(self._spectrum.get(n_bands))
 
     def get_level(self) -> dict:
         """Zwróć aktualny poziom audio (RMS + peak) w dB. -60 = cisza."""
@@ -186,68 +377,102 @@ class RadioSource(AudioSource):
     def _build_pipeline(self, url: str) -> Gst.Pipeline:
         pipe = Gst.Pipeline.new('radio')
 
-        src      = Gst.ElementFactory.make('souphttpsrc',       'src')
-        decode   = Gst.ElementFactory.make('decodebin',         'decode')
+        selector = Gst.ElementFactory.make('input-selector',    'selector')
         convert  = Gst.ElementFactory.make('audioconvert',      'convert')
         resample = Gst.ElementFactory.make('audioresample',     'resample')
-        level    = Gst.ElementFactory.make('level',             'level')
-        spectrum = Gst.ElementFactory.make('spectrum',          'spectrum')
+        tee      = Gst.ElementFactory.make('tee',               'tee')
         eq       = Gst.ElementFactory.make('equalizer-10bands', 'eq')
         vol      = Gst.ElementFactory.make('volume',            'volume')
         sink     = Gst.ElementFactory.make('alsasink',          'sink')
 
-        if not all([src, decode, convert, resample, level, eq, vol, sink]):
+        # Gałąź analizy (tee → leaky queue → valve → decymacja → level → spectrum → fakesink)
+        a_queue  = Gst.ElementFactory.make('queue',             'analysis_queue')
+        a_valve  = Gst.ElementFactory.make('valve',             'analysis_valve')
+        a_resamp = Gst.ElementFactory.make('audioresample',     'analysis_resample')
+        a_caps   = Gst.ElementFactory.make('capsfilter',        'analysis_caps')
+        level    = Gst.ElementFactory.make('level',             'level')
+        spectrum = Gst.ElementFactory.make('spectrum',          'spectrum')
+        a_sink   = Gst.ElementFactory.make('fakesink',          'analysis_sink')
+
+        if not all([selector, convert, resample, tee, eq, vol, sink,
+                    a_queue, a_valve, a_resamp, a_caps, level, a_sink]):
             raise RuntimeError("GStreamer: brakujące elementy pipeline")
 
+        # Selektor nie czeka na nieaktywne wejścia; głowy w standby same stoją
+        # na sondzie BLOCK (_StreamHead.block) — nie dekodują do kosza
+        selector.set_property('sync-streams', False)
+
+        # Gałąź odtwarzania nie ma kolejki — tee woła ją w wątku streamingu jak dotąd.
+        # Gałąź analizy ma własny wątek (queue) i nigdy nie wstrzymuje odtwarzania:
+        # przy przeciążeniu kolejka zrzuca najstarsze bufory (leaky=downstream).
+        tee.set_property('allow-not-linked', True)
+        a_queue.set_property('leaky',            2)
+        a_queue.set_property('max-size-buffers', ANALYSIS_QUEUE_BUFFERS)
+        a_queue.set_property('max-size-bytes',   0)
+        a_queue.set_property('max-size-time',    0)
+        a_queue.set_property('silent',           True)
+        # Brak odbiorców pomiarów → valve wyrzuca bufory przed FFT (zero kosztu analizy)
+        a_valve.set_property('drop', not self._analysis_enabled)
+        # Decymacja: widmo 20 Hz–20 kHz nie potrzebuje 96/192 kHz — analiza w ≤ 48 kHz, quality 0
+        a_resamp.set_property('quality', 0)
+        a_caps.set_property('caps', Gst.Caps.from_string(f'audio/x-raw,rate=[1,{ANALYSIS_MAX_RATE}]'))
+        a_sink.set_property('sync',  False)
+        a_sink.set_property('async', False)   # bez prerollu — valve może nic nie przepuścić
+        a_sink.set_property('enable-last-sample', False)
+
         # level: przed EQ/vol — mierzy surowy sygnał wejściowy
         level.set_property('interval',      40_000_000)   # 40ms
         level.set_property('peak-ttl',               0)   # brak hold w GStreamer — JS robi własny peak hold
-        level.set_property('post-messages', True)
+        level.set_property('post-messages', self._analysis_enabled)
 
         if spectrum:
             spectrum.set_property('bands',           128)  # wysoka rozdzielczość → mapowanie log w Python
             spectrum.set_property('interval',   100_000_000)
             spectrum.set_property('threshold',        -60)
-            spectrum.set_property('post-messages',   True)
+            spectrum.set_property('post-messages',   self._analysis_enabled)
             spectrum.set_property('message-magnitude', True)
             spectrum.set_property('message-phase',    False)
 
-        src.set_property('location',    url)
-        src.set_property('user-agent',  "Mozilla/5.0 StreamPlayer/3.0")
-        src.set_property('timeout',     15)
-        src.set_property('retries',     3)
-        src.set_property('iradio-mode', True)
-
         sink.set_property('device', self.alsa_device)
-        resample.set_property('quality', 10)
+        resample.set_property('quality', RESAMPLE_PROFILES[self._resample_profile])
+        # Caps po obu stronach resamplera → raport passthrough/resample (wątek streamingu)
+        for pad_name in ('sink', 'src'):
+            resample.get_static_pad(pad_name).connect('notify::caps', self._on_resample_caps)
 
-        # Pipeline: src → decode → convert → resample → level → [spectrum →] eq → vol → sink
-        elements = [src, decode, convert, resample, level, eq, vol, sink]
+        # Pipeline: [src → decode]* → selector → convert → resample → tee → eq → vol → sink
+        #                                                             └→ queue → valve → resample → level → [spectrum →] fakesink
+        playback = [selector, convert, resample, tee, eq, vol, sink]
+        analysis = [tee, a_queue, a_valve, a_resamp, a_caps, level, a_sink]
         if spectrum:
-            elements.insert(elements.index(eq), spectrum)
-        for el in elements:
+            analysis.insert(analysis.index(a_sink), spectrum)
+        for el in playback + analysis[1:]:
             pipe.add(el)
+        for chain in (playback, analysis):
+            for a, b in zip(chain, chain[1:]):
+                a.link(b)
+        # Rate po decymacji — do mapowania binów FFT na Hz
+        (spectrum or level).get_static_pad('sink').connect('notify::caps', self._on_analysis_caps)
 
-        src.link(decode)
-        convert.link(resample)
-        resample.link(level)
-        if spectrum:
-            level.link(spectrum)
-            spectrum.link(eq)
-        else:
-            level.link(eq)
-        eq.link(vol)
-        vol.link(sink)
-
-        decode.connect('pad-added', self._on_pad_added, convert)
-
+        self._selector  = selector
+        self._analysis_valve  = a_valve
+        self._analysis_meters = [el for el in (level, spectrum) if el]
+        self._analysis_rate   = 0
+        self._resample_el   = resample
+        self._resample_path = describe_path(0, 0, self._resample_profile)
+        self._buffering = False
         self._eq_el  = eq
         self._vol_el = vol
         self._apply_eq()
         self._apply_volume()
         self._level_rms     = (0.0, 0.0)
         self._level_peak    = (0.0, 0.0)
-        self._spectrum_bands = [-60.0] * 32
+        self._spectrum.reset()
+
+        with self._heads_lock:
+            self._heads.clear()
+            self._active_head = None
+            self._target_url  = url
+            self._make_head(pipe, url)
 
         bus = pipe.get_bus()
         bus.add_signal_watch()
@@ -255,48 +480,290 @@ class RadioSource(AudioSource):
 
         return pipe
 
-    def _on_pad_added(self, decode, pad, convert):
+    # ── Głowy src → decode (warm standby) ──────────────────────
+
+    def _make_head(self, pipe: Gst.Pipeline, url: str) -> _StreamHead:
+        src    = Gst.ElementFactory.make('souphttpsrc', None)
+        queue  = Gst.ElementFactory.make('queue2',      None)
+        decode = Gst.ElementFactory.make('decodebin',   None)
+        if not src or not queue or not decode:
+            raise RuntimeError("GStreamer: brak souphttpsrc/queue2/decodebin")
+
+        src.set_property('location',    url)
+        src.set_property('user-agent',  "Mozilla/5.0 StreamPlayer/3.0")
+        src.set_property('timeout',     15)
+        src.set_property('retries',     3)
+        src.set_property('iradio-mode', True)
+
+        profile = self._buffer_profile_for(url)
+        queue.set_property('use-buffering',   True)
+        queue.set_property('max-size-time',   profile['time_ms'] * Gst.MSECOND)
+        queue.set_property('max-size-bytes',  profile['bytes_kb'] * 1024)
+        queue.set_property('max-size-buffers', 0)
+        queue.set_property('low-watermark',   profile['low_pct'] / 100.0)
+        queue.set_property('high-watermark',  profile['high_pct'] / 100.0)
+
+        head = _StreamHead(url, src, queue, decode, profile)
+        pipe.add(src)
+        pipe.add(queue)
+        pipe.add(decode)
+        src.link(queue)
+        queue.link(decode)
+        decode.connect('pad-added', self._on_pad_added, head)
+        self._heads[url] = head
+        return head
+
+    def _switch_head(self, url: str) -> bool:
+        """Przełącz stację w działającym pipeline. False = potrzebny zimny start."""
+        with self._heads_lock:
+            pipe = self._pipeline
+            if not pipe or not self._selector:
+                return False
+            self._target_url = url
+            head = self._heads.get(url)
+            if head and head.sel_pad:
+                self._switch_path = 'standby'
+                self._activate_head(head)
+                return True
+            if not head:
+                try:
+                    head = self._make_head(pipe, url)
+                except Exception as e:
+                    log.error(f"Warm switch: {e}")
+                    return False
+                self._sync_head(head)
+            self._switch_path = 'warm'
+        self._current_url = url
+        self._set_state('buffering')
+        return True
+
+    @staticmethod
+    def _sync_head(head: _StreamHead):
+        for el in (head.src, head.queue, head.decode):
+            el.sync_state_with_parent()
+
+    def _running_time(self) -> int:
+        """Bieżący running time pipeline (ns); 0 przed pierwszym PLAYING."""
+        pipe = self._pipeline
+        if pipe is None:
+            return 0
+        _ret, state, _pending = pipe.get_state(0)
+        clock = pipe.get_clock()
+        if state == Gst.State.PLAYING and clock is not None:
+            return max(0, clock.get_time() - pipe.get_base_time())
+        start = pipe.get_start_time()        # PAUSED (np. buforowanie): running time z chwili pauzy
+        return start if start != Gst.CLOCK_TIME_NONE else 0
+
+    def _align_head(self, head: _StreamHead):
+        """
+        Offset pada głowy tak, by jej następny bufor wypadł w bieżącym running time.
+        Głowa dołączona do grającego pipeline zaczyna znaczniki od 0 (albo, po standby,
+        od miejsca, gdzie stanęła) — bez offsetu alsasink zrzuca jej bufory jako spóźnione.
+        """
+        pad = head.dec_pad
+        if pad is None:
+            return
+        ok, pos = pad.query_position(Gst.Format.TIME)
+        pad.set_offset(self._running_time() - (pos if ok and pos > 0 else 0))
+
+    def _activate_head(self, head: _StreamHead):
+        """Ustaw głowę jako aktywne wejście selektora (dowolny wątek)."""
+        with self._heads_lock:
+            if not self._selector or head.sel_pad is None:
+                return
+            self._align_head(head)
+            head.unblock()
+            self._selector.set_property('active-pad', head.sel_pad)
+            old = self._active_head
+            if old is not None and old is not head:
+                old.block()                  # zostaje jako sąsiad w standby albo idzie do _prune_heads
+            self._active_head = head
+            self._current_url = head.url
+            if head.caps is not None:
+                self._apply_stream_caps(head.caps)
+
+        # Pipeline wstrzymany przez niedobór poprzedniej głowy: BUFFERING 100% nowej głowy
+        # zostało pominięte (nie była aktywna) — sprawdź jej poziom teraz
+        still_buffering = self._buffering and not self._head_buffered(head)
+        if self._buffering and not still_buffering:
+            self._buffering = False
+            log.info("Bufor: nowa głowa napełniona — wznowienie")
+            if self._pipeline:
+                self._pipeline.set_state(Gst.State.PLAYING)
+
+        if self._switch_path != 'cold':
+            # Zimny start mierzony do PLAYING (STATE_CHANGED); tu pipeline już gra
+            if self._switch_t0:
+                self._record_switch(round((time.monotonic() - self._switch_t0) * 1000))
+            self._reconnect.recovered(self._reconnect_url)
+            GLib.idle_add(self._set_state, 'buffering' if still_buffering else 'playing')
+        log.info(f"Radio: aktywna głowa {head.url} ({self._switch_path}, {self._switch_stats['last_ms']} ms)")
+
+        if old is not None and old is not head:
+            GLib.idle_add(self._prune_heads)
+        if self._preconnect:
+            GLib.idle_add(self._preconnect_neighbours)
+
+    @staticmethod
+    def _head_buffered(head: _StreamHead) -> bool:
+        """queue2 głowy napełniony do high-watermark (albo nie da się zapytać)."""
+        query = Gst.Query.new_buffering(Gst.Format.PERCENT)
+        if not head.queue.query(query):
+            return True
+        busy, pct = query.parse_buffering_percent()
+        return not busy or pct >= 100
+
+    def _record_switch(self, latency_ms: int):
+        st = self._switch_stats
+        st['count']  += 1
+        st['last_ms'] = latency_ms
+        st['avg_ms']  = latency_ms if st['avg_ms'] is None else round(st['avg_ms'] * 0.8 + latency_ms * 0.2)
+        st['path']    = self._switch_path
+        self._switch_t0 = 0.0
+
+    def _favourite_neighbours(self, url: str) -> list:
+        """URL poprzedniej i następnej ulubionej stacji z stations.json."""
+        stations = _load_stations()
+        favs = [s['url'] for s in stations if s.get('favorite') and s.get('enabled', True) and s.get('url')]
+        if url not in favs or len(favs) < 2:
+            return []
+        i = favs.index(url)
+        return list(dict.fromkeys([favs[(i + 1) % len(favs)], favs[(i - 1) % len(favs)]]))[:MAX_STANDBY]
+
+    def _preconnect_neighbours(self) -> bool:
+        """GLib idle: podłącz w tle sąsiednie ulubione stacje (jako nieaktywne wejścia selektora)."""
+        with self._heads_lock:
+            pipe = self._pipeline
+            if not pipe or not self._active_head or not self._preconnect:
+                return False
+            for url in self._favourite_neighbours(self._active_head.url):
+                if url in self._heads:
+                    continue
+                try:
+                    head = self._make_head(pipe, url)
+                    self._sync_head(head)
+                    log.info(f"Standby: {url}")
+                except Exception as e:
+                    log.warning(f"Standby {url}: {e}")
+        self._prune_heads()
+        return False
+
+    def _prune_heads(self) -> bool:
+        """GLib idle: usuń głowy, które nie są aktywne, docelowe ani sąsiadami."""
+        with self._heads_lock:
+            active = self._active_head
+            keep = {self._target_url}
+            if active:
+                keep.add(active.url)
+                if self._preconnect:
+                    keep.update(self._favourite_neighbours(active.url))
+            stale = [self._heads.pop(u) for u in list(self._heads) if u not in keep]
+        # Poza lockiem — set_state(NULL) czeka na wątek streamingu, który może chcieć locka w pad-added
+        for head in stale:
+            self._remove_head(head)
+        return False
+
+    def _remove_head(self, head: _StreamHead):
+        """Zatrzymaj i odłącz głowę. Wołać bez _heads_lock (patrz _prune_heads)."""
+        pipe = self._pipeline
+        head.unblock()
+        for el in (head.src, head.queue, head.decode):
+            el.set_state(Gst.State.NULL)
+            if pipe:
+                pipe.remove(el)
+        if head.sel_pad is not None and self._selector:
+            self._selector.release_request_pad(head.sel_pad)
+        head.sel_pad = None
+
+    def _head_of(self, obj) -> Optional[_StreamHead]:
+        with self._heads_lock:
+            for head in self._heads.values():
+                if head.owns(obj):
+                    return head
+        return None
+
+    def _apply_stream_caps(self, s: Gst.Structure):
+        try:
+            if s.has_field('rate'):
+                self._stream_rate = int(s.get_value('rate'))
+            if s.has_field('channels'):
+                self._stream_channels = int(s.get_value('channels'))
+            # bit depth z formatu np. audio/x-raw,format=S16LE
+            if s.has_field('format'):
+                fmt = str(s.get_value('format'))
+                m = re.search(r'S(\d+)', fmt)
+                if m:
+                    self._stream_bit_depth = int(m.group(1))
+            self._decoder_caps = s.get_name()
+        except Exception as e:
+            log.error(f"DEBUG: Error parsing caps: {e}")
+
+    def _on_pad_added(self, decode, pad, head: _StreamHead):
         caps = pad.get_current_caps()
         if caps:
             log.info(f"DEBUG: Pad added caps: {caps.to_string()}")
             s = caps.get_structure(0)
             name = s.get_name()
             if name.startswith('audio/'):
-                try:
-                    if s.has_field('rate'):
-                        self._stream_rate = int(s.get_value('rate'))
-                    if s.has_field('channels'):
-                        self._stream_channels = int(s.get_value('channels'))
-                    # bit depth z formatu np. audio/x-raw,format=S16LE
-                    if s.has_field('format'):
-                        fmt = str(s.get_value('format'))
-                        m = __import__('re').search(r'S(\d+)', fmt)
-                        if m:
-                            self._stream_bit_depth = int(m.group(1))
-                    self._decoder_caps = name
-                except Exception as e:
-                    log.error(f"DEBUG: Error parsing caps: {e}")
-                sink_pad = convert.get_static_pad('sink')
-                if not sink_pad.is_linked():
-                    pad.link(sink_pad)
+                with self._heads_lock:
+                    if not self._selector or head.sel_pad is not None:
+                        return
+                    if hasattr(self._selector, 'request_pad_simple'):
+                        sel_pad = self._selector.request_pad_simple('sink_%u')
+                    else:
+                        sel_pad = self._selector.get_request_pad('sink_%u')
+                    if pad.link(sel_pad) != Gst.PadLinkReturn.OK:
+                        self._selector.release_request_pad(sel_pad)
+                        log.error(f"Decoder: nie można podpiąć {name}")
+                        return
+                    head.sel_pad = sel_pad
+                    head.dec_pad = pad
+                    head.caps    = s.copy()
                     log.info(f"Decoder: {name}")
+                    is_target = (head.url == self._target_url)
+                    self._align_head(head)
+                    if not is_target:
+                        head.block()
+                if is_target:
+                    self._activate_head(head)
 
     def _on_bus_message(self, bus, msg):
         t = msg.type
+        if t in (Gst.MessageType.ERROR, Gst.MessageType.TAG, Gst.MessageType.BUFFERING):
+            head = self._head_of(msg.src)
+            if t == Gst.MessageType.BUFFERING and head is not None and head is not self._active_head:
+                return   # napełnianie głowy, która jeszcze nie gra, nie może pauzować bieżącej stacji
+            if head is not None and head is not self._active_head and head.url != self._target_url:
+                # Wiadomość z głowy w standby — nie dotyczy tego, co gra
+                if t == Gst.MessageType.ERROR:
+                    log.info(f"Standby {head.url}: błąd — usuwam")
+                    with self._heads_lock:
+                        stale = self._heads.pop(head.url, None) if self._heads.get(head.url) is head else None
+                    if stale:
+                        self._remove_head(stale)
+                return
+
+        if t in (Gst.MessageType.EOS, Gst.MessageType.ERROR):
+            if not self._pipeline or bus != self._pipeline.get_bus():
+                return   # spóźniona wiadomość z rozebranego pipeline
+
         if t == Gst.MessageType.EOS:
             log.info("EOS — reconnect")
-            self._schedule_reconnect()
+            self._schedule_reconnect('EOS')
 
         elif t == Gst.MessageType.ERROR:
             err, dbg = msg.parse_error()
             log.warning(f"GST error: {err.message}")
             self._set_state('buffering')
-            self._schedule_reconnect()
+            self._schedule_reconnect(err.message)
 
         elif t == Gst.MessageType.STATE_CHANGED:
             if msg.src == self._pipeline:
                 _, new, _ = msg.parse_state_changed()
                 if new == Gst.State.PLAYING:
+                    if self._switch_t0 and self._switch_path == 'cold':
+                        self._record_switch(round((time.monotonic() - self._switch_t0) * 1000))
+                    self._reconnect.recovered(self._reconnect_url)
                     self._set_state('playing')
                 elif new == Gst.State.PAUSED:
                     if self._state not in ('buffering',):
@@ -357,16 +824,13 @@ class RadioSource(AudioSource):
             s = msg.get_structure()
             if s and s.get_name() == 'spectrum':
                 try:
-                    raw = s.to_string()
-                    m = re.search(r'magnitude=[(]float[)][{]([^}]+)[}]', raw)
-                    if m:
-                        vals = [float(x.strip()) for x in m.group(1).split(',') if x.strip()]
-                        if len(vals) >= 32:
-                            self._spectrum_bands = self._log_bands(vals)
-                        else:
-                            self._spectrum_bands = [max(-60.0, min(0.0, v)) for v in vals[:32]]
+                    vals = read_magnitudes(s)
+                    if vals is not None:
+                        self._spectrum.process(vals, self._analysis_rate or self._stream_rate or 44100)
                 except Exception:
                     pass
+                if self._on_meters:
+                    self._on_meters(self.SOURCE_ID)
             elif s and s.get_name() == 'level':
                 # Sprawdz CLIP (peak >= 0dBFS)
                 try:
@@ -387,32 +851,111 @@ class RadioSource(AudioSource):
                     self._level_peak = (max(-60.0, peak_l), max(-60.0, peak_r))
                 except Exception:
                     pass
+                if self._on_meters:
+                    self._on_meters(self.SOURCE_ID)
 
         elif t == Gst.MessageType.BUFFERING:
+            # queue2 raportuje <100% dopiero po spadku poniżej low-watermark i 100% po
+            # napełnieniu do high-watermark — zmieniamy stan tylko na tych przejściach
             pct = msg.parse_buffering()
-            if pct < 100:
+            self._buffer_percent = pct
+            if pct < 100 and not self._buffering:
+                self._buffering = True
+                self._buffer_stalls += 1
+                log.info(f"Bufor: niedobór ({pct}%) — pauza do napełnienia")
                 self._set_state('buffering')
                 if self._pipeline:
                     self._pipeline.set_state(Gst.State.PAUSED)
-            else:
-                self._set_state('playing')
+            elif pct >= 100 and self._buffering:
+                self._buffering = False
+                log.info("Bufor: napełniony — wznowienie")
                 if self._pipeline:
                     self._pipeline.set_state(Gst.State.PLAYING)
 
-    def _schedule_reconnect(self):
-        url = self._reconnect_url
-        if url:
-            GLib.timeout_add(500, self._do_reconnect, url)
+    def _buffer_profile_for(self, url: str) -> dict:
+        profile = dict(BUFFER_PROFILES.get(self._buffer_profile, BUFFER_PROFILES['default']))
+        for st in _load_stations():
+            if url == st.get('url') or url in st.get('alt_urls', []):
+                custom = st.get('buffer')
+                if isinstance(custom, str) and custom in BUFFER_PROFILES:
+                    profile = dict(BUFFER_PROFILES[custom])
+                elif isinstance(custom, dict):
+                    profile.update({k: v for k, v in custom.items() if k in profile})
+                break
+        return profile
 
-    def _do_reconnect(self, url: str) -> bool:
-        if self._reconnect_url != url:
-            return False  # URL zmieniony — porzuć ten reconnect
-        log.info(f"Reconnect: {url}")
-        self._stop_pipeline()
-        time.sleep(0.3)
-        if self._reconnect_url == url:  # Sprawdź ponownie po sleep
+    def _on_resample_caps(self, pad, _pspec):
+        el = self._resample_el
+        if el is None:
+            return
+        rates = []
+        for pad_name in ('sink', 'src'):
+            caps = el.get_static_pad(pad_name).get_current_caps()
+            s = caps.get_structure(0) if caps and caps.get_size() else None
+            rates.append(int(s.get_value('rate')) if s and s.has_field('rate') else 0)
+        path = describe_path(rates[0], rates[1], self._resample_profile)
+        prev = self._resample_path
+        if all(rates) and (path['rate_in'], path['rate_out']) != (prev['rate_in'], prev['rate_out']):
+            log.info(f"Resample: {path['path']} {path['rate_in']} → {path['rate_out']} Hz"
+                     + ('' if path['quality'] is None else f" (quality {path['quality']})"))
+        self._resample_path = path
+
+    def _on_analysis_caps(self, pad, _pspec):
+        caps = pad.get_current_caps()
+        if caps and caps.get_size():
+            s = caps.get_structure(0)
+            if s.has_field('rate'):
+                self._analysis_rate = int(s.get_value('rate'))
+
+    def _resample_status(self) -> dict:
+        return dict(self._resample_path, source=self._resample_source)
+
+    def _buffer_status(self) -> dict:
+        head = self._active_head
+        if head is None:
+            return {'percent': 0, 'level_ms': 0, 'level_kb': 0, 'buffering': self._buffering,
+                    'stalls': self._buffer_stalls, 'profile': {}}
+        try:
+            level_ns    = head.queue.get_property('current-level-time')
+            level_bytes = head.queue.get_property('current-level-bytes')
+        except Exception:
+            level_ns = level_bytes = 0
+        prof = head.buffer_profile
+        fill = max(level_ns / (prof['time_ms'] * Gst.MSECOND),
+                   level_bytes / (prof['bytes_kb'] * 1024.0))
+        return {
+            'percent':   min(100, round(fill * 100)),
+            'level_ms':  round(level_ns / Gst.MSECOND),
+            'level_kb':  round(level_bytes / 1024),
+            'buffering': self._buffering,
+            'stalls':    self._buffer_stalls,
+            'profile':   prof,
+        }
+
+    def _station_urls(self, url: str) -> list:
+        """Podstawowy URL + alternatywne ('alt_urls') tej samej stacji ze stations.json."""
+        for st in _load_stations():
+            if st.get('url') == url:
+                return [url] + [u for u in st.get('alt_urls', []) if u and u != url]
+        return [url]
+
+    def _schedule_reconnect(self, reason: str = ''):
+        key = self._reconnect_url
+        if key:
+            self._failure_gen = self._play_gen
+            self._reconnect.failure(key, self._station_urls(key), reason)
+
+    def _do_reconnect(self, key: str, url: str):
+        """Wątek ReconnectScheduler — blokujące stop/start nie dotyka pętli GLib."""
+        with self._lock:
+            # play/stop w międzyczasie (także tej samej stacji) — ich pipeline zostaje
+            if self._reconnect_url != key or self._play_gen != self._failure_gen:
+                return
+            log.info(f"Reconnect: {url}")
+            self._switch_path = 'cold'
+            self._stop_pipeline()
+            time.sleep(0.3)
             self._start_pipeline(url)
-        return False
 
     def _start_pipeline(self, url: str):
         self._current_url = url
@@ -435,6 +978,13 @@ class RadioSource(AudioSource):
                 self._pipeline = None
                 self._eq_el    = None
                 self._vol_el   = None
+                self._resample_el = None
+                self._analysis_valve  = None
+                self._analysis_meters = []
+                with self._heads_lock:
+                    self._selector    = None
+                    self._active_head = None
+                    self._heads.clear()
                 # Ustaw NULL i poczekaj na potwierdzenie
                 p.set_state(Gst.State.NULL)
                 p.get_state(timeout=Gst.SECOND * 2)  # czekaj max 2s
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Reconnect radia poza pętlą GLib.
+
+- własny wątek roboczy — stop/start pipeline (blokujące get_state, sleep dla ALSA)
+  nie zamraża już bus messages (level/spectrum/tag),
+- backoff wykładniczy z jitterem zamiast stałych 500 ms,
+- historia awarii per stacja, failover na alternatywne URL-e stacji,
+- statystyki: liczba reconnectów, czas do odzyskania (time-to-recover).
+"""
+
+import random
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+BACKOFF_BASE   = 0.5     # s — pierwsza próba
+BACKOFF_CAP    = 30.0    # s — maksymalna przerwa
+BACKOFF_JITTER = 0.3     # ±30%
+STABLE_AFTER   = 30.0    # s grania bez błędu → licznik kolejnych awarii od zera
+
+
+class StationHealth:
+    """Historia awarii jednej stacji (klucz = podstawowy URL)."""
+
+    def __init__(self, urls: List[str]):
+        self.urls          = urls
+        self.url_index     = 0
+        self.consecutive   = 0
+        self.failures      = 0
+        self.reconnects    = 0
+        self.recoveries    = 0
+        self.outage_start: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_reason   = ''
+        self.playing_since: Optional[float] = None
+        self.last_ttr_ms:  Optional[int] = None
+        self.avg_ttr_ms:   Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        return self.urls[self.url_index % len(self.urls)]
+
+    def as_dict(self) -> dict:
+        return {
+            'url':          self.url,
+            'urls':         len(self.urls),
+            'failures':     self.failures,
+            'consecutive':  self.consecutive,
+            'reconnects':   self.reconnects,
+            'recoveries':   self.recoveries,
+            'last_reason':  self.last_reason,
+            'last_ttr_ms':  self.last_ttr_ms,
+            'avg_ttr_ms':   self.avg_ttr_ms,
+            'in_outage':    self.outage_start is not None,
+        }
+
+
+class ReconnectScheduler:
+    def __init__(self, reconnect_fn: Callable[[str, str], None],
+                 base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP,
+                 jitter: float = BACKOFF_JITTER):
+        self._reconnect_fn = reconnect_fn     # fn(station_key, url) — wołane z wątku schedulera
+        self._base   = base
+        self._cap    = cap
+        self._jitter = jitter
+        self._health: Dict[str, StationHealth] = {}
+        self._cond   = threading.Condition()
+        self._due:   Optional[float] = None
+        self._key    = ''
+        threading.Thread(target=self._loop, daemon=True, name='radio-reconnect').start()
+
+    # ── API (wątek GLib / Flask) ───────────────────────────────
+
+    def failure(self, key: str, urls: List[str], reason: str = ''):
+        """Zgłoś awarię strumienia. Kolejne zgłoszenia przed próbą są łączone w jedno."""
+        if not key:
+            return
+        with self._cond:
+            h = self._health_for(key, urls)
+            if self._due is not None and self._key == key:
+                return
+            now = time.monotonic()
+            if h.playing_since is not None and now - h.playing_since > STABLE_AFTER:
+                h.consecutive = 0
+            h.playing_since = None
+            h.failures     += 1
+            h.consecutive  += 1
+            h.last_failure  = now
+            h.last_reason   = reason
+            if h.outage_start is None:
+                h.outage_start = now
+            if len(h.urls) > 1 and h.consecutive > 1:
+                h.url_index = (h.url_index + 1) % len(h.urls)
+
+            delay = min(self._cap, self._base * 2 ** (h.consecutive - 1))
+            delay *= 1.0 + random.uniform(-self._jitter, self._jitter)
+            self._key = key
+            self._due = now + delay
+            self._cond.notify()
+        log.info(f"Reconnect za {delay:.1f}s ({h.consecutive}. awaria, {h.url}): {reason}")
+
+    def recovered(self, key: str):
+        """Strumień gra — zamknij awarię i zapisz czas odzyskania."""
+        with self._cond:
+            h = self._health.get(key)
+            if not h:
+                return
+            now = time.monotonic()
+            h.playing_since = now
+            if h.outage_start is not None:
+                ttr = round((now - h.outage_start) * 1000)
+                h.outage_start = None
+                h.recoveries  += 1
+                h.last_ttr_ms  = ttr
+                h.avg_ttr_ms   = ttr if h.avg_ttr_ms is None else round(h.avg_ttr_ms * 0.8 + ttr * 0.2)
+                log.info(f"Radio odzyskane po {ttr} ms ({h.url})")
+
+    def cancel(self):
+        """Porzuć zaplanowaną próbę (stop / nowa stacja)."""
+        with self._cond:
+            self._due = None
+            self._key = ''
+            self._cond.notify()
+
+    def current_url(self, key: str, urls: List[str]) -> str:
+        """URL do odtwarzania — ostatnio działający (po failoverze) albo pierwszy."""
+        with self._cond:
+            return self._health_for(key, urls).url
+
+    def stats(self, key: Optional[str] = None) -> dict:
+        with self._cond:
+            if key is not None:
+                h = self._health.get(key)
+                return h.as_dict() if h else {}
+            return {k: h.as_dict() for k, h in self._health.items()}
+
+    # ── Wewnętrzne ─────────────────────────────────────────────
+
+    def _health_for(self, key: str, urls: List[str]) -> StationHealth:
+        h = self._health.get(key)
+        urls = urls or [key]
+        if h is None:
+            h = self._health[key] = StationHealth(urls)
+        elif h.urls != urls:
+            h.urls = urls
+            h.url_index %= len(urls)
+        return h
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._due is None or time.monotonic() < self._due:
+                    timeout = None if self._due is None else max(0.0, self._due - time.monotonic())
+                    self._cond.wait(timeout)
+                key = self._key
+                h   = self._health.get(key)
+                self._due = None
+                self._key = ''
+                if not h:
+                    continue
+                h.reconnects += 1
+                url = h.url
+            try:
+                self._reconnect_fn(key, url)
+            except Exception as e:
+                log.error(f"Reconnect error: {e}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Polityka resamplingu dla pipeline radia.
+
+- passthrough: gdy rate strumienia == rate, który przyjęło urządzenie ALSA,
+  audioresample przepuszcza bufory bez dotykania próbek (bit-perfect na tym etapie),
+- w przeciwnym razie jakość audioresample dobierana do budżetu CPU:
+  wykryta automatycznie (rdzenie × taktowanie) albo ustawiona per urządzenie ALSA.
+
+quality=10 (stare ustawienie na sztywno) na Pi 3 przy 96 kHz FLAC zjadało
+sporą część rdzenia; domyślna jakość GStreamera to 4.
+"""
+
+import os
+import logging
+from typing import Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+RESAMPLE_PROFILES = {
+    'low':    2,
+    'medium': 4,     # domyślne GStreamera
+    'high':   7,
+    'max':    10,
+}
+
+# Próg wyniku CPU (rdzenie × GHz) → profil. Pi Zero ≈ 1, Pi 3 ≈ 4.8, Pi 4 ≈ 6–7, Pi 5 ≈ 9.6
+CPU_TIERS = [
+    (2.0,  'low'),
+    (5.0,  'medium'),
+    (8.0,  'high'),
+]
+
+_MODEL_PATHS = ('/proc/device-tree/model', '/sys/firmware/devicetree/base/model')
+_FREQ_PATH   = '/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq'
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace').strip('\x00\n ')
+    except OSError:
+        return ''
+
+
+def board_model() -> str:
+    for p in _MODEL_PATHS:
+        m = _read(p)
+        if m:
+            return m
+    return ''
+
+
+def cpu_score() -> float:
+    """Przybliżony budżet CPU: liczba rdzeni × maks. taktowanie w GHz."""
+    cores = os.cpu_count() or 1
+    khz   = _read(_FREQ_PATH)
+    ghz   = int(khz) / 1e6 if khz.isdigit() else 1.5
+    return round(cores * ghz, 1)
+
+
+def detect_profile() -> str:
+    score = cpu_score()
+    for limit, name in CPU_TIERS:
+        if score < limit:
+            return name
+    return 'max'
+
+
+def resolve_profile(name: str, device: str = '', per_device: Optional[dict] = None) -> Tuple[str, str]:
+    """
+    Profil do użycia → (profil, skąd wybrany).
+    Kolejność: wpis per urządzenie ALSA → jawny profil → 'auto' (wykrycie CPU).
+    """
+    if per_device and device in per_device:
+        dev_name = per_device[device]
+        if dev_name in RESAMPLE_PROFILES:
+            return dev_name, f'device:{device}'
+        log.warning(f"Resample: nieznany profil '{dev_name}' dla {device}")
+    if name in RESAMPLE_PROFILES:
+        return name, 'config'
+    if name != 'auto':
+        raise ValueError(f"Nieznany profil resamplingu: {name}. Dostępne: auto, {', '.join(RESAMPLE_PROFILES)}")
+    return detect_profile(), f'auto:{cpu_score()}'
+
+
+def describe_path(rate_in: int, rate_out: int, profile: str) -> dict:
+    """Którą ścieżką idzie sygnał przez audioresample."""
+    passthrough = bool(rate_in) and rate_in == rate_out
+    return {
+        'path':     'passthrough' if passthrough else 'resample',
+        'profile':  profile,
+        'quality':  None if passthrough else RESAMPLE_PROFILES.get(profile),
+        'rate_in':  rate_in,
+        'rate_out': rate_out,
+    }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Mapowanie widma FFT (GStreamer 'spectrum', N liniowych binów) na pasma logarytmiczne 20 Hz – 20 kHz.
+
+Krawędzie pasm i zakresy binów liczone są raz na (n_in, n_out, sample_rate)
+i trzymane w cache; na każdą ramkę zostaje jedno mnożenie macierzy + wektorowe
+wygładzanie (falloff) w NumPy.
+
+SpectrumEngine — jeden silnik na źródło: liczy wszystkie rozdzielczości (16/32/64)
+raz na ramkę analizy i publikuje niezmienny snapshot. Konsumenci (Web UI, panel,
+REST) tylko czytają — nie przesuwają stanu wygładzania.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+RESOLUTIONS = (16, 32, 64)
+
+F_MIN       = 20.0
+F_MAX       = 20000.0
+FLOOR_DB    = -60
+CEIL_DB     = 0
+BAR_FALLOFF = 0.7     # wolniejsze opadanie dla płynności
+GAIN        = 1.6     # większy ruch słupków
+
+
+class BandMap:
+    """
+    Niezmienna mapa binów FFT → pasma log.
+
+    Szerokie pasma (> 3 biny) to średnia — wiersz macierzy `weights`.
+    Wąskie pasma (niskie częstotliwości) to max z 1–3 binów — indeksy `narrow_idx`.
+    """
+
+    def __init__(self, n_in: int, n_out: int, sample_rate: int):
+        self.n_in        = n_in
+        self.n_out       = n_out
+        self.sample_rate = sample_rate
+
+        hz_per_bin = (sample_rate / 2.0) / n_in
+        i     = np.arange(n_out + 1, dtype=np.float64)
+        edges = F_MIN * (F_MAX / F_MIN) ** (i / n_out)
+        lo = np.clip((edges[:-1] / hz_per_bin).astype(np.int64), 0, n_in - 1)
+        hi = np.minimum(n_in - 1, (edges[1:] / hz_per_bin).astype(np.int64))
+        hi = np.maximum(lo, hi)
+
+        wide = (hi - lo) > 2
+        weights = np.zeros((n_out, n_in), dtype=np.float32)
+        for b in np.nonzero(wide)[0]:
+            weights[b, lo[b]:hi[b] + 1] = 1.0 / (hi[b] - lo[b] + 1)
+
+        # Wąskie pasma: 3 indeksy, brakujące uzupełnione idx_lo (nie zmienia max)
+        narrow_idx = np.stack([lo, np.minimum(lo + 1, hi), np.minimum(lo + 2, hi)], axis=1)
+
+        self.wide       = wide
+        self.weights    = weights
+        self.narrow_idx = narrow_idx
+
+    def apply(self, mags: np.ndarray) -> np.ndarray:
+        """Magnitudy dB (n_in,) → wartości pasm dB (n_out,) float32."""
+        mean = self.weights @ mags
+        peak = mags[self.narrow_idx].max(axis=1)
+        return np.where(self.wide, mean, peak)
+
+
+@lru_cache(maxsize=16)
+def band_map(n_in: int, n_out: int, sample_rate: int) -> BandMap:
+    return BandMap(n_in, n_out, sample_rate)
+
+
+class SpectrumMapper:
+    """Stan wygładzania pasm dla jednego źródła (nie współdzielony)."""
+
+    def __init__(self, n_out: int = 32, gain: float = GAIN, falloff: float = BAR_FALLOFF):
+        self.n_out   = n_out
+        self.gain    = gain
+        self.falloff = falloff
+        self.reset()
+
+    def reset(self):
+        self._prev = np.full(self.n_out, float(FLOOR_DB), dtype=np.float32)
+
+    def process(self, mags, sample_rate: int) -> np.ndarray:
+        """Magnitudy dB z GStreamera → pasma int8 [-60..0] z falloff."""
+        mags = np.asarray(mags, dtype=np.float32)
+        cur  = band_map(len(mags), self.n_out, int(sample_rate)).apply(mags) * self.gain
+
+        prev = self._prev
+        bars = np.where(cur > prev, cur, prev * self.falloff + cur * (1.0 - self.falloff))
+        self._prev = bars.astype(np.float32)
+        return np.clip(bars, FLOOR_DB, CEIL_DB).astype(np.int8)
+
+
+class SpectrumEngine:
+    def __init__(self, resolutions=RESOLUTIONS):
+        self._mappers = {n: SpectrumMapper(n_out=n) for n in resolutions}
+        self.reset()
+
+    @property
+    def resolutions(self) -> tuple:
+        return tuple(self._mappers)
+
+    @property
+    def frame(self) -> int:
+        """Numer ramki analizy — rośnie przy każdym process()."""
+        return self._frame
+
+    def reset(self):
+        for m in self._mappers.values():
+            m.reset()
+        self._frame    = 0
+        self._snapshot = {n: (FLOOR_DB,) * n for n in self._mappers}
+
+    def process(self, mags, sample_rate: int):
+        """Jedna ramka analizy → nowy snapshot wszystkich rozdzielczości."""
+        mags = np.asarray(mags, dtype=np.float32)
+        # Nowy dict podmieniany atomowo — czytelnik nigdy nie widzi połowy ramki
+        self._snapshot = {n: tuple(m.process(mags, sample_rate).tolist())
+                          for n, m in self._mappers.items()}
+        self._frame += 1
+
+    def get(self, n_bands: int = 32) -> tuple:
+        """Ostatni snapshot w danej rozdzielczości (krotka int dB, -60..0)."""
+        snap = self._snapshot
+        if n_bands not in snap:
+            raise ValueError(f"Nieobsługiwana rozdzielczość: {n_bands}. Dostępne: {list(snap)}")
+        return snap[n_bands]
@@ -111,7 +111,7 @@ install_python_deps() {
     log "[install_python] instaluję biblioteki Python..." "INFO"
 
     sudo apt update
-    sudo apt install -y python3-pip python3-venv build-essential libjpeg-dev zlib1g-dev
+    sudo apt install -y python3-pip python3-venv build-essential libjpeg-dev zlib1g-dev python3-yaml
 
     sudo -H python3 -m pip install --break-system-packages --upgrade pip setuptools wheel
 
@@ -120,6 +120,7 @@ install_python_deps() {
         smbus2 \
         pillow \
         python-mpd2 \
+        websocket-client \
         luma.oled
 
     log "[install_python] biblioteki Python zainstalowane" "OK"
@@ -192,7 +193,7 @@ Requires=camilladsp.service
 [Service]
 User=$user_name
 WorkingDirectory=/home/$user_name/streamer
-ExecStart=/usr/bin/python3 /home/$user_name/streamer/audio/dsp.py
+ExecStart=/usr/bin/python3 -m audio.dsp
 Restart=always
 
 [Install]
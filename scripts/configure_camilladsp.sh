@@ -71,7 +71,7 @@ Description=CamillaDSP Audio Processor
 After=sound.target
 
 [Service]
-ExecStart=/usr/bin/camilladsp -p /etc/camilladsp/config.yml
+ExecStart=/usr/bin/camilladsp -p 1234 -a 127.0.0.1 /etc/camilladsp/config.yml
 Restart=always
 User=$USER
 
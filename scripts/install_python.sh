@@ -3,7 +3,7 @@ set -e
 
 echo "[install_python] Instaluję biblioteki Python..."
 
-sudo apt install -y python3-pip python3-venv build-essential libjpeg-dev zlib1g-dev
+sudo apt install -y python3-pip python3-venv build-essential libjpeg-dev zlib1g-dev python3-yaml
 
 sudo -H python3 -m pip install --break-system-packages --upgrade pip setuptools wheel
 
@@ -12,6 +12,7 @@ sudo -H python3 -m pip install --break-system-packages \
     smbus2 \
     pillow \
     python-mpd2 \
+    websocket-client \
     luma.oled
     
 sudo apt install -y python3-flask
@@ -28,6 +28,7 @@ class Menu:
         self.volume = volume
 
         self.volume_level = 50
+        # EQ → CamillaDSP: usługa streamer-eq (audio/dsp.py) obserwuje config-eq.json
         self.eq_menu = EqMenu(display)
 
         self.active_menu = None   # None = ekran główny
@@ -65,8 +66,7 @@ class Menu:
         self.volume_level = max(0, min(100, self.volume_level + direction))
         self.volume.set(self.volume_level)
 
-        # integracja loudness z głośnością
-        self.apply_loudness_dynamic()
+        # loudness nadąża za głośnością w streamer-eq — bez zapisu config-eq.json
 
         self.show_main_screen()
 
@@ -96,30 +96,3 @@ class Menu:
         self.active_menu = self.eq_menu
         self.eq_menu.enter()
         self.display.text("EQ menu")
-
-    # -------------------------------
-    # LOUDNESS DYNAMICZNY
-    # -------------------------------
-
-    def apply_loudness_dynamic(self):
-        """
-        Loudness zależny od głośności:
-        - przy 0–30% → mocny
-        - przy 30–60% → średni
-        - przy 60–100% → minimalny
-        """
-        eq = load_eq()
-        if not eq.get("loudness", {}).get("enabled", False):
-            return
-
-        vol = self.volume_level
-
-        if vol < 30:
-            strength = 80
-        elif vol < 60:
-            strength = 40
-        else:
-            strength = 10
-
-        eq["loudness"]["strength"] = strength
-        EQ_CONFIG.write_text(json.dumps(eq, indent=2))